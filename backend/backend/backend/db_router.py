@@ -0,0 +1,97 @@
+"""
+Routage lecture/écriture entre la base primaire et ses réplicas.
+
+Les lectures vont sur un réplica (settings.DATABASE_REPLICAS), les écritures
+sur 'default'. Restent sur la primaire :
+- toutes les requêtes d'une requête HTTP non sûre (POST, PUT, PATCH, DELETE) ;
+- les lectures qui suivent une écriture dans la même requête HTTP ;
+- les lectures d'un utilisateur pendant REPLICA_STICKY_SECONDS après l'une de
+  ses écritures, pour qu'il voie toujours ses propres données malgré le
+  retard de réplication.
+- tout ce qui s'exécute hors requête HTTP (commandes, workers de jobs).
+
+L'état est porté par une ContextVar posée par ReplicaRoutingMiddleware ;
+l'utilisateur est renseigné par l'authentification JWT (users.authentication).
+Les épinglages sont dans le cache Django, qui doit être partagé entre
+processus (REDIS_URL) : settings refuse des réplicas sans lui, sauf
+DB_REPLICA_LOCAL_PINS=1 pour un serveur à un seul processus.
+
+Essai local avec deux instances PostgreSQL : créer un réplica par
+`pg_basebackup -R` (ou un second cluster en réplication en continu), puis
+lancer le serveur avec DB_REPLICA_HOSTS=localhost:5433.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+PRIMARY = 'default'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+class RoutingState:
+    __slots__ = ('force_primary', 'wrote', 'user_id', 'pinned')
+
+    def __init__(self, force_primary=False):
+        self.force_primary = force_primary
+        self.wrote = False
+        self.user_id = None
+        self.pinned = False
+
+
+def _pin_key(user_id):
+    return f'db-router:pin:{user_id}'
+
+
+def pin_user(user_id):
+    """Envoie les lectures de cet utilisateur sur la primaire pour un court délai"""
+    cache.set(_pin_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def set_current_user(user_id):
+    state = _state.get()
+    if state is None or state.user_id == user_id:
+        return
+    state.user_id = user_id
+    # Une seule lecture du cache par requête
+    state.pinned = bool(cache.get(_pin_key(user_id)))
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.force_primary or state.wrote or state.pinned:
+            return PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaire et réplicas contiennent les mêmes données
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(force_primary=request.method not in SAFE_METHODS)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+            if state.wrote and state.user_id is not None:
+                pin_user(state.user_id)
+            return response
+        finally:
+            _state.reset(token)
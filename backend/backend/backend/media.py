@@ -0,0 +1,163 @@
+"""
+Envoi des médias (photos, audios, photos de profil) derrière un contrôle
+d'accès, sans que Python ne copie les octets.
+
+- settings.MEDIA_SENDFILE = 'x-accel-redirect' (nginx) ou 'x-sendfile'
+  (Apache, lighttpd) : la réponse est vide, le serveur web envoie le
+  fichier lui-même (Range compris). Avec nginx, MEDIA_ROOT doit être
+  exposé en `internal` sous MEDIA_ACCEL_PREFIX.
+- sinon, FileResponse : sous gunicorn, wsgi.file_wrapper utilise
+  os.sendfile à partir de la position du fichier et sur Content-Length
+  octets, y compris pour une plage.
+
+Gérés ici : ETag / If-None-Match, Last-Modified / If-Modified-Since,
+Range sur une seule plage (If-Range compris), HEAD. Une demande de
+plusieurs plages reçoit le fichier entier, ce que la RFC 9110 autorise.
+"""
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.shortcuts import redirect
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+
+class RangeFile:
+    """Fichier limité à `length` octets depuis sa position courante"""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    (début, fin incluse) de l'unique plage demandée ; None pour envoyer le
+    fichier entier ; ValueError si la plage est hors du fichier.
+    """
+    unit, _, ranges = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in ranges:
+        return None
+    first, sep, last = ranges.strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # bytes=-N : les N derniers octets (N = 0 : plage vide)
+            suffix = int(last)
+            start, end = (size - suffix if suffix > 0 else size), size - 1
+    except ValueError:
+        return None
+    if start >= size or end < max(start, 0):
+        raise ValueError
+    return max(0, start), min(end, size - 1)
+
+
+def _etag(stat):
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in candidates or etag in candidates
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(mtime) <= since
+
+
+def serve_file(request, field_file, attachment=False):
+    """Réponse pour un FieldFile, après contrôle d'accès par l'appelant"""
+    if not field_file:
+        raise Http404('Aucun fichier')
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        # Stockage distant (S3…) : URL signée fournie par le stockage
+        return redirect(field_file.url)
+    return serve_path(request, path, field_file.name, attachment)
+
+
+def serve_path(request, path, name, attachment=False):
+    """`name` : chemin relatif à MEDIA_ROOT (pour X-Accel-Redirect)"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404('Fichier introuvable')
+
+    etag = _etag(stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': f'private, max-age={settings.MEDIA_CACHE_SECONDS}',
+        'Accept-Ranges': 'bytes',
+    }
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    filename = os.path.basename(name)
+    headers['Content-Disposition'] = (
+        f"{'attachment' if attachment else 'inline'}; filename*=UTF-8''{quote(filename)}"
+    )
+
+    offload = settings.MEDIA_SENDFILE
+    if offload:
+        response = HttpResponse(content_type=content_type, headers=headers)
+        if offload == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_PREFIX + name)
+        else:
+            response['X-Sendfile'] = path
+        return response
+
+    start, end = 0, stat.st_size - 1
+    status = 200
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (if_range is None or if_range in (etag, headers['Last-Modified'])):
+        try:
+            requested = parse_range(range_header, stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416, headers=headers)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if requested is not None:
+            start, end = requested
+            status = 206
+            headers['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    length = end - start + 1
+    headers['Content-Length'] = str(length)
+
+    if request.method == 'HEAD':
+        return HttpResponse(status=status, content_type=content_type, headers=headers)
+
+    file = open(path, 'rb')
+    file.seek(start)
+    # RangeFile n'a ni tell() ni name : FileResponse garde nos en-têtes
+    response = FileResponse(RangeFile(file, length), status=status, content_type=content_type)
+    for header, value in headers.items():
+        response[header] = value
+    return response
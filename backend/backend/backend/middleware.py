@@ -0,0 +1,202 @@
+import gzip
+import math
+import random
+import secrets
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : gzip seulement
+    brotli = None
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+# Déjà compressés : les recompresser coûte du CPU pour rien
+INCOMPRESSIBLE_TYPES = (
+    'image/', 'audio/', 'video/',
+    'application/zip', 'application/gzip', 'application/octet-stream',
+    'application/vnd.apache.parquet',
+)
+
+
+def accepted_encodings(header):
+    """Encodages acceptés par le client, avec leur qualité (q > 0)"""
+    encodings = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name and quality > 0:
+            encodings[name.strip().lower()] = quality
+    return encodings
+
+
+def pad_gzip(data, max_random_bytes):
+    """
+    Ajoute un nom de fichier (champ FNAME) de longueur aléatoire dans
+    l'en-tête gzip, comme django.utils.text.compress_string, mais pour un
+    niveau de compression quelconque
+    """
+    if not max_random_bytes:
+        return data
+    header = bytearray(data[:10])
+    header[3] = gzip.FNAME
+    return bytes(header) + b'a' * secrets.randbelow(max_random_bytes) + b'\x00' + data[10:]
+
+
+class CompressionMiddleware:
+    """
+    Compression négociée des réponses : brotli si le client l'accepte et que
+    le module est installé, sinon gzip. Les petites réponses
+    (< COMPRESSION_MIN_SIZE octets), les contenus déjà compressés et les
+    chemins de COMPRESSION_EXEMPT_PATHS (jetons) sont laissés tels quels.
+
+    Contre BREACH, gzip ajoute comme GZipMiddleware jusqu'à
+    COMPRESSION_GZIP_MAX_RANDOM_BYTES octets aléatoires dans l'en-tête.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.gzip_level = settings.COMPRESSION_GZIP_LEVEL
+        self.brotli_quality = settings.COMPRESSION_BROTLI_QUALITY
+        self.max_random_bytes = settings.COMPRESSION_GZIP_MAX_RANDOM_BYTES
+        self.exempt = tuple(settings.COMPRESSION_EXEMPT_PATHS)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header('Content-Encoding') or request.path.startswith(self.exempt):
+            return response
+        content_type = response.get('Content-Type', '')
+        if content_type.startswith(INCOMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self._choose(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            # Seul gzip est compressé au fil de l'eau
+            if encoding != 'gzip' or getattr(response, 'is_async', False):
+                return response
+            response.streaming_content = compress_sequence(
+                response.streaming_content, max_random_bytes=self.max_random_bytes
+            )
+            del response.headers['Content-Length']
+        else:
+            compressed = self._compress(encoding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # Le contenu change selon l'encodage : l'ETag fort devient faible
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def _choose(self, header):
+        encodings = accepted_encodings(header)
+        candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+        candidates = [name for name in candidates if name in encodings]
+        if not candidates:
+            return None
+        # À qualité égale, l'ordre de préférence du serveur l'emporte
+        return max(candidates, key=lambda name: (encodings[name], -candidates.index(name)))
+
+    def _compress(self, encoding, content):
+        if encoding == 'br':
+            return brotli.compress(content, quality=self.brotli_quality)
+        return pad_gzip(gzip.compress(content, compresslevel=self.gzip_level, mtime=0), self.max_random_bytes)
+
+
+class LoadSheddingMiddleware:
+    """
+    Refuse tôt (503 + Retry-After) les requêtes que le processus ne pourrait
+    pas servir à temps, pour que celles déjà acceptées restent rapides :
+    - trop de requêtes en cours (LOAD_SHED_MAX_IN_FLIGHT) ;
+    - attente en file trop longue, d'après l'en-tête X-Request-Start posé par
+      le proxy (`t=<secondes ou microsecondes>`, LOAD_SHED_QUEUE_MS) ;
+    - latence moyenne (moyenne mobile exponentielle) au-delà de
+      LOAD_SHED_LATENCY_MS : une part croissante des requêtes est refusée.
+      Une moyenne par classe de routes : les chemins lents par nature
+      (LOAD_SHED_SLOW_PATHS) ont la leur, avec son seuil
+      (LOAD_SHED_SLOW_LATENCY_MS), et ne font pas délester les autres.
+    Les chemins de LOAD_SHED_EXEMPT_PATHS ne sont jamais refusés.
+    """
+    smoothing = 0.1
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.max_in_flight = settings.LOAD_SHED_MAX_IN_FLIGHT
+        self.max_latency = {
+            'default': settings.LOAD_SHED_LATENCY_MS / 1000,
+            'slow': settings.LOAD_SHED_SLOW_LATENCY_MS / 1000,
+        }
+        self.max_queue = settings.LOAD_SHED_QUEUE_MS / 1000
+        self.exempt = tuple(settings.LOAD_SHED_EXEMPT_PATHS)
+        self.slow = tuple(settings.LOAD_SHED_SLOW_PATHS)
+        self.in_flight = 0
+        self.latency = {'default': 0.0, 'slow': 0.0}
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        if request.path.startswith(self.exempt):
+            return self.get_response(request)
+
+        route_class = 'slow' if request.path.startswith(self.slow) else 'default'
+        reason = self._overloaded(request, route_class)
+        if reason is not None:
+            response = JsonResponse({'error': 'Service surchargé, réessayez plus tard', 'reason': reason},
+                                    status=503)
+            response['Retry-After'] = str(max(1, math.ceil(self.latency[route_class])))
+            return response
+
+        with self.lock:
+            self.in_flight += 1
+        start = time.monotonic()
+        try:
+            return self.get_response(request)
+        finally:
+            elapsed = time.monotonic() - start
+            with self.lock:
+                self.in_flight -= 1
+                self.latency[route_class] += self.smoothing * (elapsed - self.latency[route_class])
+
+    def _overloaded(self, request, route_class):
+        if self.in_flight >= self.max_in_flight:
+            return 'in_flight'
+        queued = self._queue_time(request.META.get('HTTP_X_REQUEST_START'))
+        if queued is not None and queued > self.max_queue:
+            return 'queue'
+        latency, max_latency = self.latency[route_class], self.max_latency[route_class]
+        if latency > max_latency:
+            # Refus proportionnel au dépassement : 2x le seuil -> 50 %
+            if random.random() < 1 - max_latency / latency:
+                return 'latency'
+        return None
+
+    def _queue_time(self, header):
+        if not header:
+            return None
+        try:
+            stamp = float(header.removeprefix('t='))
+        except ValueError:
+            return None
+        if stamp > 1e12:  # microsecondes (nginx : t=${msec} en secondes)
+            stamp /= 1e6
+        return max(0.0, time.time() - stamp)
@@ -0,0 +1,47 @@
+"""
+Pagination de l'admin sur les grandes tables.
+
+Le paginateur de Django commence par un COUNT(*) exact, qui parcourt toute
+la table (ici, toutes les partitions mensuelles des incidents) à chaque
+ouverture d'une liste. EstimatedCountPaginator :
+- sans filtre : lit l'estimation des statistiques PostgreSQL (reltuples,
+  partitions comprises), mise à jour par ANALYZE / autovacuum ; sous
+  ADMIN_ESTIMATED_COUNT_THRESHOLD lignes, le comptage exact reste rapide
+  et est conservé ;
+- avec filtre : compte au plus ADMIN_FILTERED_COUNT_LIMIT lignes ; au-delà,
+  seules les premières pages sont proposées (affiner le filtre).
+À utiliser avec `show_full_result_count = False`, sans quoi l'admin fait
+son propre COUNT(*) sur la table entière.
+"""
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+ESTIMATE_SQL = """
+    SELECT COALESCE(sum(GREATEST(c.reltuples, 0)), 0)::bigint
+    FROM pg_class c
+    WHERE c.oid = %(table)s::regclass
+       OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %(table)s::regclass)
+"""
+
+
+def estimated_count(model, using='default'):
+    with connections[using].cursor() as cursor:
+        cursor.execute(ESTIMATE_SQL, {'table': model._meta.db_table})
+        return cursor.fetchone()[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None:
+            return super().count
+        if not query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+            return super().count
+        return queryset.order_by()[:settings.ADMIN_FILTERED_COUNT_LIMIT].count()
@@ -0,0 +1,277 @@
+"""
+Images redimensionnées à la demande (avatars, vignettes de liste).
+
+Les vues de médias acceptent `?w=&h=&fmt=webp|jpeg|png` : l'image est
+réduite pour tenir dans w x h (jamais agrandie), puis servie comme un
+média ordinaire (backend.media, sendfile / X-Accel-Redirect compris).
+
+- Les dimensions sont arrondies au multiple de SIZE_STEP supérieur et
+  bornées par RENDITION_MAX_DIM : le nombre de déclinaisons par image
+  reste limité.
+- Les déclinaisons sont gardées sur disque sous MEDIA_ROOT/renditions/,
+  nommées d'après l'original (chemin, date, taille) : un original
+  remplacé donne de nouvelles déclinaisons, les anciennes disparaissent
+  avec l'éviction. Le cache est borné à RENDITION_CACHE_MAX_BYTES ; les
+  moins récemment servies (date d'accès, mise à jour explicitement) sont
+  supprimées en premier.
+- Le redimensionnement a lieu dans un pool de RENDITION_WORKERS threads
+  (Pillow libère le GIL) ; au-delà de RENDITION_MAX_PENDING déclinaisons
+  en attente, la requête reçoit un 503.
+- Les requêtes simultanées pour la même déclinaison attendent le même
+  calcul. Entre processus, l'écriture atomique (os.replace) suffit : au
+  pire, deux processus calculent la même image.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.urls import reverse
+
+from .media import serve_file, serve_path
+
+RENDITION_PREFIX = 'renditions/'
+SIZE_STEP = 16
+# Date d'accès mise à jour au plus une fois par intervalle
+TOUCH_INTERVAL = 60
+# Après éviction, le cache redescend à cette fraction de sa taille maximale
+EVICT_TO = 0.9
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'png': ('PNG', {'optimize': True}),
+}
+
+
+class RenditionError(Exception):
+    pass
+
+
+class RenditionBusy(Exception):
+    pass
+
+
+def _snap(value):
+    return min(settings.RENDITION_MAX_DIM, -(-value // SIZE_STEP) * SIZE_STEP)
+
+
+def parse_params(query):
+    """(w, h, fmt) demandés, ou None pour l'original"""
+    if 'w' not in query and 'h' not in query:
+        return None
+    try:
+        width = int(query.get('w') or 0)
+        height = int(query.get('h') or 0)
+    except ValueError:
+        raise RenditionError('w et h doivent être des entiers')
+    if width < 0 or height < 0 or not (width or height):
+        raise RenditionError('w ou h doit être positif')
+    fmt = query.get('fmt', 'webp').lower()
+    if fmt == 'jpg':
+        fmt = 'jpeg'
+    if fmt not in FORMATS:
+        raise RenditionError(f"fmt doit être l'un de : {', '.join(FORMATS)}")
+    # Une seule dimension : l'autre n'est pas contrainte
+    return (
+        _snap(width) if width else settings.RENDITION_MAX_DIM,
+        _snap(height) if height else settings.RENDITION_MAX_DIM,
+        fmt,
+    )
+
+
+def _render(source, target, width, height, fmt):
+    # Pillow n'est chargé qu'au premier redimensionnement : les serializers
+    # importent ce module (rendition_url) dans chaque processus
+    from PIL import Image, ImageOps
+
+    pil_format, options = FORMATS[fmt]
+    try:
+        with Image.open(source) as image:
+            # JPEG : décodage directement à 1/2, 1/4 ou 1/8 de la taille
+            # (côté le plus grand : l'orientation EXIF peut permuter w et h)
+            side = max(width, height)
+            image.draft('RGB', (side, side))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((width, height), Image.Resampling.LANCZOS)
+            if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                image = image.convert('RGBA')
+            directory = os.path.dirname(target)
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    image.save(out, pil_format, **options)
+                os.replace(tmp, target)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+    except FileNotFoundError:
+        # Original supprimé entre-temps : traité par serve_image
+        raise
+    except (OSError, Image.DecompressionBombError) as exc:
+        # OSError : fichier tronqué ou corrompu, détecté au décodage (draft,
+        # thumbnail, save) ; UnidentifiedImageError en est une sous-classe
+        raise RenditionError(f'Image illisible : {exc}')
+    return os.path.getsize(target)
+
+
+class DiskCache:
+    """Répertoire de déclinaisons borné en taille, éviction LRU"""
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    def touch(self, path):
+        try:
+            stat = os.stat(path)
+            now = time.time()
+            if now - stat.st_atime > TOUCH_INTERVAL:
+                # Date de modification conservée : l'ETag ne change pas
+                os.utime(path, (now, stat.st_mtime))
+        except FileNotFoundError:
+            pass
+
+    def added(self, size):
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_and_evict()
+                return
+            self._size += size
+            if self._size > self.max_bytes:
+                self._size = self._scan_and_evict()
+
+    def _scan_and_evict(self):
+        # La taille réelle tient compte des autres processus
+        files = []
+        total = 0
+        for directory, _dirs, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_atime, stat.st_size, path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return total
+        files.sort()
+        limit = self.max_bytes * EVICT_TO
+        for _atime, size, path in files:
+            if total <= limit:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
+
+
+class RenditionService:
+    def __init__(self):
+        self.root = os.path.join(settings.MEDIA_ROOT, RENDITION_PREFIX)
+        self.cache = DiskCache(self.root, settings.RENDITION_CACHE_MAX_BYTES)
+        self._pool = ThreadPoolExecutor(max_workers=settings.RENDITION_WORKERS,
+                                        thread_name_prefix='rendition')
+        self._inflight = {}
+        # Réentrant : un futur déjà terminé appelle _done() dans le thread courant
+        self._lock = threading.RLock()
+
+    def name(self, source, width, height, fmt):
+        stat = os.stat(source)
+        key = hashlib.sha256(
+            f'{source}:{stat.st_mtime_ns}:{stat.st_size}:{width}x{height}:{fmt}'.encode()
+        ).hexdigest()[:32]
+        return f'{RENDITION_PREFIX}{key[:2]}/{key}.{fmt}'
+
+    def get(self, source, width, height, fmt):
+        """Chemin relatif à MEDIA_ROOT de la déclinaison, calculée si besoin"""
+        name = self.name(source, width, height, fmt)
+        target = os.path.join(settings.MEDIA_ROOT, name)
+        if os.path.exists(target):
+            self.cache.touch(target)
+            return name
+        with self._lock:
+            future = self._inflight.get(name)
+            if future is None:
+                if len(self._inflight) >= settings.RENDITION_MAX_PENDING:
+                    raise RenditionBusy()
+                future = self._pool.submit(self._build, source, target, width, height, fmt)
+                self._inflight[name] = future
+                future.add_done_callback(lambda _future: self._done(name))
+        try:
+            future.result(timeout=settings.RENDITION_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            raise RenditionBusy()
+        return name
+
+    def _done(self, name):
+        with self._lock:
+            self._inflight.pop(name, None)
+
+    def _build(self, source, target, width, height, fmt):
+        if os.path.exists(target):
+            return
+        self.cache.added(_render(source, target, width, height, fmt))
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = RenditionService()
+    return _service
+
+
+def serve_image(request, field_file):
+    """Comme media.serve_file, avec une déclinaison si ?w= ou ?h= est fourni"""
+    try:
+        params = parse_params(request.GET)
+    except RenditionError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    if params is None or not field_file:
+        return serve_file(request, field_file)
+    try:
+        source = field_file.path
+    except NotImplementedError:
+        # Stockage distant : pas de redimensionnement local
+        return redirect(field_file.url)
+    try:
+        name = get_service().get(source, *params)
+    except FileNotFoundError:
+        return serve_file(request, field_file)
+    except RenditionError as exc:
+        return JsonResponse({'error': str(exc)}, status=415)
+    except RenditionBusy:
+        response = JsonResponse({'error': 'Redimensionnement surchargé, réessayez plus tard'}, status=503)
+        response['Retry-After'] = '1'
+        return response
+    return serve_path(request, os.path.join(settings.MEDIA_ROOT, name), name)
+
+
+def media_url(request, viewname, kwargs, query=''):
+    """URL absolue d'un média servi par une vue protégée (jamais MEDIA_URL)"""
+    url = reverse(viewname, kwargs=kwargs) + query
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def rendition_url(request, viewname, kwargs, size, fmt='webp'):
+    """URL absolue d'une déclinaison carrée de `size` pixels au plus"""
+    return media_url(request, viewname, kwargs, f'?w={size}&h={size}&fmt={fmt}')
@@ -1,7 +1,8 @@
 """
 Django settings for backend project.
 
-Generated by 'django-admin startproject' using Django 4.2.11.
+Generated by 'django-admin startproject' using Django 4.2.11 ; requires
+Django 5.1+ (db_default, pool psycopg 3 via OPTIONS['pool']).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/topics/settings/
@@ -11,8 +12,15 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
 
+import django
+from django.core.exceptions import ImproperlyConfigured
+
+if django.VERSION < (5, 1):
+    raise ImproperlyConfigured("Django>=5.1 requis (db_default, OPTIONS['pool'])")
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,8 +45,11 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'incidents',
     'users',
+    'jobs',
+    'dispatch',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -48,6 +59,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'backend.middleware.CompressionMiddleware',
+    'backend.middleware.LoadSheddingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -56,6 +69,52 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Compression des réponses (backend/middleware.py) : brotli si installé, sinon gzip
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+# gzip : jusqu'à N octets aléatoires dans l'en-tête (comme GZipMiddleware),
+# pour que la taille ne trahisse pas un secret (BREACH)
+COMPRESSION_GZIP_MAX_RANDOM_BYTES = 100
+# Réponses portant des jetons JWT : jamais compressées, brotli n'ayant pas de
+# bourrage équivalent
+COMPRESSION_EXEMPT_PATHS = [
+    '/api/users/token/',
+    '/api/users/login/',
+    '/api/users/biometric-login/',
+    '/api/users/register/',
+    '/api/users/admin/register/',
+]
+
+# Délestage (backend/middleware.py) : 503 + Retry-After au-delà de ces seuils, par processus
+LOAD_SHED_MAX_IN_FLIGHT = int(os.environ.get('LOAD_SHED_MAX_IN_FLIGHT', '64'))
+LOAD_SHED_LATENCY_MS = int(os.environ.get('LOAD_SHED_LATENCY_MS', '2000'))
+LOAD_SHED_QUEUE_MS = int(os.environ.get('LOAD_SHED_QUEUE_MS', '1000'))
+LOAD_SHED_EXEMPT_PATHS = ['/admin/']
+# Requêtes lentes par nature (agrégats, rendus) : latence moyenne suivie à
+# part, pour ne pas délester les requêtes ordinaires à cause d'elles
+LOAD_SHED_SLOW_PATHS = [
+    '/api/incidents/hotspots/',
+    '/api/incidents/heatmap.png',
+    '/api/incidents/stats/',
+    '/api/users/stats/',
+]
+LOAD_SHED_SLOW_LATENCY_MS = int(os.environ.get('LOAD_SHED_SLOW_LATENCY_MS', '10000'))
+
+# Limitation de débit par seau à jetons (backend/throttling.py)
+RATE_LIMIT_STORE = (
+    'backend.throttling.CacheBucketStore' if os.environ.get('REDIS_URL')
+    else 'backend.throttling.LocalBucketStore'
+)
+RATE_LIMITS = {
+    # capacity : rafale tolérée ; per_minute : remplissage
+    'ingest': {'capacity': 20, 'per_minute': 10},
+    'auth': {'capacity': 10, 'per_minute': 5},
+    'register': {'capacity': 5, 'per_minute': 2},
+}
+# Un jeton supplémentaire par tranche téléversée
+RATE_LIMIT_UPLOAD_UNIT = 1024 * 1024
+
 CORS_ALLOW_ALL_ORIGINS = True
 
 # OU configurer des origines spécifiques (recommandé pour la production)
@@ -96,19 +155,77 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connexions : pool psycopg 3 (Django 5.1+) quand psycopg_pool est installé,
+# sinon connexions persistantes. Dans les deux cas, CONN_HEALTH_CHECKS : avec
+# le pool, Django le traduit en check=ConnectionPool.check_connection
+# (vérification à chaque sortie du pool) ; ne pas passer `check` dans
+# OPTIONS['pool'], Django le fournit déjà.
+# asgi.py force DB_CONN_MAX_AGE=0 sans pool : sous ASGI une connexion
+# persistante n'est jamais réutilisée d'une requête à l'autre.
+DB_POOL = (
+    os.environ.get('DB_POOL', '1') == '1'
+    and importlib.util.find_spec('psycopg_pool') is not None
+)
+DB_POOL_OPTIONS = {
+    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+    'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', '600')),
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.contrib.gis.db.backends.postgis',
-        'NAME': 'mydatabase',
-        'USER': 'moussaa',
-        'PASSWORD': 'Moussa123',
-        'HOST': 'localhost',
-        'PORT': '5432',
-       
-        
+        'NAME': os.environ.get('DB_NAME', 'mydatabase'),
+        'USER': os.environ.get('DB_USER', 'moussaa'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'Moussa123'),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', '300')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'pool': DB_POOL_OPTIONS} if DB_POOL else {},
     }
 }
 
+# Réplicas en lecture (réplication physique de la base 'default'), par ex.
+# DB_REPLICA_HOSTS=localhost:5433,localhost:5434. Sans réplica, aucun routeur :
+# tout passe par 'default'. Voir backend/db_router.py.
+DATABASE_REPLICAS = []
+for i, replica in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    host, _, port = replica.strip().partition(':')
+    alias = f'replica_{i + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'OPTIONS': {'pool': dict(DB_POOL_OPTIONS)} if DB_POOL else {},
+        # Les tests n'ont pas de réplication : le réplica pointe sur la base de test
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['backend.db_router.PrimaryReplicaRouter']
+    MIDDLEWARE.insert(0, 'backend.db_router.ReplicaRoutingMiddleware')
+# Durée pendant laquelle les lectures d'un utilisateur restent sur la
+# primaire après l'une de ses écritures (doit couvrir le retard de réplication)
+REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', '10'))
+
+# Cache partagé entre processus (épinglage des lectures sur la primaire, etc.)
+# si REDIS_URL est défini, sinon cache mémoire local au processus
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+elif DATABASE_REPLICAS and os.environ.get('DB_REPLICA_LOCAL_PINS') != '1':
+    # Les épinglages (backend.db_router.pin_user) doivent être vus par tous
+    # les processus : dans un cache local, une lecture servie par un autre
+    # worker que l'écriture part sur un réplica en retard.
+    # DB_REPLICA_LOCAL_PINS=1 l'autorise pour un serveur à un seul processus
+    raise ImproperlyConfigured("DB_REPLICA_HOSTS nécessite un cache partagé (REDIS_URL)")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -133,6 +250,46 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 
+# Listes de l'admin (backend.pagination) : au-delà de ce nombre de lignes,
+# le total affiché est l'estimation de PostgreSQL ; une liste filtrée compte
+# au plus ADMIN_FILTERED_COUNT_LIMIT lignes
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000
+ADMIN_FILTERED_COUNT_LIMIT = 10_000
+
+# Abonnements par zone (incidents.geofence) : taille des cellules de l'index
+# en mémoire et délai de prise en compte des modifications entre processus
+GEOFENCE_CELL_DEG = 0.01
+GEOFENCE_REFRESH_SECONDS = 5
+
+# Géocodage inverse hors ligne (incidents.gazetteer) : arrondi des
+# coordonnées avant recherche (~11 m), taille du cache LRU par processus et
+# distance maximale à la rue retenue
+GAZETTEER_QUANTUM_DEG = 0.0001
+GAZETTEER_CACHE_SIZE = 100_000
+GAZETTEER_STREET_MAX_M = 75
+
+# Répartition des unités (application dispatch) : écriture groupée des
+# positions, âge maximal d'une position utilisable et nombre d'unités proposées
+DISPATCH_FLUSH_SECONDS = 2
+DISPATCH_FLUSH_MAX = 500
+DISPATCH_STALE_SECONDS = 120
+DISPATCH_MAX_K = 20
+
+# Synchro hors ligne (incidents.offline_sync)
+OFFLINE_MANIFEST_MAX_ITEMS = 500
+OFFLINE_SYNC_BATCH_SIZE = 100
+OFFLINE_BLOB_MAX_BYTES = 20 * 1024 * 1024
+
+# File de jobs en base (application jobs, `manage.py run_workers`)
+JOBS_BACKOFF_BASE_SECONDS = 10
+JOBS_BACKOFF_MAX_SECONDS = 3600
+# Un job « en cours » depuis plus longtemps est considéré abandonné
+JOBS_LOCK_TIMEOUT_SECONDS = 600
+# Renouvellement du verrou d'un job en cours (jobs.worker.Heartbeat)
+JOBS_HEARTBEAT_SECONDS = 60
+JOBS_KEEP_DAYS = 7
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -159,10 +316,20 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom user model
 AUTH_USER_MODEL = 'users.CustomUser'
 
+# Chemins explicites des bibliothèques GDAL / GEOS (ex. /usr/lib/x86_64-linux-gnu/libgdal.so.32) :
+# sans eux, GeoDjango les cherche avec ctypes.util.find_library, qui lance
+# ldconfig ou gcc au démarrage de chaque processus. `manage.py
+# startup_benchmark` affiche les chemins trouvés.
+GDAL_LIBRARY_PATH = os.environ.get('GDAL_LIBRARY_PATH') or None
+GEOS_LIBRARY_PATH = os.environ.get('GEOS_LIBRARY_PATH') or None
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.JWTAuthentication',
     ],
+    # Nombre de proxys de confiance devant l'application (X-Forwarded-For) ;
+    # 0 : REMOTE_ADDR. Utilisé pour les limites de débit par adresse
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', '0')),
 }
 
 from datetime import timedelta
@@ -172,6 +339,56 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
+# Révocation des jetons (users.revocation) : délai de propagation entre
+# processus et reconstruction complète de la copie en mémoire
+REVOCATION_REFRESH_SECONDS = 5
+REVOCATION_REBUILD_SECONDS = 3600
+
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Envoi des médias par les vues protégées (backend.media) : '' (FileResponse,
+# os.sendfile sous gunicorn), 'x-accel-redirect' (nginx, MEDIA_ROOT exposé en
+# `internal` sous MEDIA_ACCEL_PREFIX) ou 'x-sendfile' (Apache, lighttpd)
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+MEDIA_CACHE_SECONDS = 3600
+
+# Images redimensionnées à la demande (backend.renditions), gardées sous
+# MEDIA_ROOT/renditions/ dans la limite de RENDITION_CACHE_MAX_BYTES
+RENDITION_CACHE_MAX_BYTES = int(os.environ.get('RENDITION_CACHE_MAX_BYTES', str(1024 ** 3)))
+RENDITION_WORKERS = int(os.environ.get('RENDITION_WORKERS', '2'))
+RENDITION_MAX_PENDING = 32
+RENDITION_TIMEOUT_SECONDS = 10
+RENDITION_MAX_DIM = 2048
+# Tailles proposées par les serializers (avatars, vignettes de liste)
+RENDITION_AVATAR_SIZE = 128
+RENDITION_THUMBNAIL_SIZE = 320
+
+# Archivage à froid des anciens incidents (manage.py archive_incidents)
+INCIDENT_ARCHIVE_ROOT = os.path.join(BASE_DIR, 'archive')
+INCIDENT_ARCHIVE_AFTER_DAYS = 365
+
+# Détection des doublons à l'ingestion : même type, à moins de X mètres et Y minutes
+INCIDENT_DEDUP_RADIUS_M = 200
+INCIDENT_DEDUP_WINDOW_MINUTES = 30
+
+# Emprise de la ville (lng_min, lat_min, lng_max, lat_max) pour les grilles de densité
+INCIDENT_MAP_BBOX = (-16.05, 18.00, -15.88, 18.18)
+
+# Points chauds : taille de cellule, largeur du noyau gaussien (mètres Web
+# Mercator), seuil en écarts-types et intervalle de reconstruction complète,
+# marge de relecture des incidents validés en retard (incidents.hotspots)
+HOTSPOT_CELL_M = 100
+HOTSPOT_BANDWIDTH_M = 250
+HOTSPOT_THRESHOLD_STD = 2.0
+HOTSPOT_REBUILD_SECONDS = 600
+HOTSPOT_OVERLAP_SECONDS = 60
+
+# Carte de chaleur PNG (incidents.heatmap) : largeur du flou en pixels,
+# taille maximale, durée de cache et niveau de compression zlib (1-9)
+HEATMAP_SIGMA_PX = 4
+HEATMAP_MAX_DIM = 2048
+HEATMAP_CACHE_SECONDS = 300
+HEATMAP_PNG_COMPRESS_LEVEL = 3
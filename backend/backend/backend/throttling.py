@@ -0,0 +1,150 @@
+"""
+Limitation de débit par seau à jetons (token bucket).
+
+Chaque portée (settings.RATE_LIMITS) a une capacité (rafale tolérée) et un
+débit de remplissage. Un seau par adresse IP et, si le client est
+authentifié, un seau par utilisateur : les deux doivent avoir assez de
+jetons. L'adresse est celle vue par DRF : REMOTE_ADDR, ou X-Forwarded-For
+derrière exactement NUM_PROXIES proxys de confiance (settings) ; un en-tête
+fourni par le client n'est jamais cru tel quel. Une requête refusée reçoit un 429 avec Retry-After (géré par DRF à
+partir de wait()).
+
+Le stockage est configurable (settings.RATE_LIMIT_STORE) :
+- LocalBucketStore : en mémoire, propre au processus ;
+- CacheBucketStore : cache Django partagé (Redis), commun à tous les
+  processus. La lecture/écriture n'est pas atomique : sous forte
+  concurrence quelques requêtes de plus peuvent passer, ce qui reste
+  acceptable pour une limite de débit.
+"""
+import math
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+
+class LocalBucketStore:
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost):
+        """Retire `cost` jetons ; renvoie (accepté, secondes avant assez de jetons)"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, stamp = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * rate)
+            if tokens >= cost:
+                self.buckets[key] = (tokens - cost, now)
+                allowed, wait = True, 0.0
+            else:
+                self.buckets[key] = (tokens, now)
+                allowed, wait = False, (cost - tokens) / rate
+            if len(self.buckets) > self.max_keys:
+                self._evict(now, capacity, rate)
+        return allowed, wait
+
+    def _evict(self, now, capacity, rate):
+        # Un seau redevenu plein équivaut à un seau absent
+        full_after = capacity / rate
+        for key, (_, stamp) in list(self.buckets.items()):
+            if now - stamp >= full_after:
+                del self.buckets[key]
+
+
+class CacheBucketStore:
+    def take(self, key, capacity, rate, cost):
+        now = time.time()
+        tokens, stamp = cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + max(0.0, now - stamp) * rate)
+        if tokens >= cost:
+            tokens -= cost
+            allowed, wait = True, 0.0
+        else:
+            allowed, wait = False, (cost - tokens) / rate
+        cache.set(key, (tokens, now), math.ceil(capacity / rate) + 1)
+        return allowed, wait
+
+
+@lru_cache(maxsize=None)
+def get_store():
+    return import_string(settings.RATE_LIMIT_STORE)()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+    # Méthodes limitées (None : toutes)
+    methods = None
+
+    def __init__(self):
+        rate = settings.RATE_LIMITS[self.scope]
+        self.capacity = rate['capacity']
+        self.rate = rate['per_minute'] / 60
+        self.wait_seconds = None
+
+    def cost(self, request):
+        return 1
+
+    def keys(self, request):
+        keys = [f'ip:{self.get_ident(request)}']
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            keys.append(f'user:{user.pk}')
+        return keys
+
+    def allow_request(self, request, view):
+        if self.methods is not None and request.method not in self.methods:
+            return True
+        cost = min(self.cost(request), self.capacity)
+        store = get_store()
+        for key in self.keys(request):
+            allowed, wait = store.take(f'throttle:{self.scope}:{key}', self.capacity, self.rate, cost)
+            if not allowed:
+                self.wait_seconds = wait
+                return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IngestThrottle(TokenBucketThrottle):
+    """Création d'incidents : un envoi coûte un jeton de plus par Mo téléversé"""
+    scope = 'ingest'
+    methods = ('POST', 'PUT')
+
+    def cost(self, request):
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        return 1 + length // settings.RATE_LIMIT_UPLOAD_UNIT
+
+
+class AuthThrottle(TokenBucketThrottle):
+    """
+    Connexions (hachage de mot de passe / jeton biométrique). Un seau de
+    plus par nom d'utilisateur soumis : changer d'adresse ne permet pas
+    d'essayer plus de mots de passe sur un même compte.
+    """
+    scope = 'auth'
+
+    def keys(self, request):
+        keys = super().keys(request)
+        try:
+            username = request.data.get('username')
+        except AttributeError:
+            username = None
+        if isinstance(username, str) and username.strip():
+            keys.append(f'account:{username.strip().lower()[:150]}')
+        return keys
+
+
+class RegisterThrottle(TokenBucketThrottle):
+    scope = 'register'
+    methods = ('POST',)
@@ -25,6 +25,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/users/', include('users.urls')),
     path('api/incidents/', include('incidents.urls')),
+    path('api/dispatch/', include('dispatch.urls')),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import Responder
+
+
+@admin.register(Responder)
+class ResponderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'unit_type', 'is_available', 'location_updated_at')
+    list_filter = ('unit_type', 'is_available')
+    search_fields = ('name',)
+    readonly_fields = ('location_updated_at',)
+    raw_id_fields = ('user',)
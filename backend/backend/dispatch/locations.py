@@ -0,0 +1,111 @@
+"""
+Positions des unités, regroupées en mémoire et écrites par lots.
+
+Chaque processus garde la dernière position reçue de chaque unité. Toutes
+les DISPATCH_FLUSH_SECONDS, ou dès DISPATCH_FLUSH_MAX unités en attente,
+une seule requête UPDATE ... FROM unnest(...) les écrit : des centaines de
+véhicules qui émettent toutes les quelques secondes ne font que quelques
+écritures par seconde. Une position plus ancienne que celle déjà en base
+est ignorée (l'ordre d'arrivée n'est pas garanti entre processus).
+
+Les écritures sont faites par un thread du processus, démarré à la
+première position reçue : le tampon est vidé même si plus aucune requête
+n'arrive (bascule du répartiteur de charge, période calme), et la requête
+qui a apporté la position ne voit jamais une erreur d'écriture (journalisée,
+positions gardées pour l'essai suivant). La recherche des unités proches
+vide d'abord le tampon du processus ; les positions reçues par les autres
+sont visibles après au plus DISPATCH_FLUSH_SECONDS. Le tampon est vidé à la
+sortie du processus ; un arrêt brutal perd au plus les positions en
+attente, remplacées par les suivantes.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .models import Responder
+
+FLUSH_SQL = f"""
+    UPDATE {Responder._meta.db_table} AS r
+    SET location = ST_SetSRID(ST_MakePoint(v.lng, v.lat), 4326),
+        location_updated_at = v.at
+    FROM unnest(%s::bigint[], %s::float8[], %s::float8[], %s::timestamptz[]) AS v(id, lng, lat, at)
+    WHERE r.id = v.id
+      AND (r.location_updated_at IS NULL OR r.location_updated_at < v.at)
+"""
+
+
+logger = logging.getLogger(__name__)
+
+
+class LocationBuffer:
+    def __init__(self, background=True):
+        # id de l'unité -> (lng, lat, horodatage)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.background = background
+        self._thread = None
+        self._wake = threading.Event()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _merge(self, responder_id, position):
+        current = self._pending.get(responder_id)
+        if current is None or current[2] <= position[2]:
+            self._pending[responder_id] = position
+
+    def add(self, responder_id, lng, lat, at):
+        with self._lock:
+            self._merge(responder_id, (lng, lat, at))
+            full = len(self._pending) >= settings.DISPATCH_FLUSH_MAX
+            if self.background and self._thread is None:
+                self._start()
+        if full:
+            self._wake.set()
+
+    def _start(self):
+        # Démarré dans le processus qui reçoit les positions (après le fork
+        # des serveurs à pré-fork), sous self._lock
+        self._thread = threading.Thread(target=self._run, name='dispatch-locations', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush_logged)
+
+    def _run(self):
+        while True:
+            self._wake.wait(settings.DISPATCH_FLUSH_SECONDS)
+            self._wake.clear()
+            # Connexion propre à ce thread : CONN_MAX_AGE et coupures respectés
+            close_old_connections()
+            self.flush_logged()
+
+    def flush_logged(self):
+        try:
+            return self.flush()
+        except Exception:
+            logger.exception("Écriture des positions des unités en échec, nouvel essai au prochain cycle")
+            return 0
+
+    def flush(self):
+        """Écrit les positions en attente ; renvoie le nombre d'unités mises à jour en base"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        ids = list(pending)
+        lngs, lats, ats = (list(column) for column in zip(*pending.values()))
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(FLUSH_SQL, [ids, lngs, lats, ats])
+                return cursor.rowcount
+        except Exception:
+            # Rendues au tampon, sauf si plus récentes entre-temps
+            with self._lock:
+                for responder_id, position in pending.items():
+                    self._merge(responder_id, position)
+            raise
+
+
+location_buffer = LocationBuffer()
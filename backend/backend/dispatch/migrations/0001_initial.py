@@ -0,0 +1,32 @@
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Responder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('unit_type', models.CharField(choices=[('fire_engine', 'Pompiers'), ('ambulance', 'Ambulance'), ('police', 'Police'), ('tow_truck', 'Dépanneuse')], max_length=20)),
+                ('is_available', models.BooleanField(default=True)),
+                ('location', django.contrib.gis.db.models.fields.PointField(blank=True, null=True, spatial_index=False, srid=4326)),
+                ('location_updated_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='responder', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [django.contrib.postgres.indexes.GistIndex(condition=models.Q(('is_available', True)), fields=['location'], name='dispatch_resp_avail_gist')],
+            },
+        ),
+    ]
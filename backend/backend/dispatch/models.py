@@ -0,0 +1,47 @@
+from django.contrib.gis.db import models as gis_models
+from django.contrib.postgres.indexes import GistIndex
+from django.db import models
+from django.db.models import Q
+
+from users.models import CustomUser
+
+
+class Responder(models.Model):
+    """Unité d'intervention (véhicule, équipe) et sa dernière position connue"""
+    FIRE_ENGINE = 'fire_engine'
+    AMBULANCE = 'ambulance'
+    POLICE = 'police'
+    TOW_TRUCK = 'tow_truck'
+    UNIT_TYPES = [
+        (FIRE_ENGINE, 'Pompiers'),
+        (AMBULANCE, 'Ambulance'),
+        (POLICE, 'Police'),
+        (TOW_TRUCK, 'Dépanneuse'),
+    ]
+    # Unités pouvant intervenir sur chaque type d'incident
+    UNIT_TYPES_BY_INCIDENT = {
+        'fire': [FIRE_ENGINE, AMBULANCE],
+        'accident': [AMBULANCE, POLICE, TOW_TRUCK, FIRE_ENGINE],
+        'theft': [POLICE],
+        'other': [POLICE],
+    }
+
+    name = models.CharField(max_length=100)
+    unit_type = models.CharField(max_length=20, choices=UNIT_TYPES)
+    # Compte de l'appareil embarqué qui envoie les positions
+    user = models.OneToOneField(
+        CustomUser, null=True, blank=True, on_delete=models.SET_NULL, related_name='responder',
+    )
+    is_available = models.BooleanField(default=True)
+    location = gis_models.PointField(srid=4326, null=True, blank=True, spatial_index=False)
+    location_updated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Recherche des plus proches (KNN, opérateur <->) parmi les unités
+            # disponibles uniquement
+            GistIndex(fields=['location'], condition=Q(is_available=True), name='dispatch_resp_avail_gist'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_unit_type_display()})"
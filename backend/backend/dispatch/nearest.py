@@ -0,0 +1,50 @@
+"""
+Unités disponibles les plus proches d'un incident.
+
+La requête ordonne par l'opérateur PostGIS <-> (GeometryDistance) : avec
+l'index GiST partiel sur les unités disponibles, PostgreSQL parcourt
+l'index dans l'ordre des distances (KNN) et s'arrête après LIMIT lignes,
+sans calculer la distance de toute la flotte.
+
+<-> compare des distances en degrés, ce qui allonge un peu les écarts
+nord-sud : on lit CANDIDATE_FACTOR fois plus d'unités que demandé, puis
+on les classe par distance réelle (haversine).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import GeometryDistance
+from django.utils import timezone
+
+from backend import db_router
+from incidents.geo import haversine_m
+
+from .locations import location_buffer
+from .models import Responder
+
+CANDIDATE_FACTOR = 3
+
+
+def suitable_unit_types(incident_type):
+    return Responder.UNIT_TYPES_BY_INCIDENT.get(incident_type, [Responder.POLICE])
+
+
+def nearest_responders(point, incident_type, k):
+    """Les `k` unités disponibles adaptées les plus proches, avec `distance_m`"""
+    location_buffer.flush()
+    fresh_since = timezone.now() - timedelta(seconds=settings.DISPATCH_STALE_SECONDS)
+    # Positions en direct : lues sur le primaire, pas sur un réplica en retard
+    candidates = list(
+        Responder.objects.using(db_router.PRIMARY).filter(
+            is_available=True,
+            unit_type__in=suitable_unit_types(incident_type),
+            location__isnull=False,
+            location_updated_at__gte=fresh_since,
+        ).annotate(
+            knn=GeometryDistance('location', point)
+        ).order_by('knn')[:k * CANDIDATE_FACTOR]
+    )
+    for responder in candidates:
+        responder.distance_m = haversine_m(point.y, point.x, responder.location.y, responder.location.x)
+    candidates.sort(key=lambda responder: responder.distance_m)
+    return candidates[:k]
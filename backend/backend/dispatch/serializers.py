@@ -0,0 +1,47 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from .models import Responder
+
+
+class ResponderSerializer(serializers.ModelSerializer):
+    # Même format que les incidents : "lat,lng"
+    location = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Responder
+        fields = ['id', 'name', 'unit_type', 'user', 'is_available', 'location', 'location_updated_at']
+        read_only_fields = ['location_updated_at']
+
+    def get_location(self, obj):
+        if obj.location:
+            return f"{obj.location.y},{obj.location.x}"
+        return None
+
+
+class NearbyResponderSerializer(ResponderSerializer):
+    distance_m = serializers.FloatField(read_only=True)
+
+    class Meta(ResponderSerializer.Meta):
+        fields = ResponderSerializer.Meta.fields + ['distance_m']
+
+
+class LocationUpdateSerializer(serializers.Serializer):
+    # Requis seulement quand une passerelle (administrateur) envoie pour plusieurs unités
+    responder = serializers.IntegerField(required=False)
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    # Heure de la mesure côté appareil ; par défaut, la réception
+    at = serializers.DateTimeField(required=False)
+
+
+class LocationBatchSerializer(serializers.Serializer):
+    updates = serializers.ListField(
+        child=LocationUpdateSerializer(),
+        allow_empty=False,
+        max_length=settings.DISPATCH_FLUSH_MAX,
+    )
+
+
+class DispatchQuerySerializer(serializers.Serializer):
+    k = serializers.IntegerField(min_value=1, max_value=settings.DISPATCH_MAX_K, default=5)
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.contrib.gis.geos import Point
+from django.test import TestCase
+from django.utils import timezone
+
+from .locations import LocationBuffer
+from .models import Responder
+
+
+class LocationBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.engine = Responder.objects.create(name='FPT 1', unit_type=Responder.FIRE_ENGINE)
+        cls.ambulance = Responder.objects.create(name='VSAV 2', unit_type=Responder.AMBULANCE)
+
+    def setUp(self):
+        self.buffer = LocationBuffer(background=False)
+
+    def test_flush_writes_latest_positions_in_one_update(self):
+        now = timezone.now()
+        self.buffer.add(self.engine.pk, -15.97, 18.08, now - timedelta(seconds=5))
+        self.buffer.add(self.engine.pk, -15.96, 18.09, now)
+        self.buffer.add(self.ambulance.pk, -15.95, 18.07, now)
+        self.assertEqual(len(self.buffer), 2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(len(self.buffer), 0)
+        self.engine.refresh_from_db()
+        self.assertEqual((self.engine.location.x, self.engine.location.y), (-15.96, 18.09))
+        self.assertEqual(self.engine.location_updated_at, now)
+
+    def test_older_position_does_not_overwrite_newer_one(self):
+        now = timezone.now()
+        Responder.objects.filter(pk=self.engine.pk).update(
+            location=Point(-15.90, 18.10, srid=4326), location_updated_at=now,
+        )
+        self.buffer.add(self.engine.pk, -15.97, 18.08, now - timedelta(seconds=30))
+        self.assertEqual(self.buffer.flush(), 0)
+        self.engine.refresh_from_db()
+        self.assertEqual((self.engine.location.x, self.engine.location.y), (-15.90, 18.10))
+        self.assertEqual(self.engine.location_updated_at, now)
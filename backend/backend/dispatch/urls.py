@@ -0,0 +1,10 @@
+from django.urls import path
+
+from .views import IncidentRespondersView, ResponderDetailView, ResponderListCreateView, ResponderLocationView
+
+urlpatterns = [
+    path('responders/', ResponderListCreateView.as_view(), name='responder-list'),
+    path('responders/<int:pk>/', ResponderDetailView.as_view(), name='responder-detail'),
+    path('location/', ResponderLocationView.as_view(), name='responder-location'),
+    path('incidents/<int:pk>/responders/', IncidentRespondersView.as_view(), name='incident-responders'),
+]
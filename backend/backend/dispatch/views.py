@@ -0,0 +1,76 @@
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import generics, status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from incidents.models import Incident
+
+from .locations import location_buffer
+from .models import Responder
+from .nearest import nearest_responders
+from .serializers import (
+    DispatchQuerySerializer, LocationBatchSerializer, LocationUpdateSerializer,
+    NearbyResponderSerializer, ResponderSerializer,
+)
+
+
+class ResponderListCreateView(generics.ListCreateAPIView):
+    queryset = Responder.objects.order_by('name')
+    serializer_class = ResponderSerializer
+    permission_classes = [IsAdminUser]
+
+
+class ResponderDetailView(generics.RetrieveUpdateDestroyAPIView):
+    queryset = Responder.objects.all()
+    serializer_class = ResponderSerializer
+    permission_classes = [IsAdminUser]
+
+
+class IncidentRespondersView(APIView):
+    """Les ?k= unités disponibles adaptées les plus proches d'un incident"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, pk):
+        query = DispatchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        incident = get_object_or_404(Incident.objects.only('location', 'incident_type'), pk=pk)
+        responders = nearest_responders(incident.location, incident.incident_type, query.validated_data['k'])
+        return Response({
+            'incident': incident.pk,
+            'responders': NearbyResponderSerializer(responders, many=True).data,
+        })
+
+
+class ResponderLocationView(APIView):
+    """
+    Positions des unités, mises en tampon (voir dispatch.locations).
+    - appareil embarqué : {"latitude", "longitude", "at"?} pour sa propre unité ;
+    - passerelle (administrateur) : {"updates": [{"responder", ...}, ...]}.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        now = timezone.now()
+        if 'updates' in request.data:
+            if not request.user.is_staff:
+                raise PermissionDenied()
+            serializer = LocationBatchSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            updates = serializer.validated_data['updates']
+            if any('responder' not in update for update in updates):
+                raise ValidationError({'updates': 'Chaque position doit indiquer son unité (responder)'})
+        else:
+            responder_id = Responder.objects.filter(user=request.user).values_list('id', flat=True).first()
+            if responder_id is None:
+                raise PermissionDenied("Aucune unité n'est associée à ce compte")
+            serializer = LocationUpdateSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            updates = [{**serializer.validated_data, 'responder': responder_id}]
+        for update in updates:
+            # Une horloge d'appareil en avance ne doit pas bloquer les positions suivantes
+            at = min(update.get('at') or now, now)
+            location_buffer.add(update['responder'], update['longitude'], update['latitude'], at)
+        return Response({'queued': len(updates)}, status=status.HTTP_202_ACCEPTED)
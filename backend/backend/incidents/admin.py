@@ -1,3 +1,159 @@
+"""
+Admin des incidents, prévu pour des tables de plusieurs millions de lignes :
+- nombre total estimé (backend.pagination), pas de COUNT(*) complet ;
+- filtres de liste sur des colonnes indexées, valeurs tirées des choix du
+  modèle (jamais de SELECT DISTINCT sur la table) ;
+- utilisateurs choisis par autocomplétion ou par id, jamais dans un
+  <select> de tous les comptes ;
+- actions en masse en une requête, sans charger les objets un par un.
+"""
 from django.contrib import admin
+from django.contrib.gis.admin import GISModelAdmin
+from django.db import transaction
 
-# Register your models here.
+from backend.pagination import EstimatedCountPaginator
+
+from .counters import recount_users
+from .dedup import forget, recent_since
+from .models import (
+    AreaNotification, AreaSubscription, ArchivedIncident, District, Incident, MediaBlob,
+    OfflineIncident, Street,
+)
+
+
+class IncidentTypeFilter(admin.SimpleListFilter):
+    """Types connus, sans lire la table (OfflineIncident n'a pas de choices)"""
+    title = "type d'incident"
+    parameter_name = 'incident_type'
+
+    def lookups(self, request, model_admin):
+        return Incident.INCIDENT_TYPES
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(incident_type=self.value())
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    `search_fields = ('id',)` : la recherche est une égalité sur la clé
+    primaire. Le préfixe '=' de Django donne un iexact sur le texte
+    (UPPER(id::text) = UPPER(...)), qui ne peut pas utiliser l'index et
+    parcourt toutes les partitions.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_actions(self, request):
+        # delete_selected charge chaque objet et affiche tout l'arbre des
+        # dépendances : remplacé par bulk_delete
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        try:
+            return queryset.filter(pk=int(term)), False
+        except ValueError:
+            return queryset.none(), False
+
+
+@admin.register(Incident)
+class IncidentAdmin(LargeTableAdmin, GISModelAdmin):
+    list_display = ('id', 'incident_type', 'user', 'district', 'created_at', 'canonical_id')
+    list_filter = ('incident_type', ('created_at', admin.DateFieldListFilter))
+    list_select_related = ('user',)
+    search_fields = ('id',)
+    autocomplete_fields = ('user',)
+    raw_id_fields = ('canonical',)
+    readonly_fields = ('created_at', 'district', 'street')
+    ordering = ('-created_at',)
+    actions = ['bulk_delete']
+
+    @admin.action(description="Supprimer les incidents sélectionnés", permissions=['delete'])
+    def bulk_delete(self, request, queryset):
+        # Aucune relation en cascade (DO_NOTHING) ni signal : Django supprime
+        # en un seul DELETE ; compteurs recalculés dans la même transaction
+        with transaction.atomic():
+            user_ids = list(queryset.order_by().values_list('user_id', flat=True).distinct())
+            # Seuls les incidents récents sont dans l'index de dédoublonnage
+            recent_ids = list(queryset.filter(created_at__gte=recent_since()).values_list('id', flat=True))
+            count, _ = queryset.delete()
+            recount_users(user_ids)
+        forget(recent_ids)
+        self.message_user(request, f"{count} incident(s) supprimé(s)")
+
+
+@admin.register(OfflineIncident)
+class OfflineIncidentAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'incident_type', 'is_synced', 'sync_error', 'created_at')
+    list_filter = ('is_synced', IncidentTypeFilter, ('created_at', admin.DateFieldListFilter))
+    list_select_related = ('user',)
+    search_fields = ('id',)
+    raw_id_fields = ('user', 'incident')
+    readonly_fields = ('created_at', 'fingerprint', 'photo_sha256', 'audio_sha256')
+    ordering = ('-id',)
+    actions = ['mark_synced', 'bulk_delete']
+
+    @admin.action(description="Marquer comme synchronisés", permissions=['change'])
+    def mark_synced(self, request, queryset):
+        count = queryset.filter(is_synced=False).update(is_synced=True, sync_error='')
+        self.message_user(request, f"{count} incident(s) hors ligne marqué(s) comme synchronisé(s)")
+
+    @admin.action(description="Supprimer les incidents hors ligne sélectionnés", permissions=['delete'])
+    def bulk_delete(self, request, queryset):
+        count, _ = queryset.delete()
+        self.message_user(request, f"{count} incident(s) hors ligne supprimé(s)")
+
+
+@admin.register(ArchivedIncident)
+class ArchivedIncidentAdmin(LargeTableAdmin):
+    list_display = ('id', 'incident_type', 'user', 'created_at', 'archived_at')
+    list_filter = (IncidentTypeFilter, ('created_at', admin.DateFieldListFilter))
+    list_select_related = ('user',)
+    search_fields = ('id',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('data_file', 'media_file', 'archived_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(LargeTableAdmin):
+    list_display = ('sha256', 'size', 'created_at')
+    readonly_fields = ('size', 'created_at')
+
+
+@admin.register(AreaSubscription)
+class AreaSubscriptionAdmin(GISModelAdmin):
+    list_display = ('id', 'name', 'owner', 'is_active', 'updated_at')
+    list_filter = ('is_active',)
+    list_select_related = ('owner',)
+    search_fields = ('name',)
+    autocomplete_fields = ('owner',)
+
+
+@admin.register(AreaNotification)
+class AreaNotificationAdmin(LargeTableAdmin):
+    list_display = ('id', 'subscription', 'incident_id', 'created_at', 'read_at')
+    list_select_related = ('subscription',)
+    raw_id_fields = ('subscription', 'incident')
+    ordering = ('-created_at',)
+
+
+@admin.register(District)
+class DistrictAdmin(GISModelAdmin):
+    list_display = ('name', 'admin_level', 'source_id')
+    list_filter = ('admin_level',)
+    search_fields = ('name',)
+
+
+@admin.register(Street)
+class StreetAdmin(GISModelAdmin):
+    list_display = ('name', 'source_id')
+    search_fields = ('name',)
+    show_full_result_count = False
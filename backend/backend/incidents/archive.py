@@ -0,0 +1,164 @@
+"""
+Archivage à froid des anciens incidents.
+
+Les incidents d'un mois donné sont écrits dans un fichier Parquet (triés par
+id, compressés en zstd), leurs photos et audios dans une archive zip, puis
+remplacés dans la base par une ligne ArchivedIncident. Les fichiers sont
+relatifs à settings.INCIDENT_ARCHIVE_ROOT.
+"""
+import os
+import zipfile
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from .dedup import forget, recent_since
+from .models import MEDIA_BLOB_PREFIX, ArchivedIncident, Incident
+
+ROW_GROUP_SIZE = 50_000
+COLUMNS = ['id', 'user_id', 'incident_type', 'description', 'photo', 'audio', 'lat', 'lng', 'created_at']
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImproperlyConfigured("pyarrow est requis pour l'archivage : pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def archive_root():
+    return settings.INCIDENT_ARCHIVE_ROOT
+
+
+def _schema(pa):
+    return pa.schema([
+        ('id', pa.int64()),
+        ('user_id', pa.int64()),
+        ('incident_type', pa.dictionary(pa.int8(), pa.string())),
+        ('description', pa.string()),
+        ('photo', pa.string()),
+        ('audio', pa.string()),
+        ('lat', pa.float64()),
+        ('lng', pa.float64()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+    ])
+
+
+def _rows(queryset):
+    return queryset.annotate(
+        lat=RawSQL('ST_Y(location)', []),
+        lng=RawSQL('ST_X(location)', []),
+    ).order_by('id').values_list(*COLUMNS)
+
+
+def archive_range(start, end, tag):
+    """
+    Archive les incidents créés dans [start, end[. Retourne le nombre
+    d'incidents archivés. `tag` distingue les fichiers d'une même période.
+    """
+    pa, pq = _pyarrow()
+    queryset = Incident.objects.filter(created_at__gte=start, created_at__lt=end)
+    max_id = queryset.order_by('-id').values_list('id', flat=True).first()
+    if max_id is None:
+        return 0
+    # Les lignes insérées après ce point ne font pas partie de ce lot
+    queryset = queryset.filter(id__lte=max_id)
+
+    root = archive_root()
+    os.makedirs(root, exist_ok=True)
+    data_file = f'incidents_{start:%Y%m}_{tag}.parquet'
+    media_file = f'media_{start:%Y%m}_{tag}.zip'
+    schema = _schema(pa)
+
+    count = 0
+    # Blobs adressés par contenu : plusieurs incidents peuvent en partager un
+    media = set()
+    # Encore dans l'index de dédoublonnage (archivage du mois en cours)
+    recent = recent_since()
+    recent_ids = []
+    with pq.ParquetWriter(os.path.join(root, data_file), schema, compression='zstd') as writer, \
+            zipfile.ZipFile(os.path.join(root, media_file), 'w', zipfile.ZIP_STORED) as packed:
+        batch = []
+
+        def flush():
+            columns = list(zip(*batch))
+            writer.write_table(pa.table(
+                [pa.array(col, type=schema.field(i).type) for i, col in enumerate(columns)],
+                schema=schema,
+            ), row_group_size=ROW_GROUP_SIZE)
+            batch.clear()
+
+        for row in _rows(queryset).iterator(chunk_size=10_000):
+            batch.append(row)
+            count += 1
+            if row[8] >= recent:
+                recent_ids.append(row[0])
+            photo, audio = row[4], row[5]
+            # Les médias sont déjà compressés (JPEG, AAC) : stockés tels quels
+            for name in (photo, audio):
+                if name and name not in media and default_storage.exists(name):
+                    with default_storage.open(name) as src, packed.open(name, 'w') as dst:
+                        for chunk in src.chunks():
+                            dst.write(chunk)
+                    media.add(name)
+            if len(batch) >= ROW_GROUP_SIZE:
+                flush()
+        if batch:
+            flush()
+
+    if not media:
+        os.remove(os.path.join(root, media_file))
+
+    # Traces et suppression en deux requêtes ensemblistes, dans une transaction
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {ArchivedIncident._meta.db_table}
+                (id, user_id, incident_type, created_at, data_file, media_file, archived_at)
+            SELECT id, user_id, incident_type, created_at, %s,
+                   CASE WHEN coalesce(photo, '') <> '' OR coalesce(audio, '') <> ''
+                        THEN %s ELSE '' END,
+                   now()
+            FROM {Incident._meta.db_table}
+            WHERE created_at >= %s AND created_at < %s AND id <= %s
+            ON CONFLICT (id) DO NOTHING
+        """, [data_file, media_file if media else '', start, end, max_id])
+        queryset.delete()
+    forget(recent_ids)
+
+    # Les originaux ne sont supprimés qu'une fois la base à jour, sauf les
+    # médias adressés par contenu, partagés entre incidents
+    for name in media:
+        if not name.startswith(MEDIA_BLOB_PREFIX):
+            default_storage.delete(name)
+    return count
+
+
+def load_archived_incident(stub):
+    """Relit un incident archivé depuis son fichier Parquet"""
+    _pa, pq = _pyarrow()
+    table = pq.read_table(
+        os.path.join(archive_root(), stub.data_file),
+        filters=[('id', '=', stub.id)],
+    )
+    if table.num_rows == 0:
+        return None
+    row = {name: table.column(name)[0].as_py() for name in COLUMNS}
+    created_at = row['created_at'].astimezone(dt_timezone.utc)
+    return {
+        'id': row['id'],
+        'user': row['user_id'],
+        'incident_type': row['incident_type'],
+        'description': row['description'],
+        # Les médias archivés ne sont plus servis depuis MEDIA_ROOT
+        'photo': None,
+        'audio': None,
+        'location': f"{row['lat']},{row['lng']}",
+        'created_at': created_at.isoformat().replace('+00:00', 'Z'),
+        'archived': True,
+    }
@@ -0,0 +1,83 @@
+"""
+Représentation compacte des listes d'incidents pour les clients mobiles.
+
+Au lieu d'une liste d'objets, une colonne par champ :
+
+    {"count": 2, "media_url": "/api/incidents/{id}/{field}/",
+     "fields": ["id", "user", ...],
+     "columns": {"id": [12, 11], "user": [3, 3], ...}}
+
+- `photo` et `audio` valent true quand le média existe (null sinon) ; son
+  URL s'obtient depuis le gabarit `media_url` (vue protégée
+  IncidentMediaView, {field} = photo ou audio) ;
+- `created_at` est un timestamp Unix en secondes ;
+- `location` est remplacée par deux colonnes `lat` et `lng`.
+
+Les lignes sont lues par values_list() sans passer par le serializer DRF.
+Format choisi par l'en-tête Accept (voir renderers.py) ou ?format=columnar.
+"""
+from django.db.models import FloatField, Func
+from django.urls import reverse
+from rest_framework.response import Response
+
+from .renderers import COMPACT_RENDERERS
+
+COMPACT_FIELDS = (
+    'id', 'user', 'incident_type', 'description', 'photo', 'audio',
+    'lat', 'lng', 'created_at', 'canonical', 'district', 'street',
+)
+COMPACT_FORMATS = {renderer.format for renderer in COMPACT_RENDERERS}
+
+
+class PointX(Func):
+    function = 'ST_X'
+    output_field = FloatField()
+
+
+class PointY(Func):
+    function = 'ST_Y'
+    output_field = FloatField()
+
+
+def compact_rows(queryset):
+    """Tuples dans l'ordre de COMPACT_FIELDS"""
+    return queryset.annotate(
+        lat=PointY('location'), lng=PointX('location'),
+    ).values_list(
+        'id', 'user_id', 'incident_type', 'description', 'photo', 'audio',
+        'lat', 'lng', 'created_at', 'canonical_id', 'district', 'street',
+    )
+
+
+def columns_from_rows(rows):
+    columns = {name: [] for name in COMPACT_FIELDS}
+    appends = [columns[name].append for name in COMPACT_FIELDS]
+    for row in rows:
+        for append, value in zip(appends, row):
+            append(value)
+    columns['created_at'] = [int(moment.timestamp()) for moment in columns['created_at']]
+    for name in ('photo', 'audio'):
+        columns[name] = [True if path else None for path in columns[name]]
+    return {
+        'count': len(columns['id']),
+        'media_url': reverse('incident-list-create') + '{id}/{field}/',
+        'fields': list(COMPACT_FIELDS),
+        'columns': columns,
+    }
+
+
+class CompactListMixin:
+    """
+    Pour les vues de liste d'incidents : ajoute les rendus compacts et les
+    sert directement depuis le queryset quand le client les demande.
+    """
+
+    def get_renderers(self):
+        return super().get_renderers() + [renderer() for renderer in COMPACT_RENDERERS]
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format not in COMPACT_FORMATS:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(columns_from_rows(compact_rows(queryset)))
+
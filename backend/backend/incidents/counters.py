@@ -0,0 +1,122 @@
+"""
+Compteurs d'incidents dénormalisés sur l'utilisateur.
+
+CustomUser.incident_count et CustomUser.last_incident_at évitent un
+Count('incidents') sur toute la table à chaque chargement des tableaux de
+bord : le classement des utilisateurs devient un parcours d'index.
+
+Les vues mettent les compteurs à jour dans la transaction qui crée ou
+supprime l'incident. Les incidents archivés (ArchivedIncident) continuent de
+compter. Les écritures qui contournent ces vues (COPY, suppression de
+partition, admin) sont rattrapées par repair_counts() /
+`manage.py repair_incident_counts`.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import ArchivedIncident, Incident
+
+User = get_user_model()
+
+# Compte et date du dernier incident par utilisateur, incidents archivés compris
+_RECOUNT_SQL = """
+    UPDATE users_customuser u
+    SET incident_count = COALESCE(c.n, 0), last_incident_at = c.latest
+    FROM users_customuser u2
+    LEFT JOIN (
+        SELECT user_id, count(*) AS n, max(created_at) AS latest
+        FROM (
+            SELECT user_id, created_at FROM incidents_incident
+            WHERE {incident_users}
+            UNION ALL
+            SELECT user_id, created_at FROM incidents_archivedincident
+            WHERE {incident_users}
+        ) s
+        GROUP BY user_id
+    ) c ON c.user_id = u2.id
+    WHERE u.id = u2.id
+      AND {users}
+      AND (u.incident_count IS DISTINCT FROM COALESCE(c.n, 0)
+           OR u.last_incident_at IS DISTINCT FROM c.latest)
+"""
+REPAIR_SQL = _RECOUNT_SQL.format(
+    incident_users='user_id >= %(start)s AND user_id < %(end)s',
+    users='u.id >= %(start)s AND u.id < %(end)s',
+)
+RECOUNT_USERS_SQL = _RECOUNT_SQL.format(
+    incident_users='user_id = ANY(%(ids)s)',
+    users='u.id = ANY(%(ids)s)',
+)
+
+
+def incidents_added(user_id, count, latest):
+    """À appeler dans la transaction qui a créé `count` incidents de l'utilisateur"""
+    if count:
+        User.objects.filter(pk=user_id).update(
+            incident_count=F('incident_count') + count,
+            # GREATEST ignore NULL sous PostgreSQL
+            last_incident_at=Greatest('last_incident_at', Value(latest)),
+        )
+
+
+def incident_added(incident):
+    incidents_added(incident.user_id, 1, incident.created_at)
+
+
+def incident_removed(incident):
+    """À appeler dans la transaction qui a supprimé l'incident"""
+    latest = Coalesce(
+        Subquery(
+            Incident.objects.filter(user_id=OuterRef('pk'))
+            .order_by('-created_at').values('created_at')[:1]
+        ),
+        Subquery(
+            ArchivedIncident.objects.filter(user_id=OuterRef('pk'))
+            .order_by('-created_at').values('created_at')[:1]
+        ),
+    )
+    User.objects.filter(pk=incident.user_id).update(
+        incident_count=Greatest(F('incident_count') - 1, Value(0)),
+        last_incident_at=latest,
+    )
+
+
+def recount_users(user_ids):
+    """
+    Recalcule les compteurs de quelques utilisateurs après une écriture en
+    masse (suppression depuis l'admin), dans la transaction de l'appelant.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT id FROM users_customuser WHERE id = ANY(%(ids)s) FOR UPDATE", {'ids': user_ids})
+        cursor.execute(RECOUNT_USERS_SQL, {'ids': user_ids})
+        return cursor.rowcount
+
+
+def repair_counts(batch_size=1000):
+    """
+    Recalcule les compteurs par tranches d'ids et renvoie le nombre
+    d'utilisateurs corrigés. Les utilisateurs de la tranche sont verrouillés
+    avant le comptage : une création concurrente attend la fin de la tranche
+    ou est déjà visible dans le comptage, aucun incrément n'est perdu.
+    """
+    repaired = 0
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT min(id), max(id) FROM users_customuser")
+        first, last = cursor.fetchone()
+    if first is None:
+        return 0
+    for start in range(first, last + 1, batch_size):
+        bounds = {'start': start, 'end': start + batch_size}
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM users_customuser WHERE id >= %(start)s AND id < %(end)s FOR UPDATE",
+                bounds,
+            )
+            cursor.execute(REPAIR_SQL, bounds)
+            repaired += cursor.rowcount
+    return repaired
@@ -0,0 +1,194 @@
+"""
+Détection des signalements en double à l'ingestion.
+
+Deux incidents sont considérés comme le même événement s'ils ont le même
+type, sont à moins de INCIDENT_DEDUP_RADIUS_M mètres et à moins de
+INCIDENT_DEDUP_WINDOW_MINUTES minutes d'écart. Le doublon est rattaché à
+l'incident canonique (le premier signalement) via `Incident.canonical`.
+
+Les incidents récents sont gardés en mémoire dans une grille de hachage
+(cellule au moins aussi large que le rayon) : une vérification ne lit que
+les 9 cellules voisines. En cas d'absence en mémoire (incident créé par un
+autre processus), une requête indexée GiST sur la fenêtre récente prend le
+relais. Les suppressions (API, admin, archivage) appellent forget() ; celles
+faites par un autre processus restent visibles ici jusqu'à la fin de la
+fenêtre.
+"""
+import math
+import threading
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.gis.measure import D
+from django.contrib.gis.db.models.functions import Distance
+from django.utils import timezone
+
+from .geo import haversine_m, metres_to_degrees
+from .models import Incident
+
+# Les cellules couvrent au moins le rayon en longitude jusqu'à cette latitude
+MAX_LATITUDE = 60
+
+
+class RecentIncidentIndex:
+    def __init__(self, radius_m, window):
+        self.radius_m = radius_m
+        self.window = window
+        self.cell = metres_to_degrees(radius_m, MAX_LATITUDE)
+        self._cells = {}
+        self._expiry = deque()
+        self._lock = threading.Lock()
+        # Chargement initial : les autres threads attendent la grille complète
+        self._warm_lock = threading.Lock()
+        self._warm = False
+        # id -> clé de cellule, pour forget()
+        self._where = {}
+
+    def _key(self, incident_type, lat, lng):
+        return incident_type, math.floor(lat / self.cell), math.floor(lng / self.cell)
+
+    def _evict(self, now):
+        limit = now - self.window
+        while self._expiry and self._expiry[0][0] < limit:
+            created_at, key, incident_id = self._expiry.popleft()
+            self._where.pop(incident_id, None)
+            bucket = self._cells.get(key)
+            if bucket is None:
+                continue
+            bucket[:] = [entry for entry in bucket if entry[1] != incident_id]
+            if not bucket:
+                del self._cells[key]
+
+    def add(self, incident_id, canonical_id, incident_type, lat, lng, created_at):
+        with self._lock:
+            self._add(incident_id, canonical_id, incident_type, lat, lng, created_at)
+
+    def _add(self, incident_id, canonical_id, incident_type, lat, lng, created_at):
+        if incident_id in self._where:
+            return
+        key = self._key(incident_type, lat, lng)
+        self._cells.setdefault(key, []).append(
+            (created_at, incident_id, canonical_id or incident_id, lat, lng)
+        )
+        self._expiry.append((created_at, key, incident_id))
+        self._where[incident_id] = key
+
+    def forget(self, incident_id):
+        """
+        Retire un incident supprimé, et les doublons qui le désignent comme
+        canonique (à moins d'un rayon, donc dans les cellules voisines). Les
+        entrées de _expiry sont ignorées à leur échéance.
+        """
+        with self._lock:
+            key = self._where.pop(incident_id, None)
+            if key is None:
+                return
+            incident_type, row, col = key
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    neighbour = (incident_type, row + dr, col + dc)
+                    bucket = self._cells.get(neighbour)
+                    if bucket is None:
+                        continue
+                    kept = []
+                    for entry in bucket:
+                        if entry[1] == incident_id or entry[2] == incident_id:
+                            self._where.pop(entry[1], None)
+                        else:
+                            kept.append(entry)
+                    if kept:
+                        self._cells[neighbour] = kept
+                    else:
+                        del self._cells[neighbour]
+
+    def match(self, incident_type, lat, lng, now):
+        """Retourne l'id canonique le plus proche, ou None"""
+        _type, row, col = self._key(incident_type, lat, lng)
+        limit = now - self.window
+        best = None
+        with self._lock:
+            self._evict(now)
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    for created_at, _id, canonical_id, other_lat, other_lng in \
+                            self._cells.get((incident_type, row + dr, col + dc), ()):
+                        if created_at < limit:
+                            continue
+                        distance = haversine_m(lat, lng, other_lat, other_lng)
+                        if distance <= self.radius_m and (best is None or distance < best[0]):
+                            best = (distance, canonical_id)
+        return best[1] if best else None
+
+    def warm(self, now):
+        """
+        Charge une fois la fenêtre récente depuis la base. Marquée chargée
+        seulement après succès : un échec sera retenté à l'appel suivant.
+        """
+        if self._warm:
+            return
+        with self._warm_lock:
+            if self._warm:
+                return
+            recent = Incident.objects.filter(created_at__gte=now - self.window).order_by('created_at')
+            rows = list(recent.values_list('id', 'canonical_id', 'incident_type', 'location', 'created_at'))
+            with self._lock:
+                for incident_id, canonical_id, incident_type, location, created_at in rows:
+                    self._add(incident_id, canonical_id, incident_type, location.y, location.x, created_at)
+                self._warm = True
+
+
+_index = None
+
+
+def get_index():
+    global _index
+    if _index is None:
+        _index = RecentIncidentIndex(
+            settings.INCIDENT_DEDUP_RADIUS_M,
+            timedelta(minutes=settings.INCIDENT_DEDUP_WINDOW_MINUTES),
+        )
+    return _index
+
+
+def find_canonical(incident_type, location, now=None):
+    """
+    Cherche l'incident canonique dont `location` serait un doublon.
+    Mémoire d'abord, puis requête GiST bornée dans le temps.
+    """
+    now = now or timezone.now()
+    index = get_index()
+    index.warm(now)
+    canonical_id = index.match(incident_type, location.y, location.x, now)
+    if canonical_id is not None:
+        return canonical_id
+
+    return Incident.objects.filter(
+        incident_type=incident_type,
+        canonical__isnull=True,
+        created_at__gte=now - index.window,
+        location__dwithin=(location, metres_to_degrees(index.radius_m, location.y)),
+        location__distance_lte=(location, D(m=index.radius_m)),
+    ).annotate(
+        distance=Distance('location', location)
+    ).order_by('distance').values_list('id', flat=True).first()
+
+
+def forget(incident_ids):
+    """Retire des incidents supprimés de l'index en mémoire du processus"""
+    index = get_index()
+    for incident_id in incident_ids:
+        index.forget(incident_id)
+
+
+def recent_since(now=None):
+    """Début de la fenêtre gardée en mémoire : seuls ces incidents sont à oublier"""
+    return (now or timezone.now()) - get_index().window
+
+
+def remember(incident):
+    """Ajoute un incident fraîchement créé à l'index en mémoire"""
+    get_index().add(
+        incident.id, incident.canonical_id, incident.incident_type,
+        incident.location.y, incident.location.x, incident.created_at,
+    )
@@ -0,0 +1,75 @@
+"""
+Outils raster partagés par les points chauds et la carte de chaleur.
+
+Les coordonnées sont projetées en Web Mercator (EPSG:3857) par PostGIS et
+lues en un bloc via COPY ... TO STDOUT (FORMAT binary) directement dans un
+tableau NumPy, sans objet Python par ligne.
+"""
+import math
+
+import numpy as np
+from django.db import connection
+
+from .pgcopy import copy_to_bytes
+
+WEB_MERCATOR_RADIUS = 6378137.0
+
+# En-tête du format binaire de COPY : signature (11), drapeaux (4), extension (4)
+_COPY_HEADER = 19
+_COPY_TRAILER = 2
+
+
+def lnglat_to_mercator(lng, lat):
+    x = np.radians(lng) * WEB_MERCATOR_RADIUS
+    y = np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) * WEB_MERCATOR_RADIUS
+    return x, y
+
+
+def mercator_to_lnglat(x, y):
+    lng = np.degrees(x / WEB_MERCATOR_RADIUS)
+    lat = np.degrees(2 * np.arctan(np.exp(y / WEB_MERCATOR_RADIUS)) - np.pi / 2)
+    return lng, lat
+
+
+def fetch_columns(select_sql, params, columns):
+    """
+    Exécute `select_sql` via COPY binaire et retourne un tableau structuré.
+    `columns` liste (nom, type) avec type 'i8' (bigint) ou 'f8' (double),
+    dans l'ordre du SELECT. Aucune colonne ne doit être NULL.
+    """
+    fields = [('_count', '>i2')]
+    for name, kind in columns:
+        fields += [(f'_len_{name}', '>i4'), (name, '>' + kind)]
+    dtype = np.dtype(fields)
+
+    with connection.cursor() as cursor:
+        raw = copy_to_bytes(cursor, f"COPY ({select_sql}) TO STDOUT WITH (FORMAT binary)", params)
+    count = (len(raw) - _COPY_HEADER - _COPY_TRAILER) // dtype.itemsize
+    rows = np.frombuffer(raw, dtype=dtype, count=count, offset=_COPY_HEADER)
+    return rows[[name for name, _kind in columns]]
+
+
+def gaussian_kernel(sigma):
+    radius = max(1, int(math.ceil(3 * sigma)))
+    offsets = np.arange(-radius, radius + 1)
+    kernel = np.exp(-(offsets ** 2) / (2 * sigma ** 2))
+    return kernel / kernel.sum()
+
+
+def blur(grid, sigma):
+    """Flou gaussien séparable : une passe par axe, une opération par coefficient"""
+    if sigma <= 0:
+        return grid.astype(np.float32)
+    kernel = gaussian_kernel(sigma).astype(np.float32)
+    radius = len(kernel) // 2
+    out = grid.astype(np.float32)
+    for axis in (0, 1):
+        pad = [(0, 0), (0, 0)]
+        pad[axis] = (radius, radius)
+        padded = np.pad(out, pad)
+        size = out.shape[axis]
+        acc = np.zeros_like(out)
+        for k, weight in enumerate(kernel):
+            acc += weight * (padded[k:k + size, :] if axis == 0 else padded[:, k:k + size])
+        out = acc
+    return out
@@ -0,0 +1,141 @@
+"""
+Filtres des listes d'incidents.
+
+Paramètres reconnus (tous optionnels, combinables) :
+    type / incident_type        type d'incident
+    created_after, created_before   date ou date-heure ISO 8601
+    user                        id de l'auteur (listes admin)
+    bbox                        lng_min,lat_min,lng_max,lat_max
+    has_photo, has_audio        true / false
+
+Chaque filtre s'appuie sur un index (voir Incident.Meta.indexes et la
+migration 0006) ; les filtres sur created_at permettent en plus l'élagage
+des partitions mensuelles. `has_photo=true` et `has_audio=true` utilisent
+exactement le prédicat des index partiels (`photo > ''`) pour que le
+planificateur puisse s'en servir.
+"""
+import math
+from datetime import datetime, time, timedelta
+
+from django.contrib.gis.geos import Polygon
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import Incident
+
+TRUE_VALUES = ('1', 'true', 'yes')
+FALSE_VALUES = ('0', 'false', 'no')
+
+
+def parse_moment(param, value, end_of_day=False):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({param: 'Date ISO 8601 attendue'})
+        if end_of_day:
+            day += timedelta(days=1)
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_bbox(param, value, max_lat=90):
+    """Emprise en WGS 84 ; `max_lat` plus petit pour une projection Web Mercator"""
+    try:
+        lng_min, lat_min, lng_max, lat_max = coords = [float(v) for v in value.split(',')]
+    except (ValueError, TypeError):
+        raise ValidationError({param: 'Format attendu : lng_min,lat_min,lng_max,lat_max'})
+    if not all(math.isfinite(v) for v in coords):
+        raise ValidationError({param: 'Coordonnées finies attendues'})
+    if not (-180 <= lng_min <= lng_max <= 180 and -max_lat <= lat_min <= lat_max <= max_lat):
+        raise ValidationError({
+            param: f'Longitudes entre -180 et 180, latitudes entre -{max_lat:g} et {max_lat:g}, minimum avant maximum'
+        })
+    bbox = Polygon.from_bbox(coords)
+    bbox.srid = 4326
+    return bbox
+
+
+def parse_bool(param, value):
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValidationError({param: 'true ou false attendu'})
+
+
+class IncidentFilter:
+    """Analyse les paramètres de requête puis les applique à un queryset"""
+
+    def __init__(self, params, allow_user=True):
+        self.conditions = []
+        errors = {}
+        parsers = [
+            self._type, self._created_after, self._created_before, self._bbox,
+            self._has_photo, self._has_audio,
+        ]
+        if allow_user:
+            parsers.append(self._user)
+        for parser in parsers:
+            try:
+                parser(params)
+            except ValidationError as e:
+                errors.update(e.detail)
+        if errors:
+            raise ValidationError(errors)
+
+    def apply(self, queryset):
+        for condition in self.conditions:
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def _type(self, params):
+        value = params.get('type') or params.get('incident_type')
+        if not value:
+            return
+        if value not in dict(Incident.INCIDENT_TYPES):
+            raise ValidationError({'type': "Type d'incident inconnu"})
+        self.conditions.append(Q(incident_type=value))
+
+    def _created_after(self, params):
+        if params.get('created_after'):
+            self.conditions.append(Q(created_at__gte=parse_moment('created_after', params['created_after'])))
+
+    def _created_before(self, params):
+        if params.get('created_before'):
+            moment = parse_moment('created_before', params['created_before'], end_of_day=True)
+            self.conditions.append(Q(created_at__lt=moment))
+
+    def _user(self, params):
+        value = params.get('user')
+        if not value:
+            return
+        try:
+            self.conditions.append(Q(user_id=int(value)))
+        except ValueError:
+            raise ValidationError({'user': 'Identifiant numérique attendu'})
+
+    def _bbox(self, params):
+        if params.get('bbox'):
+            # Opérateur && : indexé GiST, exact pour des points
+            self.conditions.append(Q(location__bboverlaps=parse_bbox('bbox', params['bbox'])))
+
+    def _presence(self, params, field):
+        param = f'has_{field}'
+        if not params.get(param):
+            return
+        if parse_bool(param, params[param]):
+            self.conditions.append(Q(**{f'{field}__gt': ''}))
+        else:
+            self.conditions.append(Q(**{f'{field}__isnull': True}) | Q(**{field: ''}))
+
+    def _has_photo(self, params):
+        self._presence(params, 'photo')
+
+    def _has_audio(self, params):
+        self._presence(params, 'audio')
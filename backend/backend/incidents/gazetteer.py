@@ -0,0 +1,123 @@
+"""
+Géocodage inverse hors ligne : quartier et rue d'un incident.
+
+Le référentiel (District, Street) est chargé dans PostGIS depuis un
+extrait OSM ou un GeoJSON de limites administratives (`manage.py
+load_gazetteer`) : aucun service réseau n'est appelé.
+
+Le résultat est écrit sur l'incident à sa création (Incident.district /
+Incident.street) : les listes et exports ne font aucune recherche. Les
+coordonnées sont arrondies à GAZETTEER_QUANTUM_DEG degrés (~11 m par
+défaut) avant la recherche, dont le résultat est gardé dans un cache LRU
+par processus (GAZETTEER_CACHE_SIZE cellules) : des signalements proches
+ne coûtent qu'une requête.
+
+Les incidents existants (ou tous, après un rechargement du référentiel)
+sont complétés en SQL par lots avec `manage.py geocode_incidents`.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+
+from .models import District, Incident, Street
+
+# Quartier le plus précis (admin_level le plus élevé) contenant le point ;
+# rue la plus proche à moins de GAZETTEER_STREET_MAX_M mètres (pré-filtre
+# ST_DWithin indexé en degrés, comme geo.metres_to_degrees, puis distance
+# exacte sur la sphère).
+DISTRICT_SQL = f"""
+    SELECT d.name FROM {District._meta.db_table} d
+    WHERE ST_Contains(d.area, {{point}})
+    ORDER BY d.admin_level DESC, ST_Area(d.area)
+    LIMIT 1
+"""
+STREET_SQL = f"""
+    SELECT s.name FROM {Street._meta.db_table} s
+    WHERE ST_DWithin(s.geometry, {{point}},
+                     %(max_m)s / (111320.0 * GREATEST(cos(radians(ST_Y({{point}}))), 0.01)))
+      AND ST_DWithin(s.geometry::geography, ({{point}})::geography, %(max_m)s)
+    ORDER BY ST_Distance(s.geometry::geography, ({{point}})::geography)
+    LIMIT 1
+"""
+
+LOOKUP_SQL = f"""
+    SELECT
+        COALESCE(({DISTRICT_SQL.format(point='p.geom')}), ''),
+        COALESCE(({STREET_SQL.format(point='p.geom')}), '')
+    FROM (SELECT ST_SetSRID(ST_MakePoint(%(lng)s, %(lat)s), 4326) AS geom) p
+"""
+
+BACKFILL_SQL = f"""
+    WITH batch AS (
+        SELECT id, created_at FROM {Incident._meta.db_table}
+        WHERE id > %(after)s {{only_missing}}
+        ORDER BY id
+        LIMIT %(batch_size)s
+    )
+    UPDATE {Incident._meta.db_table} AS i
+    SET district = COALESCE(({DISTRICT_SQL.format(point='i.location')}), ''),
+        street = COALESCE(({STREET_SQL.format(point='i.location')}), '')
+    FROM batch
+    WHERE i.id = batch.id AND i.created_at = batch.created_at
+    RETURNING i.id
+"""
+
+
+def _quantize(lng, lat):
+    quantum = settings.GAZETTEER_QUANTUM_DEG
+    return round(lng / quantum), round(lat / quantum)
+
+
+@lru_cache(maxsize=settings.GAZETTEER_CACHE_SIZE)
+def _lookup_cell(col, row):
+    # Centre de la cellule : même réponse pour tous les points qu'elle contient
+    quantum = settings.GAZETTEER_QUANTUM_DEG
+    with connection.cursor() as cursor:
+        cursor.execute(LOOKUP_SQL, {
+            'lng': col * quantum,
+            'lat': row * quantum,
+            'max_m': settings.GAZETTEER_STREET_MAX_M,
+        })
+        return cursor.fetchone()
+
+
+def lookup(lng, lat):
+    """(quartier, rue) d'un point ; chaînes vides hors du référentiel"""
+    return _lookup_cell(*_quantize(lng, lat))
+
+
+def lookup_point(point):
+    return lookup(point.x, point.y)
+
+
+def cache_info():
+    return _lookup_cell.cache_info()
+
+
+def clear_cache():
+    """Après un rechargement du référentiel (les autres processus gardent leur cache)"""
+    _lookup_cell.cache_clear()
+
+
+def backfill(batch_size=5000, only_missing=True):
+    """
+    Renseigne district/street des incidents existants, par lots de
+    `batch_size` dans des transactions courtes (une par requête, en
+    autocommit). Renvoie le nombre d'incidents traités.
+    """
+    sql = BACKFILL_SQL.format(only_missing="AND district = '' AND street = ''" if only_missing else '')
+    after = 0
+    total = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {
+                'after': after,
+                'batch_size': batch_size,
+                'max_m': settings.GAZETTEER_STREET_MAX_M,
+            })
+            ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return total
+        total += len(ids)
+        after = max(ids)
@@ -0,0 +1,42 @@
+import math
+
+from django.contrib.gis.geos import Point
+
+# Rayon moyen de la Terre (mètres)
+EARTH_RADIUS_M = 6371008.8
+METRES_PER_DEGREE = 111320.0
+# Latitude limite de la projection Web Mercator (EPSG:3857)
+MERCATOR_MAX_LAT = 85.0511287798
+
+
+def parse_lat_lng(value):
+    """
+    Convertit une chaîne "lat,lng" en Point (lon, lat) ; None si invalide,
+    non fini (nan, inf) ou hors de lat ±90 / lng ±180
+    """
+    try:
+        lat, lng = map(float, value.split(','))
+    except (ValueError, AttributeError):
+        return None
+    if not (math.isfinite(lat) and math.isfinite(lng) and -90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return Point(lng, lat, srid=4326)
+
+
+def metres_to_degrees(metres, latitude):
+    """
+    Borne supérieure en degrés d'une distance en mètres à une latitude donnée.
+    Permet un pré-filtre ST_DWithin indexé (GiST) sur une géométrie en 4326,
+    affiné ensuite par un calcul de distance exact.
+    """
+    cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+    return metres / (METRES_PER_DEGREE * cos_lat)
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Distance orthodromique en mètres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
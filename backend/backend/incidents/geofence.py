@@ -0,0 +1,189 @@
+"""
+Abonnements par zone : quels abonnements couvrent un incident ?
+
+Les emprises (bbox) des polygones sont rangées dans une grille de hachage
+de GEOFENCE_CELL_DEG degrés : un point ne regarde que les abonnements de sa
+cellule, filtrés par type, puis par emprise, puis par un test de contenance
+sur la géométrie préparée GEOS (précalculée une fois par polygone). Les
+très grands polygones, qui couvriraient trop de cellules, sont testés à part.
+
+L'index est mis à jour de façon incrémentale : toutes les
+GEOFENCE_REFRESH_SECONDS, seuls les abonnements modifiés depuis le dernier
+passage (updated_at) sont relus ; les suppressions sont détectées par le
+nombre d'abonnements actifs. Dans le processus qui fait la modification,
+les signaux de AreaSubscription forcent un rafraîchissement immédiat.
+"""
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from jobs.queue import enqueue
+
+from .models import AreaSubscription
+
+# Un polygone couvrant plus de cellules est rangé avec les « grands »
+MAX_CELLS_PER_AREA = 4096
+# Modifications validées en retard relues sur cette marge
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+class GeofenceIndex:
+    def __init__(self, cell_deg):
+        self.cell = cell_deg
+        self._cells = {}
+        self._large = set()
+        # id -> (xmin, ymin, xmax, ymax, géométrie préparée, types ou None, clés de cellules)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _cell_range(self, xmin, ymin, xmax, ymax):
+        return (
+            range(math.floor(xmin / self.cell), math.floor(xmax / self.cell) + 1),
+            range(math.floor(ymin / self.cell), math.floor(ymax / self.cell) + 1),
+        )
+
+    def add(self, subscription_id, geometry, incident_types=None):
+        """Ajoute ou remplace un abonnement ; `incident_types` vide = tous"""
+        xmin, ymin, xmax, ymax = geometry.extent
+        cols, rows = self._cell_range(xmin, ymin, xmax, ymax)
+        if len(cols) * len(rows) > MAX_CELLS_PER_AREA:
+            keys = None
+        else:
+            keys = [(col, row) for col in cols for row in rows]
+        entry = (xmin, ymin, xmax, ymax, geometry.prepared,
+                 frozenset(incident_types) if incident_types else None, keys)
+        with self._lock:
+            self._remove(subscription_id)
+            self._entries[subscription_id] = entry
+            if keys is None:
+                self._large.add(subscription_id)
+            else:
+                for key in keys:
+                    self._cells.setdefault(key, []).append(subscription_id)
+
+    def remove(self, subscription_id):
+        with self._lock:
+            self._remove(subscription_id)
+
+    def _remove(self, subscription_id):
+        entry = self._entries.pop(subscription_id, None)
+        if entry is None:
+            return
+        keys = entry[6]
+        if keys is None:
+            self._large.discard(subscription_id)
+            return
+        for key in keys:
+            bucket = self._cells[key]
+            bucket.remove(subscription_id)
+            if not bucket:
+                del self._cells[key]
+
+    def ids(self):
+        return set(self._entries)
+
+    def match(self, lng, lat, incident_type):
+        """Ids des abonnements dont la zone contient le point"""
+        key = (math.floor(lng / self.cell), math.floor(lat / self.cell))
+        point = None
+        matches = []
+        with self._lock:
+            candidates = self._cells.get(key, [])
+            if self._large:
+                candidates = list(candidates) + list(self._large)
+            for subscription_id in candidates:
+                xmin, ymin, xmax, ymax, prepared, types, _keys = self._entries[subscription_id]
+                if types is not None and incident_type not in types:
+                    continue
+                if not (xmin <= lng <= xmax and ymin <= lat <= ymax):
+                    continue
+                if point is None:
+                    point = Point(lng, lat, srid=4326)
+                if prepared.contains(point):
+                    matches.append(subscription_id)
+        return matches
+
+
+class SubscriptionIndex:
+    """GeofenceIndex alimenté depuis AreaSubscription"""
+
+    def __init__(self):
+        self.index = GeofenceIndex(settings.GEOFENCE_CELL_DEG)
+        self._refresh_lock = threading.Lock()
+        self.refreshed_at = 0.0
+        self.since = None
+
+    def invalidate(self):
+        self.refreshed_at = 0.0
+
+    def refresh_if_due(self):
+        now = time.monotonic()
+        if now - self.refreshed_at < settings.GEOFENCE_REFRESH_SECONDS:
+            return
+        with self._refresh_lock:
+            if now - self.refreshed_at < settings.GEOFENCE_REFRESH_SECONDS:
+                return
+            started = timezone.now()
+            changed = AreaSubscription.objects.all()
+            if self.since is not None:
+                changed = changed.filter(updated_at__gte=self.since - REFRESH_OVERLAP)
+            for subscription_id, area, types, active in changed.values_list(
+                'id', 'area', 'incident_types', 'is_active'
+            ).iterator():
+                if active:
+                    self.index.add(subscription_id, area, types)
+                else:
+                    self.index.remove(subscription_id)
+            active = AreaSubscription.objects.filter(is_active=True)
+            if active.count() != len(self.index):
+                # Suppressions : on retire ce qui n'existe plus
+                for subscription_id in self.index.ids() - set(active.values_list('id', flat=True)):
+                    self.index.remove(subscription_id)
+            self.since = started
+            self.refreshed_at = now
+
+    def match(self, incident):
+        self.refresh_if_due()
+        return self.index.match(incident.location.x, incident.location.y, incident.incident_type)
+
+
+_subscriptions = None
+
+
+def get_subscriptions():
+    global _subscriptions
+    if _subscriptions is None:
+        _subscriptions = SubscriptionIndex()
+    return _subscriptions
+
+
+def notify_subscribers(incidents):
+    """
+    À appeler dans la transaction qui crée les incidents : programme la
+    notification des abonnements concernés (incidents.tasks).
+    """
+    index = get_subscriptions()
+    pairs = [
+        [incident.id, subscription_id]
+        for incident in incidents
+        for subscription_id in index.match(incident)
+    ]
+    if pairs:
+        enqueue('incidents.notify_area_subscribers', {'pairs': pairs})
+    return pairs
+
+
+@receiver([post_save, post_delete], sender=AreaSubscription)
+def _subscription_changed(sender, **kwargs):
+    if _subscriptions is not None:
+        _subscriptions.invalidate()
@@ -0,0 +1,129 @@
+"""
+Carte de chaleur des incidents, rendue en PNG pour le tableau de bord.
+
+Toutes les étapes sont vectorisées, sans boucle Python par point :
+1. coordonnées lues en bloc par COPY binaire dans un tableau NumPy
+   (density.fetch_columns), filtrées par l'index GiST sur l'emprise ;
+2. projection Web Mercator et comptage par pixel (np.histogram2d) ;
+3. flou gaussien séparable (density.blur, HEATMAP_SIGMA_PX) ;
+4. échelle logarithmique et palette RGBA (table de 256 couleurs, transparente
+   là où il n'y a rien, pour se superposer au fond de carte) ;
+5. encodage PNG par Pillow.
+
+Les images sont mises en cache (cache Django) par paramètres et version
+des données : le plus grand id d'incident, qui change à chaque création,
+et la tranche de HEATMAP_CACHE_SECONDS en cours. Ce que le plus grand id
+ne voit pas (suppressions, archivage, incident validé après un id plus
+grand) est pris en compte à la tranche suivante, ETag compris.
+"""
+import hashlib
+import io
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from PIL import Image
+
+from .density import blur, fetch_columns, lnglat_to_mercator
+from .models import Incident
+
+POINTS_SQL = f"""
+    SELECT ST_X(location), ST_Y(location)
+    FROM {Incident._meta.db_table}
+    WHERE location && ST_MakeEnvelope(%s, %s, %s, %s, 4326) {{filters}}
+"""
+POINT_COLUMNS = [('lng', 'f8'), ('lat', 'f8')]
+
+# Palette : (position 0-1, R, G, B, A)
+COLOR_STOPS = [
+    (0.00, 0, 0, 255, 0),
+    (0.15, 0, 0, 255, 120),
+    (0.35, 0, 255, 255, 170),
+    (0.55, 0, 255, 0, 200),
+    (0.75, 255, 255, 0, 220),
+    (1.00, 255, 0, 0, 240),
+]
+
+
+def _palette():
+    positions = np.array([stop[0] for stop in COLOR_STOPS])
+    steps = np.linspace(0, 1, 256)
+    lut = np.stack(
+        [np.interp(steps, positions, [stop[channel] for stop in COLOR_STOPS]) for channel in range(1, 5)],
+        axis=1,
+    )
+    return lut.round().astype(np.uint8)
+
+
+PALETTE = _palette()
+
+
+def data_version():
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COALESCE(max(id), 0) FROM {Incident._meta.db_table}")
+        return cursor.fetchone()[0], int(time.time()) // settings.HEATMAP_CACHE_SECONDS
+
+
+def fetch_points(bbox, incident_type=None, start=None, end=None):
+    """Tableaux (lng, lat) des incidents de l'emprise"""
+    filters, params = [], list(bbox)
+    if incident_type:
+        filters.append('AND incident_type = %s')
+        params.append(incident_type)
+    if start is not None:
+        filters.append('AND created_at >= %s')
+        params.append(start)
+    if end is not None:
+        filters.append('AND created_at < %s')
+        params.append(end)
+    rows = fetch_columns(POINTS_SQL.format(filters=' '.join(filters)), params, POINT_COLUMNS)
+    return rows['lng'].astype(np.float64), rows['lat'].astype(np.float64)
+
+
+def density_grid(lng, lat, bbox, width, height, sigma=None):
+    """Comptage par pixel puis flou ; ligne 0 au nord"""
+    x, y = lnglat_to_mercator(lng, lat)
+    (x0, x1), (y0, y1) = lnglat_to_mercator(np.array(bbox[0::2], dtype=np.float64),
+                                            np.array(bbox[1::2], dtype=np.float64))
+    counts, _, _ = np.histogram2d(y, x, bins=(height, width), range=[[y0, y1], [x0, x1]])
+    return blur(counts[::-1], settings.HEATMAP_SIGMA_PX if sigma is None else sigma)
+
+
+def encode_png(density):
+    """Échelle logarithmique, palette, puis PNG"""
+    peak = float(density.max())
+    if peak > 0:
+        levels = np.log1p(density) * (255 / np.log1p(peak))
+    else:
+        levels = density
+    rgba = PALETTE[np.clip(levels, 0, 255).astype(np.uint8)]
+    buffer = io.BytesIO()
+    Image.fromarray(rgba, 'RGBA').save(buffer, 'PNG', compress_level=settings.HEATMAP_PNG_COMPRESS_LEVEL)
+    return buffer.getvalue()
+
+
+def render_points(lng, lat, bbox, width, height, sigma=None):
+    """PNG (octets) des points sur l'emprise `bbox`, image `width` x `height`"""
+    return encode_png(density_grid(lng, lat, bbox, width, height, sigma))
+
+
+class Heatmap:
+    def __init__(self, bbox, width, height, incident_type=None, start=None, end=None):
+        self.bbox = tuple(bbox)
+        self.width, self.height = width, height
+        self.incident_type, self.start, self.end = incident_type, start, end
+        params = repr((self.bbox, width, height, incident_type,
+                       start.isoformat() if start else None, end.isoformat() if end else None,
+                       data_version()))
+        # Sert aussi d'ETag : connue sans relire l'image
+        self.key = 'heatmap:' + hashlib.sha256(params.encode()).hexdigest()[:32]
+
+    def png(self):
+        png = cache.get(self.key)
+        if png is None:
+            lng, lat = fetch_points(self.bbox, self.incident_type, self.start, self.end)
+            png = render_points(lng, lat, self.bbox, self.width, self.height)
+            cache.set(self.key, png, settings.HEATMAP_CACHE_SECONDS)
+        return png
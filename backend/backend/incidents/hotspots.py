@@ -0,0 +1,206 @@
+"""
+Détection des points chauds émergents.
+
+Pour chaque couple (fenêtre, type) on maintient une grille de comptage en
+Web Mercator sur l'emprise de la ville (INCIDENT_MAP_BBOX). La grille est
+mise à jour de façon incrémentale : seuls les incidents d'id supérieur au
+dernier vu sont lus, et les incidents sortis de la fenêtre sont retirés par
+tranche horaire. Les ids sont attribués avant la validation : une
+transaction lente peut rendre visible un id inférieur au dernier vu. Chaque
+lecture reprend donc aussi les incidents créés depuis HOTSPOT_OVERLAP_SECONDS
+avant la précédente, dédoublonnés par id ; une transaction plus longue que
+cette marge n'est prise en compte qu'à la reconstruction suivante. Une
+reconstruction complète a lieu périodiquement pour prendre en compte les
+suppressions.
+
+La densité est une estimation par noyau gaussien sur la grille ; les
+cellules au-dessus du seuil sont regroupées en composantes connexes.
+"""
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+
+from .density import blur, fetch_columns, lnglat_to_mercator, mercator_to_lnglat
+
+WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+}
+BUCKET_SECONDS = 3600
+
+POINTS_SQL = """
+    SELECT id,
+           ST_X(ST_Transform(location, 3857)),
+           ST_Y(ST_Transform(location, 3857)),
+           extract(epoch FROM created_at)::float8
+    FROM incidents_incident
+    WHERE created_at >= to_timestamp(%s)
+      AND (id > %s OR created_at >= to_timestamp(%s)) {type_filter}
+"""
+POINT_COLUMNS = [('id', 'i8'), ('x', 'f8'), ('y', 'f8'), ('t', 'f8')]
+
+
+class DensityGrid:
+    def __init__(self, window, incident_type=None):
+        self.window = window
+        self.incident_type = incident_type
+        self.cell = settings.HOTSPOT_CELL_M
+        lng_min, lat_min, lng_max, lat_max = settings.INCIDENT_MAP_BBOX
+        (self.x0, self.x1), (self.y0, self.y1) = (
+            lnglat_to_mercator(np.array([lng_min, lng_max]), np.array([lat_min, lat_max]))
+        )
+        self.nx = int(np.ceil((self.x1 - self.x0) / self.cell))
+        self.ny = int(np.ceil((self.y1 - self.y0) / self.cell))
+        self.lock = threading.Lock()
+        self.version = 0
+        self._reset()
+
+    def _reset(self):
+        self.counts = np.zeros(self.nx * self.ny, dtype=np.int32)
+        self.buckets = deque()  # (début de tranche, indices de cellules)
+        self.last_id = 0
+        self.built_at = None
+        self.loaded_at = None
+        # id -> horodatage des incidents comptés qu'une lecture peut relire
+        self.recent = {}
+        # Jamais remise à zéro : get_hotspots met les résultats en cache par
+        # version, une reconstruction ne doit pas retomber sur une version servie
+        self.version += 1
+
+    def _cells(self, x, y):
+        col = ((x - self.x0) // self.cell).astype(np.int64)
+        row = ((y - self.y0) // self.cell).astype(np.int64)
+        inside = (col >= 0) & (col < self.nx) & (row >= 0) & (row < self.ny)
+        return inside, row * self.nx + col
+
+    def _load(self, since, after_id, overlap_from):
+        type_filter = 'AND incident_type = %s' if self.incident_type else ''
+        params = [since, after_id, overlap_from] + ([self.incident_type] if self.incident_type else [])
+        return fetch_columns(POINTS_SQL.format(type_filter=type_filter), params, POINT_COLUMNS)
+
+    def _add(self, rows, keep_from):
+        if self.recent:
+            rows = rows[~np.isin(rows['id'], np.fromiter(self.recent, dtype=np.int64))]
+        if rows.size == 0:
+            return
+        fresh = rows[rows['t'] >= keep_from]
+        self.recent.update(zip(fresh['id'].tolist(), fresh['t'].tolist()))
+        self.last_id = max(self.last_id, int(rows['id'].max()))
+        inside, flat = self._cells(rows['x'].astype(np.float64), rows['y'].astype(np.float64))
+        flat = flat[inside]
+        bucket = (rows['t'][inside] // BUCKET_SECONDS).astype(np.int64) * BUCKET_SECONDS
+        self.counts += np.bincount(flat, minlength=self.counts.size).astype(np.int32)
+
+        # Regroupe les nouvelles cellules par tranche horaire
+        order = np.argsort(bucket, kind='stable')
+        bucket, flat = bucket[order], flat[order]
+        starts, splits = np.unique(bucket, return_index=True)
+        for start, cells in zip(starts.tolist(), np.split(flat, splits[1:])):
+            if self.buckets and self.buckets[-1][0] == start:
+                self.buckets[-1] = (start, np.concatenate([self.buckets[-1][1], cells]))
+            elif self.buckets and self.buckets[-1][0] > start:
+                # Incident horodaté dans une tranche passée (synchronisation)
+                self.buckets.append((start, cells))
+                self.buckets = deque(sorted(self.buckets, key=lambda b: b[0]))
+            else:
+                self.buckets.append((start, cells))
+        self.version += 1
+
+    def _expire(self, window_start):
+        while self.buckets and self.buckets[0][0] + BUCKET_SECONDS <= window_start:
+            _start, cells = self.buckets.popleft()
+            self.counts -= np.bincount(cells, minlength=self.counts.size).astype(np.int32)
+            self.version += 1
+
+    def refresh(self, now):
+        with self.lock:
+            window_start = now - self.window.total_seconds()
+            if self.built_at is None or now - self.built_at > settings.HOTSPOT_REBUILD_SECONDS:
+                self._reset()
+                self.built_at = now
+            margin = settings.HOTSPOT_OVERLAP_SECONDS
+            overlap_from = window_start if self.loaded_at is None else self.loaded_at - margin
+            # Avant overlap_from, seuls les ids > last_id sont relus
+            self.recent = {i: t for i, t in self.recent.items() if t >= overlap_from}
+            self._add(self._load(window_start, self.last_id, overlap_from), now - margin)
+            self.loaded_at = now
+            self._expire(window_start)
+
+    def density(self):
+        grid = self.counts.reshape(self.ny, self.nx)
+        return grid, blur(grid, settings.HOTSPOT_BANDWIDTH_M / self.cell)
+
+
+def _components(mask):
+    """Composantes 8-connexes des cellules chaudes (peu nombreuses)"""
+    remaining = set(zip(*np.nonzero(mask)))
+    components = []
+    while remaining:
+        stack = [remaining.pop()]
+        component = []
+        while stack:
+            row, col = stack.pop()
+            component.append((row, col))
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    neighbour = (row + dr, col + dc)
+                    if neighbour in remaining:
+                        remaining.remove(neighbour)
+                        stack.append(neighbour)
+        components.append(component)
+    return components
+
+
+def find_hotspots(grid, min_incidents):
+    counts, density = grid.density()
+    positive = density[density > 0]
+    if positive.size == 0:
+        return []
+    threshold = positive.mean() + settings.HOTSPOT_THRESHOLD_STD * positive.std()
+    hotspots = []
+    for component in _components(density >= threshold):
+        rows, cols = np.array(component).T
+        weights = density[rows, cols]
+        incidents = int(counts[rows, cols].sum())
+        if incidents < min_incidents:
+            continue
+        x = grid.x0 + (np.average(cols, weights=weights) + 0.5) * grid.cell
+        y = grid.y0 + (np.average(rows, weights=weights) + 0.5) * grid.cell
+        lng, lat = mercator_to_lnglat(x, y)
+        hotspots.append({
+            'latitude': round(float(lat), 6),
+            'longitude': round(float(lng), 6),
+            'incident_count': incidents,
+            'peak_density': round(float(weights.max()), 3),
+            'area_m2': int(len(component) * grid.cell ** 2),
+        })
+    return sorted(hotspots, key=lambda h: h['incident_count'], reverse=True)
+
+
+_grids = {}
+_results = {}
+_registry_lock = threading.Lock()
+
+
+def get_hotspots(window_key, incident_type=None, min_incidents=3):
+    """Points chauds pour une fenêtre de WINDOWS, mis en cache par version de grille"""
+    key = (window_key, incident_type)
+    with _registry_lock:
+        grid = _grids.get(key)
+        if grid is None:
+            grid = _grids[key] = DensityGrid(WINDOWS[window_key], incident_type)
+
+    grid.refresh(time.time())
+    cached = _results.get(key + (min_incidents,))
+    if cached and cached[0] == grid.version:
+        return cached[1]
+    with grid.lock:
+        version = grid.version
+        result = find_hotspots(grid, min_incidents)
+    _results[key + (min_incidents,)] = (version, result)
+    return result
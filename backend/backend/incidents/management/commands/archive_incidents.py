@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from incidents.archive import archive_range
+from incidents.models import Incident
+from incidents.partitions import add_months, month_start
+
+
+class Command(BaseCommand):
+    help = "Déplace les incidents anciens et leurs médias vers des archives Parquet/zip"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int,
+                            default=settings.INCIDENT_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        oldest = Incident.objects.order_by('created_at').values_list('created_at', flat=True).first()
+        if oldest is None or oldest >= cutoff:
+            self.stdout.write("Aucun incident à archiver")
+            return
+
+        tag = timezone.now().strftime('%Y%m%d%H%M%S')
+        month = month_start(oldest)
+        total = 0
+        # Un fichier par mois : aligné sur les partitions, qui peuvent ensuite
+        # être détachées par manage_partitions
+        while month < cutoff:
+            end = min(add_months(month, 1), cutoff)
+            if options['dry_run']:
+                count = Incident.objects.filter(created_at__gte=month, created_at__lt=end).count()
+                self.stdout.write(f"[dry-run] {month:%Y-%m} : {count} incidents")
+            else:
+                try:
+                    count = archive_range(month, end, tag)
+                except ImproperlyConfigured as e:
+                    raise CommandError(str(e))
+                self.stdout.write(f"{month:%Y-%m} : {count} incidents archivés")
+            total += count
+            month = add_months(month, 1)
+
+        self.stdout.write(self.style.SUCCESS(f"{total} incidents traités"))
@@ -0,0 +1,175 @@
+import json
+import random
+import subprocess
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from incidents.seeding import make_rng, sample_description, sample_location
+
+SCENARIOS = ['create', 'list', 'stats', 'sync', 'nearby']
+
+
+def percentile(sorted_values, pct):
+    """Percentile par rang le plus proche sur une liste triée"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+class ApiClient:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, token=None, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        req.add_header('Content-Type', 'application/json')
+        if token:
+            req.add_header('Authorization', f'Bearer {token}')
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def login(self, username, password):
+        status, body = self.request('POST', '/api/users/token/', payload={
+            'username': username,
+            'password': password,
+        })
+        if status != 200:
+            raise CommandError(f"Connexion impossible pour {username} ({status})")
+        return json.loads(body)['access']
+
+
+class Command(BaseCommand):
+    help = "Scénarios de charge contre un serveur local : latences p50/p95/p99, débit, export JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help="Scénario à exécuter (répétable, tous par défaut)")
+        parser.add_argument('--requests', type=int, default=500, help="Requêtes par scénario")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--users', type=int, default=20, help="Comptes citoyens utilisés")
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--password', default='benchpass123')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--output', help="Fichier JSON de résultats")
+        parser.add_argument('--compare', help="Résultats JSON de référence à comparer")
+
+    def handle(self, *args, **options):
+        client = ApiClient(options['base_url'], options['timeout'])
+        rng = make_rng()
+
+        tokens = [
+            client.login(f"{options['prefix']}_user_{i}", options['password'])
+            for i in range(options['users'])
+        ]
+        admin_token = client.login(f"{options['prefix']}_admin", options['password'])
+
+        def create(_):
+            lat, lng, incident_type = sample_location(rng)
+            return client.request('POST', '/api/incidents/', random.choice(tokens), {
+                'incident_type': incident_type,
+                'description': sample_description(rng, incident_type),
+                'location': f'{lat},{lng}',
+            })
+
+        def nearby(_):
+            lat, lng, _type = sample_location(rng)
+            return client.request(
+                'GET', f'/api/incidents/nearby/?lat={lat}&lng={lng}&radius=1000',
+                random.choice(tokens),
+            )
+
+        scenarios = {
+            'create': create,
+            'list': lambda _: client.request('GET', '/api/incidents/', random.choice(tokens)),
+            'stats': lambda _: client.request('GET', '/api/incidents/stats/', admin_token),
+            'sync': lambda _: client.request('POST', '/api/incidents/sync/', random.choice(tokens), {}),
+            'nearby': nearby,
+        }
+
+        results = {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'commit': self._git_commit(),
+            'base_url': options['base_url'],
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'scenarios': {},
+        }
+        for name in options['scenario'] or SCENARIOS:
+            self.stdout.write(f"Scénario {name}...")
+            results['scenarios'][name] = self._run(
+                scenarios[name], options['requests'], options['concurrency'], options['warmup']
+            )
+            self._print(name, results['scenarios'][name])
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                self._compare(json.load(f), results)
+
+    def _run(self, call, count, concurrency, warmup):
+        for i in range(warmup):
+            call(i)
+
+        def timed(i):
+            start = time.perf_counter()
+            status, _body = call(i)
+            return time.perf_counter() - start, status
+
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(timed, range(count)))
+        wall = time.perf_counter() - wall_start
+
+        latencies = sorted(s[0] * 1000 for s in samples)
+        errors = sum(1 for s in samples if s[1] >= 400)
+        return {
+            'count': count,
+            'errors': errors,
+            'throughput_rps': round(count / wall, 2),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'max_ms': round(latencies[-1], 2),
+        }
+
+    def _print(self, name, r):
+        self.stdout.write(
+            f"  {name:<8} p50={r['p50_ms']}ms p95={r['p95_ms']}ms p99={r['p99_ms']}ms "
+            f"débit={r['throughput_rps']} req/s erreurs={r['errors']}"
+        )
+
+    def _compare(self, baseline, current):
+        self.stdout.write(f"Comparaison avec {baseline.get('commit')} :")
+        for name, r in current['scenarios'].items():
+            ref = baseline.get('scenarios', {}).get(name)
+            if not ref:
+                continue
+            for key in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'):
+                delta = (r[key] - ref[key]) / ref[key] * 100 if ref[key] else 0
+                self.stdout.write(f"  {name:<8} {key:<15} {ref[key]:>10} -> {r[key]:>10} ({delta:+.1f}%)")
+
+    @staticmethod
+    def _git_commit():
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL
+            ).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
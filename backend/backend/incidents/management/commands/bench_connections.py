@@ -0,0 +1,96 @@
+import copy
+import importlib.util
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+
+from incidents.management.commands.bench_api import percentile
+
+# Requête minimale touchant PostGIS, comme la première requête d'une vue
+PROBE_SQL = "SELECT ST_AsText(ST_MakePoint(0, 0))"
+
+
+class Command(BaseCommand):
+    help = "Compare le coût d'obtention d'une connexion : nouvelle connexion, persistante, pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        base = connections['default'].settings_dict
+        modes = {
+            'fresh': self._fresh,
+            'persistent': self._persistent,
+        }
+        if importlib.util.find_spec('psycopg_pool') and importlib.util.find_spec('psycopg'):
+            modes['pool'] = self._pool
+        else:
+            self.stdout.write("psycopg_pool absent : mode pool ignoré")
+
+        for name, run in modes.items():
+            timings = sorted(run(base, options['iterations']))
+            self.stdout.write(
+                f"{name:<11} moyenne {statistics.mean(timings):7.3f} ms  "
+                f"p50 {percentile(timings, 50):7.3f} ms  p95 {percentile(timings, 95):7.3f} ms"
+            )
+
+    def _wrapper(self, base, alias, **overrides):
+        settings_dict = copy.deepcopy(base)
+        settings_dict.update(overrides)
+        return load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, alias)
+
+    def _timed(self, iterations, step):
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            step()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def _probe(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute(PROBE_SQL)
+            cursor.fetchone()
+
+    def _fresh(self, base, iterations):
+        """Une connexion par requête (CONN_MAX_AGE = 0, sans pool) : l'ancien comportement"""
+        wrapper = self._wrapper(base, 'bench_fresh', CONN_MAX_AGE=0, OPTIONS={})
+
+        def step():
+            wrapper.connect()
+            self._probe(wrapper)
+            wrapper.close()
+        return self._timed(iterations, step)
+
+    def _persistent(self, base, iterations):
+        """Connexion réutilisée, vérifiée entre deux requêtes (CONN_HEALTH_CHECKS)"""
+        wrapper = self._wrapper(base, 'bench_persistent', CONN_MAX_AGE=None,
+                                CONN_HEALTH_CHECKS=True, OPTIONS={})
+
+        def step():
+            # Fin de requête puis début de la suivante, comme le font les signaux Django
+            wrapper.close_if_unusable_or_obsolete()
+            wrapper.health_check_done = False
+            self._probe(wrapper)
+        try:
+            return self._timed(iterations, step)
+        finally:
+            wrapper.close()
+
+    def _pool(self, base, iterations):
+        """Connexion empruntée puis rendue au pool psycopg 3"""
+        options = dict(base.get('OPTIONS', {}))
+        options.setdefault('pool', {'min_size': 1, 'max_size': 2})
+        wrapper = self._wrapper(base, 'bench_pool', CONN_MAX_AGE=0, OPTIONS=options)
+
+        def step():
+            wrapper.connect()
+            self._probe(wrapper)
+            wrapper.close()
+        try:
+            return self._timed(iterations, step)
+        finally:
+            wrapper.close_pool()
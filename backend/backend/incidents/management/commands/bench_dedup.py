@@ -0,0 +1,46 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from incidents.dedup import RecentIncidentIndex
+from incidents.management.commands.bench_api import percentile
+from incidents.seeding import make_rng, sample_location
+
+
+class Command(BaseCommand):
+    help = "Mesure la latence de la vérification de doublons en mémoire (sans base)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recent', type=int, default=50_000,
+                            help="Incidents présents dans la fenêtre récente")
+        parser.add_argument('--checks', type=int, default=100_000)
+        parser.add_argument('--radius', type=float, default=200)
+        parser.add_argument('--window-minutes', type=int, default=30)
+
+    def handle(self, *args, **options):
+        rng = make_rng(42)
+        now = timezone.now()
+        window = timedelta(minutes=options['window_minutes'])
+        index = RecentIncidentIndex(options['radius'], window)
+        for i in range(options['recent']):
+            lat, lng, incident_type = sample_location(rng)
+            created_at = now - window * rng.random()
+            index.add(i, None, incident_type, lat, lng, created_at)
+
+        probes = [sample_location(rng) for _ in range(options['checks'])]
+        timings = []
+        hits = 0
+        for lat, lng, incident_type in probes:
+            start = time.perf_counter()
+            hits += index.match(incident_type, lat, lng, now) is not None
+            timings.append((time.perf_counter() - start) * 1e6)
+
+        timings.sort()
+        self.stdout.write(
+            f"{options['checks']} vérifications sur {options['recent']} incidents récents : "
+            f"moyenne {statistics.mean(timings):.1f} µs, p50 {percentile(timings, 50):.1f} µs, "
+            f"p99 {percentile(timings, 99):.1f} µs, doublons {hits}"
+        )
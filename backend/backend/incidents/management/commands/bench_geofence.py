@@ -0,0 +1,80 @@
+import math
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.core.management.base import BaseCommand
+
+from incidents.geo import METRES_PER_DEGREE
+from incidents.geofence import GeofenceIndex
+from incidents.management.commands.bench_api import percentile
+from incidents.seeding import CITY_BBOX, make_rng, sample_location
+
+TYPES = ['fire', 'accident', 'theft', 'other']
+
+
+def random_area(rng, min_radius, max_radius):
+    """Polygone étoilé (donc simple) autour d'un centre tiré dans la ville"""
+    lng_min, lat_min, lng_max, lat_max = CITY_BBOX
+    lat = rng.uniform(lat_min, lat_max)
+    lng = rng.uniform(lng_min, lng_max)
+    radius = rng.uniform(min_radius, max_radius)
+    vertices = rng.randint(8, 24)
+    angles = sorted(rng.uniform(0, 2 * math.pi) for _ in range(vertices))
+    ring = []
+    for angle in angles:
+        r = radius * rng.uniform(0.6, 1.0)
+        ring.append((
+            lng + r * math.cos(angle) / (METRES_PER_DEGREE * math.cos(math.radians(lat))),
+            lat + r * math.sin(angle) / METRES_PER_DEGREE,
+        ))
+    ring.append(ring[0])
+    return MultiPolygon(Polygon(ring), srid=4326)
+
+
+class Command(BaseCommand):
+    help = "Mesure la recherche des abonnements par zone couvrant un point (sans base)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--areas', type=int, default=20_000)
+        parser.add_argument('--checks', type=int, default=20_000)
+        parser.add_argument('--min-radius', type=float, default=100, help="mètres")
+        parser.add_argument('--max-radius', type=float, default=1500, help="mètres")
+        parser.add_argument('--cell', type=float, default=settings.GEOFENCE_CELL_DEG,
+                            help="Taille des cellules en degrés")
+
+    def handle(self, *args, **options):
+        rng = make_rng(42)
+        areas = [random_area(rng, options['min_radius'], options['max_radius'])
+                 for _ in range(options['areas'])]
+
+        index = GeofenceIndex(options['cell'])
+        start = time.perf_counter()
+        for subscription_id, area in enumerate(areas):
+            # Un tiers des abonnements ne suit qu'un type
+            types = [rng.choice(TYPES)] if rng.random() < 1 / 3 else None
+            index.add(subscription_id, area, types)
+        build_s = time.perf_counter() - start
+
+        # Mise à jour incrémentale : remplacement d'un abonnement
+        start = time.perf_counter()
+        for subscription_id in range(100):
+            index.add(subscription_id, areas[-subscription_id - 1])
+        update_us = (time.perf_counter() - start) / 100 * 1e6
+
+        probes = [sample_location(rng) for _ in range(options['checks'])]
+        timings = []
+        hits = 0
+        for lat, lng, incident_type in probes:
+            start = time.perf_counter()
+            hits += len(index.match(lng, lat, incident_type))
+            timings.append((time.perf_counter() - start) * 1e6)
+
+        timings.sort()
+        self.stdout.write(
+            f"{len(index)} zones indexées en {build_s:.2f} s, mise à jour {update_us:.0f} µs/zone\n"
+            f"{options['checks']} recherches : moyenne {statistics.mean(timings):.1f} µs, "
+            f"p50 {percentile(timings, 50):.1f} µs, p99 {percentile(timings, 99):.1f} µs, "
+            f"{hits / len(probes):.1f} zones par incident"
+        )
@@ -0,0 +1,56 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from incidents.geo import METRES_PER_DEGREE
+from incidents.heatmap import density_grid, encode_png
+from incidents.seeding import BACKGROUND_WEIGHT, CITY_BBOX, HOTSPOTS
+
+
+def sample_points(count, seed=42):
+    """Même répartition que seeding.sample_location, tirée en bloc par NumPy"""
+    rng = np.random.default_rng(seed)
+    weights = [hotspot[4] for hotspot in HOTSPOTS] + [BACKGROUND_WEIGHT]
+    sizes = rng.multinomial(count, weights)
+    lng, lat = [], []
+    for (_name, c_lat, c_lng, sigma_m, _weight, _types), size in zip(HOTSPOTS, sizes):
+        lat.append(c_lat + rng.normal(0, sigma_m, size) / METRES_PER_DEGREE)
+        lng.append(c_lng + rng.normal(0, sigma_m, size) / (METRES_PER_DEGREE * np.cos(np.radians(c_lat))))
+    lng_min, lat_min, lng_max, lat_max = CITY_BBOX
+    lng.append(rng.uniform(lng_min, lng_max, sizes[-1]))
+    lat.append(rng.uniform(lat_min, lat_max, sizes[-1]))
+    return np.concatenate(lng), np.concatenate(lat)
+
+
+class Command(BaseCommand):
+    help = "Mesure le rendu de la carte de chaleur PNG (sans base, points générés en mémoire)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=5_000_000)
+        parser.add_argument('--sizes', default='256,512,1024,2048',
+                            help="Côtés d'image à mesurer, séparés par des virgules")
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        lng, lat = sample_points(options['points'])
+        self.stdout.write(
+            f"{lng.size} points générés en {time.perf_counter() - start:.2f} s, "
+            f"meilleur temps sur {options['repeat']} essais"
+        )
+        self.stdout.write(f"{'taille':<12}{'grille ms':>12}{'PNG ms':>10}{'total ms':>10}{'PNG Ko':>10}")
+        for side in (int(value) for value in options['sizes'].split(',')):
+            best_grid = best_png = float('inf')
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                density = density_grid(lng, lat, CITY_BBOX, side, side)
+                middle = time.perf_counter()
+                png = encode_png(density)
+                end = time.perf_counter()
+                best_grid = min(best_grid, middle - start)
+                best_png = min(best_png, end - middle)
+            self.stdout.write(
+                f"{f'{side}x{side}':<12}{best_grid * 1000:>12.1f}{best_png * 1000:>10.1f}"
+                f"{(best_grid + best_png) * 1000:>10.1f}{len(png) / 1024:>10.1f}"
+            )
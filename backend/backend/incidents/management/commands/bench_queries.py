@@ -0,0 +1,91 @@
+import json
+import statistics
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from incidents.models import Incident
+
+User = get_user_model()
+
+
+def stats_queries():
+    """Requêtes de IncidentStatsView et des listes, sous forme de querysets"""
+    now = timezone.now()
+    some_user = User.objects.filter(incidents__isnull=False).values_list('id', flat=True).first()
+    return {
+        'by_type': Incident.objects.values('incident_type').annotate(count=Count('id')),
+        'top_users': User.objects.filter(incidents__isnull=False)
+        .annotate(incident_count=Count('incidents'))
+        .order_by('-incident_count')[:5],
+        'last_7_days': Incident.objects.filter(created_at__gte=now - timedelta(days=7))
+        .annotate(date=TruncDate('created_at'))
+        .values('date').annotate(count=Count('id')).order_by('date'),
+        'recent_5': Incident.objects.order_by('-created_at')[:5],
+        'admin_list_last_30_days': Incident.objects.filter(created_at__gte=now - timedelta(days=30))
+        .order_by('-created_at'),
+        'user_list_last_30_days': Incident.objects.filter(
+            user_id=some_user, created_at__gte=now - timedelta(days=30)
+        ),
+    }
+
+
+def walk_plan(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from walk_plan(child)
+
+
+class Command(BaseCommand):
+    help = "Mesure les requêtes de statistiques et de liste avec EXPLAIN ANALYZE (partitions lues, temps)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--query', action='append', help="Limite aux requêtes nommées")
+        parser.add_argument('--output', help="Fichier JSON de résultats")
+        parser.add_argument('--compare', help="Résultats JSON de référence")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("EXPLAIN (FORMAT JSON) nécessite PostgreSQL")
+
+        results = {}
+        for name, queryset in stats_queries().items():
+            if options['query'] and name not in options['query']:
+                continue
+            timings = []
+            for _ in range(options['runs']):
+                plan = json.loads(queryset.explain(format='json', analyze=True, buffers=True))[0]
+                timings.append(plan['Planning Time'] + plan['Execution Time'])
+            relations = sorted({
+                node['Relation Name'] for node in walk_plan(plan['Plan']) if 'Relation Name' in node
+            })
+            results[name] = {
+                'median_ms': round(statistics.median(timings), 3),
+                'relations': relations,
+                'shared_blocks': plan['Plan'].get('Shared Read Blocks', 0)
+                + plan['Plan'].get('Shared Hit Blocks', 0),
+            }
+            self.stdout.write(
+                f"{name:<26} {results[name]['median_ms']:>10} ms  "
+                f"{len(relations)} relation(s) lue(s)"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            for name, r in results.items():
+                ref = baseline.get(name)
+                if ref:
+                    self.stdout.write(
+                        f"{name:<26} {ref['median_ms']:>10} -> {r['median_ms']:>10} ms, "
+                        f"relations {len(ref['relations'])} -> {len(r['relations'])}"
+                    )
@@ -0,0 +1,83 @@
+import gzip
+import time
+
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from backend.middleware import brotli
+from incidents.compact import columns_from_rows
+from incidents.models import Incident
+from incidents.renderers import COMPACT_RENDERERS
+from incidents.seeding import make_rng, sample_description, sample_location, sample_timestamp
+from incidents.serializers import IncidentSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare taille et temps de sérialisation des formats de liste (sans base)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        incidents = self._incidents(options['count'])
+        request = RequestFactory().get('/api/incidents/', HTTP_HOST='api.example.org')
+
+        def drf_json():
+            data = IncidentSerializer(incidents, many=True, context={'request': request}).data
+            return JSONRenderer().render(data)
+
+        formats = {'json': drf_json}
+        for renderer_class in COMPACT_RENDERERS:
+            formats[renderer_class.format] = self._compact(incidents, renderer_class())
+
+        self.stdout.write(f"{len(incidents)} incidents, meilleur temps sur {options['repeat']} essais")
+        header = f"{'format':<10}{'sérial. ms':>12}{'brut Ko':>10}{'gzip Ko':>10}"
+        if brotli is not None:
+            header += f"{'br Ko':>10}"
+        self.stdout.write(header)
+        for name, render in formats.items():
+            best = float('inf')
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                body = render()
+                best = min(best, time.perf_counter() - start)
+            line = (
+                f"{name:<10}{best * 1000:>12.1f}{len(body) / 1024:>10.1f}"
+                f"{len(gzip.compress(body, compresslevel=6)) / 1024:>10.1f}"
+            )
+            if brotli is not None:
+                line += f"{len(brotli.compress(body, quality=5)) / 1024:>10.1f}"
+            self.stdout.write(line)
+
+    def _incidents(self, count):
+        rng = make_rng(42)
+        now = timezone.now()
+        incidents = []
+        for i in range(count):
+            lat, lng, incident_type = sample_location(rng)
+            incidents.append(Incident(
+                id=count - i,
+                user_id=rng.randint(1, 500),
+                incident_type=incident_type,
+                description=sample_description(rng, incident_type),
+                photo=f'incident_photos/{i}.jpg' if rng.random() < 0.4 else '',
+                audio=f'incident_audio/{i}.m4a' if rng.random() < 0.1 else '',
+                location=Point(lng, lat, srid=4326),
+                created_at=sample_timestamp(rng, now, 30),
+            ))
+        return incidents
+
+    def _compact(self, incidents, renderer):
+        def render():
+            # Mêmes tuples que compact_rows() lirait en base
+            rows = [
+                (i.id, i.user_id, i.incident_type, i.description, i.photo.name, i.audio.name,
+                 i.location.y, i.location.x, i.created_at, i.canonical_id, i.district, i.street)
+                for i in incidents
+            ]
+            return renderer.render(columns_from_rows(rows))
+        return render
@@ -0,0 +1,314 @@
+import csv
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from incidents.pgcopy import copy_from
+from incidents.seeding import (
+    BACKGROUND_TYPES,
+    BACKGROUND_WEIGHT,
+    CITY_BBOX,
+    DESCRIPTIONS,
+    HOTSPOTS,
+    HOURLY_WEIGHTS,
+)
+from incidents.geo import METRES_PER_DEGREE
+
+try:
+    import numpy as np
+except ImportError:  # dépendance optionnelle, uniquement pour ce générateur
+    np = None
+
+# (utilisateurs, incidents, incidents hors ligne, part d'incidents avec média)
+PROFILES = {
+    'small': (10_000, 1_000_000, 20_000, 0.2),
+    'medium': (100_000, 10_000_000, 200_000, 0.2),
+    'large': (500_000, 30_000_000, 1_000_000, 0.2),
+    'huge': (1_000_000, 100_000_000, 2_000_000, 0.2),
+}
+
+# Le module est importé par les processus fils avant django.setup() :
+# pas d'import de modèles au niveau module
+TYPES = list(DESCRIPTIONS)
+STUB_PHOTOS = [f'incident_photos/stub_{i}.jpg' for i in range(16)]
+STUB_AUDIO = [f'incident_audio/stub_{i}.m4a' for i in range(16)]
+
+
+def _type_cdf(distribution):
+    return np.cumsum([distribution.get(t, 0.0) for t in TYPES])
+
+
+def sample_points(rng, size):
+    """
+    Échantillonnage vectorisé : retourne (lat, lng, index de type) pour
+    `size` incidents, selon le même mélange que incidents.seeding.
+    """
+    weights = np.array([h[4] for h in HOTSPOTS] + [BACKGROUND_WEIGHT])
+    component = rng.choice(len(weights), size=size, p=weights / weights.sum())
+
+    centers = np.array([(h[1], h[2]) for h in HOTSPOTS])
+    sigmas = np.array([h[3] for h in HOTSPOTS], dtype=np.float64)
+    lat = np.empty(size)
+    lng = np.empty(size)
+
+    background = component == len(HOTSPOTS)
+    lng_min, lat_min, lng_max, lat_max = CITY_BBOX
+    n_bg = int(background.sum())
+    lat[background] = rng.uniform(lat_min, lat_max, n_bg)
+    lng[background] = rng.uniform(lng_min, lng_max, n_bg)
+
+    hot = ~background
+    idx = component[hot]
+    base_lat = centers[idx, 0]
+    sigma = sigmas[idx]
+    lat[hot] = base_lat + rng.normal(0, 1, idx.size) * sigma / METRES_PER_DEGREE
+    lng[hot] = centers[idx, 1] + rng.normal(0, 1, idx.size) * sigma / (
+        METRES_PER_DEGREE * np.cos(np.radians(base_lat))
+    )
+
+    cdf = np.vstack([_type_cdf(h[5]) for h in HOTSPOTS] + [_type_cdf(BACKGROUND_TYPES)])
+    u = rng.random(size)[:, None]
+    type_idx = np.minimum((u > cdf[component]).sum(axis=1), len(TYPES) - 1)
+    return lat, lng, type_idx
+
+
+def sample_epochs(rng, size, now_ts, days):
+    hourly = np.array(HOURLY_WEIGHTS)
+    day = rng.integers(0, days, size)
+    hour = rng.choice(24, size=size, p=hourly / hourly.sum())
+    midnight = now_ts - now_ts % 86400
+    stamps = midnight - day * 86400 + hour * 3600 + rng.integers(0, 3600, size)
+    return np.minimum(stamps, now_ts)
+
+
+def ewkb_hex(lng, lat):
+    """Points en EWKB hexadécimal (SRID 4326), construits sans boucle Python"""
+    raw = np.empty(lng.size, dtype=[('x', '<f8'), ('y', '<f8')])
+    raw['x'] = lng
+    raw['y'] = lat
+    coords = raw.tobytes().hex()
+    prefix = '0101000020e6100000'
+    return [prefix + coords[i:i + 32] for i in range(0, len(coords), 32)]
+
+
+def iso_timestamps(epochs):
+    return np.datetime_as_string(epochs.astype('datetime64[s]'), unit='s', timezone='UTC')
+
+
+def _csv_chunk(rows):
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator='\n').writerows(rows)
+    return buf.getvalue().encode()
+
+
+def _init_worker():
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _prepare_session(cursor):
+    # Génération jetable : pas besoin d'attendre le fsync à chaque commit
+    cursor.execute("SET synchronous_commit = off")
+
+
+def generate_incident_chunk(task):
+    seed, size, user_range, media_ratio, now_ts, days = task
+    rng = np.random.default_rng(seed)
+    lat, lng, type_idx = sample_points(rng, size)
+    users = rng.integers(user_range[0], user_range[1] + 1, size)
+    created = iso_timestamps(sample_epochs(rng, size, now_ts, days))
+    locations = ewkb_hex(lng, lat)
+
+    descriptions = np.array([
+        [DESCRIPTIONS[t][i % len(DESCRIPTIONS[t])] for i in range(3)] for t in TYPES
+    ], dtype=object)
+    desc = descriptions[type_idx, rng.integers(0, 3, size)]
+    types = np.array(TYPES, dtype=object)[type_idx]
+
+    has_photo = rng.random(size) < media_ratio
+    has_audio = rng.random(size) < media_ratio / 2
+    stub = rng.integers(0, len(STUB_PHOTOS), size)
+    photos = np.where(has_photo, np.array(STUB_PHOTOS, dtype=object)[stub], '')
+    audios = np.where(has_audio, np.array(STUB_AUDIO, dtype=object)[stub], '')
+
+    sql = (
+        "COPY incidents_incident (user_id, incident_type, description, photo, audio, location, created_at) "
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+    step = 50_000
+    chunks = (
+        _csv_chunk(zip(
+            users[i:i + step].tolist(), types[i:i + step], desc[i:i + step],
+            photos[i:i + step], audios[i:i + step], locations[i:i + step], created[i:i + step],
+        ))
+        for i in range(0, size, step)
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        _prepare_session(cursor)
+        copy_from(cursor, sql, chunks)
+    return size
+
+
+def generate_offline_chunk(task):
+    seed, size, user_range, now_ts = task
+    rng = np.random.default_rng(seed)
+    lat, lng, type_idx = sample_points(rng, size)
+    users = rng.integers(user_range[0], user_range[1] + 1, size)
+    created = iso_timestamps(now_ts - rng.integers(0, 3 * 86400, size))
+    types = np.array(TYPES, dtype=object)[type_idx]
+
+    rows = zip(
+        users.tolist(), types, ('Signalement hors ligne',) * size, ('',) * size, ('',) * size,
+        lat.round(7).tolist(), lng.round(7).tolist(), ('f',) * size, created,
+    )
+    sql = (
+        "COPY incidents_offlineincident (user_id, incident_type, description, photo_path, audio_path, "
+        "latitude, longitude, is_synced, created_at) "
+        "FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (photo_path, audio_path))"
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        _prepare_session(cursor)
+        copy_from(cursor, sql, [_csv_chunk(rows)])
+    return size
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère des dizaines de millions d'incidents via COPY FROM STDIN, "
+        "en parallèle sur plusieurs processus (PostgreSQL uniquement)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=PROFILES, default='small')
+        parser.add_argument('--users', type=int, help="Remplace la valeur du profil")
+        parser.add_argument('--incidents', type=int, help="Remplace la valeur du profil")
+        parser.add_argument('--offline', type=int, help="Remplace la valeur du profil")
+        parser.add_argument('--media-ratio', type=float, help="Remplace la valeur du profil")
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--chunk-size', type=int, default=500_000,
+                            help="Lignes par tâche (une transaction par tâche)")
+        parser.add_argument('--prefix', default='gen')
+        parser.add_argument('--password', default='benchpass123')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError("NumPy est requis : pip install numpy")
+        if connection.vendor != 'postgresql':
+            raise CommandError("Ce générateur utilise COPY et nécessite PostgreSQL")
+
+        n_users, n_incidents, n_offline, media_ratio = PROFILES[options['profile']]
+        n_users = options['users'] if options['users'] is not None else n_users
+        n_incidents = options['incidents'] if options['incidents'] is not None else n_incidents
+        n_offline = options['offline'] if options['offline'] is not None else n_offline
+        if options['media_ratio'] is not None:
+            media_ratio = options['media_ratio']
+        if n_users < 1:
+            raise CommandError("Au moins un utilisateur est nécessaire")
+
+        now_ts = int(timezone.now().timestamp())
+        started = time.perf_counter()
+
+        user_range = self._copy_users(n_users, options, now_ts)
+        self.stdout.write(f"{n_users} utilisateurs insérés (ids {user_range[0]}-{user_range[1]})")
+        if media_ratio:
+            self._write_media_stubs()
+
+        chunk = options['chunk_size']
+        seed = options['seed']
+        tasks = [
+            (generate_incident_chunk,
+             (seed + i, min(chunk, n_incidents - start), user_range, media_ratio, now_ts, options['days']))
+            for i, start in enumerate(range(0, n_incidents, chunk))
+        ]
+        tasks += [
+            (generate_offline_chunk, (seed + 1_000_000 + i, min(chunk, n_offline - start), user_range, now_ts))
+            for i, start in enumerate(range(0, n_offline, chunk))
+        ]
+
+        # Les connexions ne doivent pas être partagées avec les processus fils
+        connections.close_all()
+        done = 0
+        total = n_incidents + n_offline
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=get_context('spawn'),
+            initializer=_init_worker,
+        ) as pool:
+            futures = [pool.submit(func, task) for func, task in tasks]
+            for future in as_completed(futures):
+                done += future.result()
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"  {done}/{total} lignes ({done / elapsed:,.0f} lignes/s)")
+
+        # COPY contourne les vues : compteurs par utilisateur recalculés en une passe
+        from incidents.counters import repair_counts
+        self.stdout.write(f"Compteurs d'incidents : {repair_counts(10_000)} utilisateurs mis à jour")
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE users_customuser")
+            cursor.execute("ANALYZE incidents_incident")
+            cursor.execute("ANALYZE incidents_offlineincident")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Terminé en {time.perf_counter() - started:.1f} s. "
+            f"Comptes : {options['prefix']}_<id>, mot de passe : {options['password']}"
+        ))
+
+    def _copy_users(self, n_users, options, now_ts):
+        """Réserve un bloc d'identifiants puis insère les comptes par COPY"""
+        password = make_password(options['password'])
+        with transaction.atomic(), connection.cursor() as cursor:
+            # À lancer sur une base au repos : le bloc est réservé en avançant la séquence
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence('users_customuser', 'id'), "
+                "nextval(pg_get_serial_sequence('users_customuser', 'id')) + %s - 1)",
+                [n_users],
+            )
+            last_id = cursor.fetchone()[0]
+            first_id = last_id - n_users + 1
+
+            rng = np.random.default_rng(options['seed'])
+            ids = np.arange(first_id, last_id + 1)
+            joined = iso_timestamps(now_ts - rng.integers(0, options['days'] * 86400, n_users))
+            prefix = options['prefix']
+
+            def rows(start, stop):
+                for user_id, date_joined in zip(ids[start:stop].tolist(), joined[start:stop]):
+                    username = f'{prefix}_{user_id}'
+                    yield (user_id, password, 'f', username, '', '', f'{username}@example.com',
+                           'f', 't', date_joined, 'citizen')
+
+            step = 100_000
+            chunks = (_csv_chunk(rows(i, i + step)) for i in range(0, n_users, step))
+            copy_from(
+                cursor,
+                "COPY users_customuser (id, password, is_superuser, username, first_name, last_name, "
+                "email, is_staff, is_active, date_joined, role) "
+                "FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (first_name, last_name))",
+                chunks,
+            )
+        return first_id, last_id
+
+    def _write_media_stubs(self):
+        from PIL import Image
+
+        for i, name in enumerate(STUB_PHOTOS + STUB_AUDIO):
+            path = os.path.join(settings.MEDIA_ROOT, name)
+            if os.path.exists(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if name.endswith('.jpg'):
+                Image.new('RGB', (64, 64), (16 * i % 256, 80, 160)).save(path, 'JPEG')
+            else:
+                open(path, 'wb').close()
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from incidents.gazetteer import backfill
+from jobs.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = "Renseigne quartier et rue des incidents existants depuis le référentiel local"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Incidents mis à jour par transaction")
+        parser.add_argument('--all', action='store_true',
+                            help="Recalcule aussi les incidents déjà géocodés (après load_gazetteer)")
+        parser.add_argument('--enqueue', action='store_true',
+                            help="Confie le traitement aux workers (run_workers) au lieu de l'exécuter ici")
+
+    def handle(self, *args, **options):
+        only_missing = not options['all']
+        if options['enqueue']:
+            job = enqueue(
+                'incidents.geocode_backfill',
+                {'batch_size': options['batch_size'], 'only_missing': only_missing},
+                key='geocode-backfill',
+            )
+            self.stdout.write(self.style.SUCCESS(f"Job #{job.id} programmé"))
+            return
+        count = backfill(options['batch_size'], only_missing)
+        self.stdout.write(self.style.SUCCESS(f"{count} incident(s) traité(s)"))
@@ -0,0 +1,107 @@
+from django.contrib.gis.gdal import DataSource, GDALException
+from django.contrib.gis.geos import MultiLineString, MultiPolygon
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from incidents.gazetteer import clear_cache
+from incidents.models import District, Street
+
+BATCH_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = (
+        "Charge le référentiel du géocodage inverse depuis un fichier lu par GDAL "
+        "(GeoJSON, shapefile, extrait OSM .pbf : couches multipolygons / lines)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['districts', 'streets'])
+        parser.add_argument('path')
+        parser.add_argument('--layer', default='0', help="Nom ou indice de la couche")
+        parser.add_argument('--name-field', default='name')
+        parser.add_argument('--level-field', default='admin_level',
+                            help="Quartiers : champ du niveau administratif (absent : 10)")
+        parser.add_argument('--id-field', default='osm_id')
+        parser.add_argument('--append', action='store_true',
+                            help="Ajoute au référentiel existant au lieu de le remplacer")
+
+    def handle(self, *args, **options):
+        try:
+            source = DataSource(options['path'])
+            layer = source[int(options['layer']) if options['layer'].isdigit() else options['layer']]
+        except (GDALException, IndexError) as exc:
+            raise CommandError(str(exc))
+        model = District if options['kind'] == 'districts' else Street
+        build = self._district if model is District else self._street
+        fields = set(layer.fields)
+        if options['name_field'] not in fields:
+            raise CommandError(f"Champ {options['name_field']!r} absent (champs : {', '.join(sorted(fields))})")
+
+        count = skipped = 0
+        with transaction.atomic():
+            if not options['append']:
+                model.objects.all().delete()
+            batch = []
+            for feature in layer:
+                row = build(feature, fields, options)
+                if row is None:
+                    skipped += 1
+                    continue
+                batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    model.objects.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+            model.objects.bulk_create(batch)
+            count += len(batch)
+        clear_cache()
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} {options['kind']} chargé(e)s, {skipped} ignoré(e)s. "
+            f"Pour les incidents existants : manage.py geocode_incidents --all"
+        ))
+
+    def _field(self, feature, fields, name):
+        if name not in fields:
+            return None
+        value = feature.get(name)
+        return str(value).strip() if value not in (None, '') else None
+
+    def _geometry(self, feature, kinds, multi):
+        geom = feature.geom
+        if geom.srs is not None and geom.srid != 4326:
+            geom = geom.transform(4326, clone=True)
+        geometry = geom.geos
+        geometry.srid = 4326
+        if geometry.geom_type not in kinds:
+            return None
+        if geometry.geom_type != multi.__name__:
+            geometry = multi(geometry, srid=4326)
+        return geometry
+
+    def _district(self, feature, fields, options):
+        name = self._field(feature, fields, options['name_field'])
+        area = self._geometry(feature, ('Polygon', 'MultiPolygon'), MultiPolygon)
+        level = self._field(feature, fields, options['level_field'])
+        # Extrait OSM : les multipolygones sans admin_level ne sont pas des limites
+        if not name or area is None or (options['level_field'] in fields and level is None):
+            return None
+        if not area.valid:
+            area = area.buffer(0)
+            if area.geom_type == 'Polygon':
+                area = MultiPolygon(area, srid=4326)
+        try:
+            admin_level = int(level) if level else 10
+        except ValueError:
+            return None
+        return District(name=name, admin_level=admin_level, area=area,
+                        source_id=self._field(feature, fields, options['id_field']) or '')
+
+    def _street(self, feature, fields, options):
+        name = self._field(feature, fields, options['name_field'])
+        geometry = self._geometry(feature, ('LineString', 'MultiLineString'), MultiLineString)
+        # Extrait OSM : seules les voies (highway) sont des rues
+        if not name or geometry is None or ('highway' in fields and not feature.get('highway')):
+            return None
+        return Street(name=name, geometry=geometry,
+                      source_id=self._field(feature, fields, options['id_field']) or '')
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from incidents.partitions import (
+    add_months,
+    archive_partition,
+    create_partition,
+    detach_partition,
+    drop_partition,
+    list_partitions,
+    month_start,
+)
+
+
+class Command(BaseCommand):
+    help = "Crée les partitions mensuelles à venir et détache/archive les plus anciennes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=3,
+                            help="Nombre de mois futurs à pré-créer")
+        parser.add_argument('--detach-older-than', type=int, metavar='MONTHS',
+                            help="Détache les partitions entièrement plus vieilles que MONTHS mois")
+        parser.add_argument('--archive-schema', default='incidents_archive',
+                            help="Schéma recevant les partitions détachées")
+        parser.add_argument('--drop', action='store_true',
+                            help="Supprime les partitions détachées au lieu de les archiver")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Le partitionnement nécessite PostgreSQL")
+
+        current = month_start(timezone.now())
+        with connection.cursor() as cursor:
+            for offset in range(options['ahead'] + 1):
+                month = add_months(current, offset)
+                if options['dry_run']:
+                    self.stdout.write(f"[dry-run] partition {month:%Y-%m}")
+                elif create_partition(cursor, month):
+                    self.stdout.write(self.style.SUCCESS(f"Partition {month:%Y-%m} créée"))
+
+            if options['detach_older_than'] is None:
+                return
+
+            cutoff = add_months(current, -options['detach_older_than'])
+            for name, _start, end in list_partitions(cursor):
+                if end > cutoff:
+                    continue
+                if options['dry_run']:
+                    self.stdout.write(f"[dry-run] détacher {name}")
+                    continue
+                detach_partition(cursor, name)
+                if options['drop']:
+                    drop_partition(cursor, name)
+                    self.stdout.write(f"{name} détachée et supprimée")
+                else:
+                    archive_partition(cursor, name, options['archive_schema'])
+                    self.stdout.write(f"{name} détachée vers {options['archive_schema']}")
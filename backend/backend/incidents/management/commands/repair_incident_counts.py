@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from incidents.counters import repair_counts
+from jobs.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = "Recalcule incident_count / last_incident_at des utilisateurs et corrige les écarts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Utilisateurs verrouillés et recalculés par transaction")
+        parser.add_argument('--enqueue', action='store_true',
+                            help="Confie le recalcul aux workers (run_workers) au lieu de l'exécuter ici")
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job = enqueue('incidents.repair_counts', key='repair-incident-counts')
+            self.stdout.write(self.style.SUCCESS(f"Job #{job.id} programmé"))
+            return
+        repaired = repair_counts(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{repaired} utilisateur(s) corrigé(s)"))
@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from incidents.counters import repair_counts
+from incidents.models import Incident, OfflineIncident
+from incidents.seeding import (
+    make_rng,
+    manual_timestamps,
+    sample_description,
+    sample_location,
+    sample_timestamp,
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Génère N utilisateurs et M incidents répartis autour de points chauds (insertions groupées)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--incidents', type=int, default=10000)
+        parser.add_argument('--offline', type=int, default=0,
+                            help="Incidents hors ligne non synchronisés par utilisateur")
+        parser.add_argument('--days', type=int, default=90,
+                            help="Étalement des dates de création (jours)")
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--password', default='benchpass123')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=None, help="Graine aléatoire")
+
+    def handle(self, *args, **options):
+        rng = make_rng(options['seed'])
+        batch_size = options['batch_size']
+        prefix = options['prefix']
+        now = timezone.now()
+
+        # Un seul hachage pour tous les comptes : PBKDF2 coûte ~100 ms par appel
+        password = make_password(options['password'])
+
+        start = User.objects.filter(username__startswith=f'{prefix}_user_').count()
+        users = [
+            User(
+                username=f'{prefix}_user_{start + i}',
+                email=f'{prefix}_user_{start + i}@example.com',
+                password=password,
+                role='citizen',
+            )
+            for i in range(options['users'])
+        ]
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=batch_size)
+            admin, created = User.objects.get_or_create(
+                username=f'{prefix}_admin',
+                defaults={'email': f'{prefix}_admin@example.com', 'role': 'admin'},
+            )
+            if created:
+                admin.password = password
+                admin.save()
+
+        user_ids = list(
+            User.objects.filter(username__startswith=f'{prefix}_user_')
+            .values_list('id', flat=True)
+        )
+        self.stdout.write(f"{len(users)} utilisateurs créés ({len(user_ids)} au total)")
+
+        created = 0
+        with manual_timestamps(Incident):
+            while created < options['incidents']:
+                size = min(batch_size, options['incidents'] - created)
+                batch = []
+                for _ in range(size):
+                    lat, lng, incident_type = sample_location(rng)
+                    batch.append(Incident(
+                        user_id=rng.choice(user_ids),
+                        incident_type=incident_type,
+                        description=sample_description(rng, incident_type),
+                        location=Point(lng, lat, srid=4326),
+                        created_at=sample_timestamp(rng, now, options['days']),
+                    ))
+                Incident.objects.bulk_create(batch)
+                created += size
+                self.stdout.write(f"  {created}/{options['incidents']} incidents")
+
+        # bulk_create contourne les vues : compteurs recalculés
+        repair_counts()
+
+        if options['offline']:
+            offline = []
+            for user_id in user_ids:
+                for _ in range(options['offline']):
+                    lat, lng, incident_type = sample_location(rng)
+                    offline.append(OfflineIncident(
+                        user_id=user_id,
+                        incident_type=incident_type,
+                        description=sample_description(rng, incident_type),
+                        latitude=lat,
+                        longitude=lng,
+                    ))
+            OfflineIncident.objects.bulk_create(offline, batch_size=batch_size)
+            self.stdout.write(f"{len(offline)} incidents hors ligne créés")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Terminé. Comptes : {prefix}_user_<n> / {prefix}_admin, "
+            f"mot de passe : {options['password']}"
+        ))
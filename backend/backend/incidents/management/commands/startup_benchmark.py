@@ -0,0 +1,144 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Paquets dont on suit le chargement et par qui il est déclenché
+HEAVY = ('numpy', 'PIL', 'rest_framework', 'rest_framework_simplejwt')
+
+# Exécuté dans un processus neuf : le processus courant a déjà tout importé
+CHILD = r"""
+import json, sys, time
+heavy = sys.argv[2].split(',')
+start = time.perf_counter()
+import django
+django.setup()
+ready = time.perf_counter()
+at_setup = [name for name in heavy if name in sys.modules]
+from django.test import Client
+status = Client().get(sys.argv[1], HTTP_HOST='localhost').status_code
+done = time.perf_counter()
+modules = len(sys.modules)
+from django.contrib.gis.gdal import libgdal
+from django.contrib.gis.geos import libgeos
+print(json.dumps({
+    'setup_ms': (ready - start) * 1000,
+    'first_request_ms': (done - ready) * 1000,
+    'status': status,
+    'modules': modules,
+    'at_setup': at_setup,
+    'at_request': [name for name in heavy if name in sys.modules],
+    'gdal': libgdal.lgdal._name,
+    'geos': libgeos.lgeos._name,
+}))
+"""
+
+SETUP_ONLY = "import django; django.setup()"
+
+
+def import_times(stderr):
+    """(module, self µs, cumulé µs, profondeur) depuis la sortie de -X importtime"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line.partition(':')[2].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def import_chain(rows, module):
+    """Modules dont l'import a déclenché `module` : dans la sortie de -X
+    importtime, un module apparaît avant celui qui l'importe, moins indenté"""
+    for index, (name, _self_us, _cumulative_us, depth) in enumerate(rows):
+        if name == module:
+            break
+    else:
+        return None
+    chain = []
+    for name, _self_us, _cumulative_us, parent_depth in rows[index + 1:]:
+        if parent_depth < depth:
+            chain.append(name)
+            depth = parent_depth
+    return chain
+
+
+def package_of(module):
+    parts = module.split('.')
+    # django est détaillé par sous-paquet (django.contrib.gis, django.db…)
+    if parts[0] == 'django' and len(parts) > 1:
+        if parts[1] == 'contrib' and len(parts) > 2:
+            return '.'.join(parts[:3])
+        return '.'.join(parts[:2])
+    return parts[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le démarrage d'un processus neuf : imports (django.setup()), "
+        "temps jusqu'à la première réponse et modules les plus coûteux"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--path', default='/api/incidents/',
+                            help="URL de la première requête (sans authentification)")
+        parser.add_argument('--top', type=int, default=15)
+
+    def _run(self, args, script, *extra):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings')}
+        result = subprocess.run(
+            [sys.executable, *args, '-c', script, *extra],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr else 'échec')
+        return result
+
+    def handle(self, *args, **options):
+        samples = [
+            json.loads(self._run([], CHILD, options['path'], ','.join(HEAVY)).stdout.strip().splitlines()[-1])
+            for _ in range(options['runs'])
+        ]
+        setup = statistics.median(sample['setup_ms'] for sample in samples)
+        first = statistics.median(sample['first_request_ms'] for sample in samples)
+        last = samples[-1]
+        self.stdout.write(f"Médiane sur {options['runs']} processus neufs :")
+        self.stdout.write(f"  django.setup()       {setup:8.1f} ms")
+        self.stdout.write(f"  première requête     {first:8.1f} ms  ({options['path']} -> {last['status']})")
+        self.stdout.write(f"  total                {setup + first:8.1f} ms, {last['modules']} modules")
+
+        stderr = self._run(['-X', 'importtime'], SETUP_ONLY).stderr
+        rows = import_times(stderr)
+        self.stdout.write("\nPaquets suivis :")
+        for name in HEAVY:
+            if name in last['at_setup']:
+                chain = import_chain(rows, name) or []
+                where = 'django.setup(), via ' + ' <- '.join(chain[:6])
+            elif name in last['at_request']:
+                where = 'première requête'
+            else:
+                where = 'non chargé'
+            self.stdout.write(f"  {name:<26}{where}")
+        by_package = defaultdict(int)
+        for module, self_us, _cumulative, _depth in rows:
+            by_package[package_of(module)] += self_us
+        self.stdout.write(f"\nImports de django.setup() par paquet (temps propre, {options['top']} premiers) :")
+        for package, total_us in sorted(by_package.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {package:<40}{total_us / 1000:8.1f} ms")
+        self.stdout.write("\nModules les plus lents (cumulé) :")
+        for module, _self_us, cumulative_us, depth in sorted(rows, key=lambda row: -row[2])[:options['top']]:
+            self.stdout.write(f"  {'  ' * min(depth, 4)}{module:<{40 - 2 * min(depth, 4)}}{cumulative_us / 1000:8.1f} ms")
+
+        for setting, path in (('GDAL_LIBRARY_PATH', last['gdal']), ('GEOS_LIBRARY_PATH', last['geos'])):
+            if not getattr(settings, setting, None):
+                self.stdout.write(self.style.WARNING(
+                    f"\n{setting} non défini : recherche de la bibliothèque à chaque démarrage. "
+                    f"Définir {setting}={path}"
+                ))
@@ -0,0 +1,122 @@
+from django.db import migrations, models
+
+# Remplace incidents_incident par une table partitionnée par plage mensuelle
+# sur created_at. PostgreSQL impose que la clé primaire contienne la clé de
+# partition : elle devient (id, created_at), `id` restant alimenté par une
+# séquence (les colonnes IDENTITY ne sont pas supportées sur une table
+# partitionnée avant PostgreSQL 17).
+PARTITION_SQL = """
+ALTER TABLE incidents_incident RENAME TO incidents_incident_unpartitioned;
+DO $$
+BEGIN
+    EXECUTE format(
+        'ALTER SEQUENCE %s RENAME TO incidents_incident_unpartitioned_id_seq',
+        pg_get_serial_sequence('incidents_incident_unpartitioned', 'id')
+    );
+END $$;
+
+CREATE SEQUENCE incidents_incident_id_seq AS bigint;
+
+CREATE TABLE incidents_incident (
+    id bigint NOT NULL DEFAULT nextval('incidents_incident_id_seq'),
+    incident_type varchar(50) NOT NULL,
+    description text NOT NULL,
+    photo varchar(100) NULL,
+    audio varchar(100) NULL,
+    location geometry(Point, 4326) NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    user_id bigint NOT NULL
+        REFERENCES users_customuser (id) DEFERRABLE INITIALLY DEFERRED,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE incidents_incident_id_seq OWNED BY incidents_incident.id;
+
+CREATE TABLE incidents_incident_default PARTITION OF incidents_incident DEFAULT;
+
+-- Une partition par mois, du plus ancien incident jusqu'à trois mois à l'avance
+DO $$
+DECLARE
+    part_month timestamptz;
+    last_month timestamptz := date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+                              + interval '3 months';
+BEGIN
+    SELECT coalesce(
+        date_trunc('month', min(created_at) AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+        date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+    ) INTO part_month FROM incidents_incident_unpartitioned;
+
+    WHILE part_month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF incidents_incident FOR VALUES FROM (%L) TO (%L)',
+            'incidents_incident_p' || to_char(part_month AT TIME ZONE 'UTC', 'YYYYMM'),
+            part_month, part_month + interval '1 month'
+        );
+        part_month := part_month + interval '1 month';
+    END LOOP;
+END $$;
+
+CREATE INDEX incidents_incident_user_id_idx ON incidents_incident (user_id);
+CREATE INDEX incidents_incident_location_gist ON incidents_incident USING gist (location);
+
+INSERT INTO incidents_incident
+    (id, incident_type, description, photo, audio, location, created_at, user_id)
+SELECT id, incident_type, description, photo, audio, location, created_at, user_id
+FROM incidents_incident_unpartitioned;
+
+SELECT setval(
+    'incidents_incident_id_seq',
+    coalesce((SELECT max(id) FROM incidents_incident), 0) + 1,
+    false
+);
+
+DROP TABLE incidents_incident_unpartitioned;
+ANALYZE incidents_incident;
+"""
+
+UNPARTITION_SQL = """
+ALTER TABLE incidents_incident RENAME TO incidents_incident_partitioned;
+
+CREATE TABLE incidents_incident (
+    id bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    incident_type varchar(50) NOT NULL,
+    description text NOT NULL,
+    photo varchar(100) NULL,
+    audio varchar(100) NULL,
+    location geometry(Point, 4326) NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    user_id bigint NOT NULL
+        REFERENCES users_customuser (id) DEFERRABLE INITIALLY DEFERRED
+);
+
+INSERT INTO incidents_incident
+    (id, incident_type, description, photo, audio, location, created_at, user_id)
+SELECT id, incident_type, description, photo, audio, location, created_at, user_id
+FROM incidents_incident_partitioned;
+
+SELECT setval(
+    pg_get_serial_sequence('incidents_incident', 'id'),
+    coalesce((SELECT max(id) FROM incidents_incident), 0) + 1,
+    false
+);
+
+DROP TABLE incidents_incident_partitioned CASCADE;
+
+CREATE INDEX incidents_incident_user_id_idx ON incidents_incident (user_id);
+CREATE INDEX incidents_incident_location_gist ON incidents_incident USING gist (location);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(PARTITION_SQL, UNPARTITION_SQL),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['created_at'], name='incidents_i_created_8f2c1d_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0002_partition_incident_by_month'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedIncident',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('incident_type', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField()),
+                ('data_file', models.CharField(max_length=255)),
+                ('media_file', models.CharField(blank=True, max_length=255)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_incidents', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0003_archivedincident'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='canonical',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='duplicates', to='incidents.incident'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import BtreeGinExtension
+from django.db import migrations
+
+# Trigger BEFORE ROW sur la table partitionnée : PostgreSQL 13+
+TRIGGER_SQL = """
+CREATE FUNCTION incidents_incident_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        to_tsvector('french', coalesce(NEW.description, '')) ||
+        to_tsvector('english', coalesce(NEW.description, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER incidents_incident_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF description ON incidents_incident
+    FOR EACH ROW EXECUTE FUNCTION incidents_incident_search_vector_update();
+
+UPDATE incidents_incident SET search_vector =
+    to_tsvector('french', coalesce(description, '')) ||
+    to_tsvector('english', coalesce(description, ''));
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS incidents_incident_search_vector_trigger ON incidents_incident;
+DROP FUNCTION IF EXISTS incidents_incident_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0004_incident_canonical'),
+    ]
+
+    operations = [
+        BtreeGinExtension(),
+        migrations.AddField(
+            model_name='incident',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(TRIGGER_SQL, DROP_TRIGGER_SQL),
+        migrations.AddIndex(
+            model_name='incident',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector', 'incident_type'], name='incidents_i_search_3b9e47_gin'),
+        ),
+    ]
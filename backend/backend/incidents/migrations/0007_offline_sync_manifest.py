@@ -0,0 +1,60 @@
+import django.db.models.deletion
+import incidents.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0006_incident_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offlineincident',
+            name='client_uuid',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='offlineincident',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_default='', default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='offlineincident',
+            name='photo_sha256',
+            field=models.CharField(blank=True, db_default='', default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='offlineincident',
+            name='audio_sha256',
+            field=models.CharField(blank=True, db_default='', default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='offlineincident',
+            name='sync_error',
+            field=models.CharField(blank=True, db_default='', default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='offlineincident',
+            name='incident',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='incidents.incident'),
+        ),
+        migrations.AddConstraint(
+            model_name='offlineincident',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_uuid__isnull', False)), fields=('user', 'client_uuid'), name='incidents_offline_client_uuid_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='offlineincident',
+            index=models.Index(condition=models.Q(('is_synced', False)), fields=['user', 'id'], name='incidents_offline_pending_idx'),
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('file', models.FileField(max_length=255, upload_to=incidents.models.media_blob_path)),
+                ('size', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
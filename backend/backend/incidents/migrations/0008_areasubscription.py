@@ -0,0 +1,43 @@
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0007_offline_sync_manifest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AreaSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=150)),
+                ('area', django.contrib.gis.db.models.fields.MultiPolygonField(srid=4326)),
+                ('incident_types', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(choices=[('fire', 'Fire'), ('accident', 'Accident'), ('theft', 'Theft'), ('other', 'Other')], max_length=50), blank=True, default=list, size=None)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='area_subscriptions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AreaNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('incident', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='incidents.incident')),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='incidents.areasubscription')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('subscription', 'incident'), name='incidents_area_notif_uniq')],
+                'indexes': [models.Index(fields=['subscription', '-created_at'], name='incidents_area_notif_sub_idx')],
+            },
+        ),
+    ]
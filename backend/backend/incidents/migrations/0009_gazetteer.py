@@ -0,0 +1,42 @@
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0008_areasubscription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='District',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=150)),
+                ('admin_level', models.PositiveSmallIntegerField(default=10)),
+                ('area', django.contrib.gis.db.models.fields.MultiPolygonField(srid=4326)),
+                ('source_id', models.CharField(blank=True, max_length=64)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Street',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('geometry', django.contrib.gis.db.models.fields.MultiLineStringField(srid=4326)),
+                ('source_id', models.CharField(blank=True, max_length=64)),
+            ],
+        ),
+        # db_default : ajout sans réécriture de la table (partitions comprises)
+        migrations.AddField(
+            model_name='incident',
+            name='district',
+            field=models.CharField(blank=True, db_default='', default='', editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='street',
+            field=models.CharField(blank=True, db_default='', default='', editable=False, max_length=200),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0009_gazetteer'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(condition=models.Q(('photo__isnull', True), ('photo', ''), _connector='OR'), fields=['-created_at'], name='incidents_i_no_photo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(condition=models.Q(('audio__isnull', True), ('audio', ''), _connector='OR'), fields=['-created_at'], name='incidents_i_no_audio_idx'),
+        ),
+    ]
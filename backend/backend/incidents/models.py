@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.gis.db import models as gis_models  # Nouvel import
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from users.models import CustomUser
 
 class Incident(models.Model):
@@ -17,6 +20,38 @@ class Incident(models.Model):
     audio = models.FileField(upload_to='incident_audio/', blank=True, null=True)  # Nouveau champ
     location = gis_models.PointField()  # Remplace CharField par PointField
     created_at = models.DateTimeField(auto_now_add=True)
+    # Premier signalement du même événement (voir incidents.dedup). Pas de
+    # contrainte en base : une table partitionnée ne peut pas être référencée
+    canonical = models.ForeignKey(
+        'self',
+        null=True,
+        blank=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='duplicates',
+    )
+    # Alimenté par un trigger PostgreSQL (français + anglais), voir incidents.search
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Géocodage inverse à l'écriture (voir incidents.gazetteer)
+    district = models.CharField(max_length=150, blank=True, db_default='', default='', editable=False)
+    street = models.CharField(max_length=200, blank=True, db_default='', default='', editable=False)
+
+    class Meta:
+        # Table partitionnée par mois sur created_at (migration 0002)
+        indexes = [
+            models.Index(fields=['created_at'], name='incidents_i_created_8f2c1d_idx'),
+            GinIndex(fields=['search_vector', 'incident_type'], name='incidents_i_search_3b9e47_gin'),
+            # Un index par filtre de liste (voir incidents.filters)
+            models.Index(fields=['incident_type', '-created_at'], name='incidents_i_type_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='incidents_i_user_created_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(photo__gt=''), name='incidents_i_has_photo_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(audio__gt=''), name='incidents_i_has_audio_idx'),
+            # has_photo=false / has_audio=false : même prédicat que IncidentFilter._presence
+            models.Index(fields=['-created_at'], condition=models.Q(photo__isnull=True) | models.Q(photo=''),
+                         name='incidents_i_no_photo_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(audio__isnull=True) | models.Q(audio=''),
+                         name='incidents_i_no_audio_idx'),
+        ]
 
     def __str__(self):
         return f"{self.incident_type} reported by {self.user.username}"
@@ -31,6 +66,137 @@ class OfflineIncident(models.Model):
     longitude = models.FloatField()
     is_synced = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Protocole de synchro par manifeste (voir incidents.offline_sync)
+    client_uuid = models.UUIDField(null=True, blank=True)
+    fingerprint = models.CharField(max_length=64, blank=True, db_default='', default='')
+    photo_sha256 = models.CharField(max_length=64, blank=True, db_default='', default='')
+    audio_sha256 = models.CharField(max_length=64, blank=True, db_default='', default='')
+    sync_error = models.CharField(max_length=50, blank=True, db_default='', default='')
+    incident = models.ForeignKey(
+        Incident,
+        null=True,
+        blank=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'client_uuid'],
+                condition=models.Q(client_uuid__isnull=False),
+                name='incidents_offline_client_uuid_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'id'], condition=models.Q(is_synced=False),
+                         name='incidents_offline_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"Offline {self.incident_type} (Synced: {self.is_synced})"
+
+
+MEDIA_BLOB_PREFIX = 'offline_blobs/'
+
+
+def media_blob_path(instance, filename):
+    """Chemin adressé par contenu : offline_blobs/ab/cd/abcd..."""
+    return f'{MEDIA_BLOB_PREFIX}{instance.sha256[:2]}/{instance.sha256[2:4]}/{instance.sha256}'
+
+
+class MediaBlob(models.Model):
+    """
+    Média téléversé par la synchro hors ligne, identifié par son SHA-256.
+    Un même fichier peut être partagé par plusieurs incidents : il n'est
+    jamais supprimé avec l'un d'eux.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    file = models.FileField(upload_to=media_blob_path, max_length=255)
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+class ArchivedIncident(models.Model):
+    """
+    Trace laissée dans la base pour un incident déplacé en stockage froid.
+    Les données complètes sont dans un fichier Parquet, les médias dans une
+    archive zip (chemins relatifs à INCIDENT_ARCHIVE_ROOT).
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='archived_incidents')
+    incident_type = models.CharField(max_length=50)
+    created_at = models.DateTimeField()
+    data_file = models.CharField(max_length=255)
+    media_file = models.CharField(max_length=255, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived {self.incident_type} #{self.id}"
+
+
+class District(models.Model):
+    """Limite administrative du référentiel local (manage.py load_gazetteer)"""
+    name = models.CharField(max_length=150)
+    # Niveau OSM : plus il est élevé, plus la zone est fine (10 = quartier)
+    admin_level = models.PositiveSmallIntegerField(default=10)
+    area = gis_models.MultiPolygonField(srid=4326)
+    source_id = models.CharField(max_length=64, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Street(models.Model):
+    name = models.CharField(max_length=200)
+    geometry = gis_models.MultiLineStringField(srid=4326)
+    source_id = models.CharField(max_length=64, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class AreaSubscription(models.Model):
+    """
+    Zone suivie par un service (district, quartier) : les incidents créés à
+    l'intérieur, des types choisis (vide = tous), lui sont notifiés.
+    Voir incidents.geofence.
+    """
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='area_subscriptions')
+    name = models.CharField(max_length=150)
+    area = gis_models.MultiPolygonField(srid=4326)
+    incident_types = ArrayField(
+        models.CharField(max_length=50, choices=Incident.INCIDENT_TYPES),
+        blank=True,
+        default=list,
+    )
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Sert au rechargement incrémental de l'index en mémoire
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
-        return f"Offline {self.incident_type} (Synced: {self.is_synced})"
\ No newline at end of file
+        return self.name
+
+
+class AreaNotification(models.Model):
+    subscription = models.ForeignKey(AreaSubscription, on_delete=models.CASCADE, related_name='notifications')
+    incident = models.ForeignKey(
+        Incident,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['subscription', 'incident'], name='incidents_area_notif_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['subscription', '-created_at'], name='incidents_area_notif_sub_idx'),
+        ]
@@ -0,0 +1,244 @@
+"""
+Synchronisation des incidents saisis hors ligne.
+
+1. POST sync/manifest/ : le client envoie ses éléments en attente (uuid
+   client, contenu, SHA-256 des médias), par pages d'au plus
+   OFFLINE_MANIFEST_MAX_ITEMS. Le serveur enregistre les nouveaux, signale
+   les conflits et répond avec les médias qu'il n'a pas encore.
+2. PUT sync/blobs/<sha256>/ : envoi des seuls médias manquants, stockés par
+   contenu (MediaBlob) et vérifiés à la réception.
+3. POST sync/ : la conversion en incidents est confiée à un worker, par
+   lots de OFFLINE_SYNC_BATCH_SIZE dans des transactions courtes ; le job se
+   reprogramme tant qu'il reste des éléments prêts. GET sync/ donne l'état.
+
+Un élément dont un média manque encore attend, sans bloquer les autres.
+"""
+import hashlib
+import json
+import tempfile
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .counters import incidents_added
+from .dedup import find_canonical
+from .gazetteer import lookup_point
+from .geofence import notify_subscribers
+from .models import Incident, MediaBlob, OfflineIncident
+
+CONTENT_FIELDS = ('incident_type', 'description', 'latitude', 'longitude', 'photo_sha256', 'audio_sha256')
+CHUNK_SIZE = 64 * 1024
+
+
+class BlobError(Exception):
+    pass
+
+
+def _content(item):
+    """Valeurs de CONTENT_FIELDS ; '' pour un texte absent (0.0 est une coordonnée)"""
+    get = item.get if isinstance(item, dict) else lambda name: getattr(item, name)
+    return [('' if value is None else value) for value in map(get, CONTENT_FIELDS)]
+
+
+def fingerprint(item):
+    """Empreinte du contenu d'un élément (dict ou OfflineIncident)"""
+    content = _content(item)
+    content[2], content[3] = round(float(content[2]), 7), round(float(content[3]), 7)
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False).encode()).hexdigest()
+
+
+def _needed_hashes(items):
+    return {h for item in items for h in (item.get('photo_sha256'), item.get('audio_sha256')) if h}
+
+
+def missing_blobs(hashes):
+    hashes = set(hashes)
+    present = set(MediaBlob.objects.filter(sha256__in=hashes).values_list('sha256', flat=True))
+    return sorted(hashes - present)
+
+
+def apply_manifest(user, items):
+    """
+    Enregistre les éléments d'un manifeste (dicts validés). Un élément
+    inconnu est créé ; un élément non encore converti est remplacé par sa
+    dernière version ; un élément déjà converti dont le contenu a changé est
+    un conflit et n'est pas modifié.
+    """
+    items = {item['client_uuid']: item for item in items}
+    result = {'accepted': [], 'unchanged': [], 'synced': [], 'conflicts': []}
+    with transaction.atomic():
+        existing = {
+            row.client_uuid: row
+            for row in OfflineIncident.objects.select_for_update().filter(
+                user=user, client_uuid__in=list(items)
+            )
+        }
+        created, updated = [], []
+        for client_uuid, item in items.items():
+            digest = fingerprint(item)
+            row = existing.get(client_uuid)
+            if row is None:
+                created.append(OfflineIncident(user=user, fingerprint=digest, **item))
+                result['accepted'].append(client_uuid)
+            elif row.fingerprint == digest:
+                if row.is_synced:
+                    result['synced'].append({'client_uuid': client_uuid, 'incident_id': row.incident_id})
+                elif row.sync_error:
+                    # Renvoyé après un échec (média manquant) : nouvel essai
+                    row.sync_error = ''
+                    updated.append(row)
+                    result['accepted'].append(client_uuid)
+                else:
+                    result['unchanged'].append(client_uuid)
+            elif row.is_synced:
+                result['conflicts'].append({
+                    'client_uuid': client_uuid,
+                    'incident_id': row.incident_id,
+                    'reason': 'modified_after_sync',
+                })
+            else:
+                for name, value in zip(CONTENT_FIELDS, _content(item)):
+                    setattr(row, name, value)
+                row.fingerprint, row.sync_error = digest, ''
+                updated.append(row)
+                result['accepted'].append(client_uuid)
+        # Manifeste concurrent du même client : la première version gagne
+        OfflineIncident.objects.bulk_create(created, ignore_conflicts=True)
+        OfflineIncident.objects.bulk_update(updated, list(CONTENT_FIELDS) + ['fingerprint', 'sync_error'])
+        if created:
+            # ON CONFLICT DO NOTHING ne dit pas quelles lignes ont été écartées :
+            # relecture, une version différente enregistrée entre-temps l'emporte
+            stored = dict(OfflineIncident.objects.filter(
+                user=user, client_uuid__in=[row.client_uuid for row in created]
+            ).values_list('client_uuid', 'fingerprint'))
+            for row in created:
+                if stored.get(row.client_uuid) != row.fingerprint:
+                    result['accepted'].remove(row.client_uuid)
+                    result['conflicts'].append({
+                        'client_uuid': row.client_uuid,
+                        'incident_id': None,
+                        'reason': 'concurrent_manifest',
+                    })
+    result['missing_blobs'] = missing_blobs(_needed_hashes(items.values()))
+    return result
+
+
+def store_blob(sha256, stream):
+    """Reçoit un média, vérifie son SHA-256 et le stocke s'il est nouveau"""
+    existing = MediaBlob.objects.filter(sha256=sha256).first()
+    if existing is not None:
+        return existing, False
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as tmp:
+        while chunk := stream.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > settings.OFFLINE_BLOB_MAX_BYTES:
+                raise BlobError('Fichier trop volumineux')
+            digest.update(chunk)
+            tmp.write(chunk)
+        if size == 0:
+            raise BlobError('Contenu vide')
+        if digest.hexdigest() != sha256:
+            raise BlobError('Le SHA-256 ne correspond pas au contenu')
+        tmp.seek(0)
+        blob = MediaBlob(sha256=sha256, size=size)
+        blob.file.save(sha256, File(tmp), save=False)
+    try:
+        with transaction.atomic():
+            blob.save(force_insert=True)
+    except IntegrityError:
+        # Envoi concurrent du même contenu : même fichier, déjà enregistré
+        return MediaBlob.objects.get(sha256=sha256), False
+    return blob, True
+
+
+def retry_missing_media(user, sha256):
+    """
+    Remet en attente les éléments de l'utilisateur marqués 'missing_media'
+    qui référencent ce média (index partiel des éléments non synchronisés)
+    """
+    return OfflineIncident.objects.filter(user=user, is_synced=False, sync_error='missing_media').filter(
+        Q(photo_sha256=sha256) | Q(audio_sha256=sha256)
+    ).update(sync_error='')
+
+
+def _ready(user_id):
+    """Éléments en attente dont tous les médias sont disponibles"""
+    return OfflineIncident.objects.filter(user_id=user_id, is_synced=False, sync_error='').filter(
+        Q(photo_sha256='') | Exists(MediaBlob.objects.filter(sha256=OuterRef('photo_sha256'))),
+        Q(audio_sha256='') | Exists(MediaBlob.objects.filter(sha256=OuterRef('audio_sha256'))),
+    )
+
+
+def _media(sha256, legacy_path, blobs):
+    """Nom du fichier à rattacher à l'incident ; None si le média est introuvable"""
+    if sha256:
+        return blobs.get(sha256)
+    if legacy_path:
+        return legacy_path if default_storage.exists(legacy_path) else None
+    return ''
+
+
+def convert_batch(user_id, batch_size):
+    """
+    Convertit au plus `batch_size` éléments prêts en une transaction.
+    Renvoie (incidents créés, reste-t-il peut-être des éléments prêts).
+    """
+    created = []
+    with transaction.atomic():
+        batch = list(
+            _ready(user_id).select_for_update(skip_locked=True).order_by('id')[:batch_size]
+        )
+        hashes = {h for item in batch for h in (item.photo_sha256, item.audio_sha256) if h}
+        blobs = dict(MediaBlob.objects.filter(sha256__in=hashes).values_list('sha256', 'file'))
+        for item in batch:
+            photo = _media(item.photo_sha256, item.photo_path, blobs)
+            audio = _media(item.audio_sha256, item.audio_path, blobs)
+            if photo is None or audio is None:
+                # Ancien client : chemin local qui n'existe pas sur le serveur
+                item.sync_error = 'missing_media'
+                continue
+            location = Point(item.longitude, item.latitude, srid=4326)
+            district, street = lookup_point(location)
+            incident = Incident.objects.create(
+                user_id=user_id,
+                incident_type=item.incident_type,
+                description=item.description,
+                photo=photo,
+                audio=audio,
+                location=location,
+                canonical_id=find_canonical(item.incident_type, location),
+                district=district,
+                street=street,
+            )
+            created.append(incident)
+            item.incident, item.is_synced = incident, True
+        OfflineIncident.objects.bulk_update(batch, ['is_synced', 'incident', 'sync_error'])
+        if created:
+            incidents_added(user_id, len(created), max(i.created_at for i in created))
+            notify_subscribers(created)
+    return created, len(batch) == batch_size
+
+
+def sync_status(user):
+    pending = OfflineIncident.objects.filter(user=user, is_synced=False)
+    waiting = pending.filter(sync_error='').exclude(pk__in=_ready(user.id).values('pk'))
+    needed = set()
+    for photo, audio in waiting.values_list('photo_sha256', 'audio_sha256')[:settings.OFFLINE_MANIFEST_MAX_ITEMS]:
+        needed.update(h for h in (photo, audio) if h)
+    return {
+        'pending': pending.filter(sync_error='').count(),
+        'waiting_for_media': waiting.count(),
+        'missing_blobs': missing_blobs(needed),
+        'errors': [
+            {'client_uuid': client_uuid, 'id': pk, 'error': error}
+            for pk, client_uuid, error in pending.exclude(sync_error='')
+            .values_list('pk', 'client_uuid', 'sync_error')[:settings.OFFLINE_MANIFEST_MAX_ITEMS]
+        ],
+        'synced': OfflineIncident.objects.filter(user=user, is_synced=True).count(),
+    }
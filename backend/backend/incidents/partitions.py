@@ -0,0 +1,101 @@
+"""
+Gestion des partitions mensuelles de `incidents_incident`.
+
+La table est partitionnée par plage sur `created_at` (voir la migration
+0002). Chaque mois a sa partition `incidents_incident_pYYYYMM` ; une
+partition par défaut reçoit les lignes hors de toute plage.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+
+PARENT_TABLE = 'incidents_incident'
+DEFAULT_PARTITION = 'incidents_incident_default'
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month):
+    return f'{PARENT_TABLE}_p{month:%Y%m}'
+
+
+def list_partitions(cursor):
+    """Retourne [(nom, début, fin)] des partitions mensuelles, triées par date"""
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = %s
+    """, [PARENT_TABLE])
+    partitions = []
+    for (name,) in cursor.fetchall():
+        if name == DEFAULT_PARTITION:
+            continue
+        start = datetime.strptime(name[-6:], '%Y%m').replace(tzinfo=dt_timezone.utc)
+        partitions.append((name, start, add_months(start, 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def create_partition(cursor, month):
+    """
+    Crée la partition du mois donné si elle n'existe pas.
+
+    Les lignes déjà tombées dans la partition par défaut pour ce mois y sont
+    déplacées avant l'attachement, sinon ATTACH PARTITION échouerait.
+    """
+    start = month_start(month)
+    end = add_months(start, 1)
+    name = partition_name(start)
+    quoted = connection.ops.quote_name(name)
+
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    if cursor.fetchone()[0] is not None:
+        return False
+
+    with transaction.atomic():
+        cursor.execute(
+            f"CREATE TABLE {quoted} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE created_at >= %s AND created_at < %s
+                RETURNING *
+            )
+            INSERT INTO {quoted} SELECT * FROM moved
+        """, [start, end])
+        # Les bornes sont des littéraux : DDL sans paramètres liés
+        cursor.execute(
+            f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {quoted} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    return True
+
+
+def detach_partition(cursor, name):
+    """
+    Détache une partition : elle devient une table autonome. Pas de
+    CONCURRENTLY : PostgreSQL le refuse quand la table a une partition par
+    défaut, ce qui est toujours le cas ici (migration 0002).
+    """
+    quoted = connection.ops.quote_name(name)
+    cursor.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {quoted}")
+
+
+def archive_partition(cursor, name, schema):
+    """Déplace une partition détachée dans un schéma d'archive"""
+    quoted_schema = connection.ops.quote_name(schema)
+    cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {quoted_schema}")
+    cursor.execute(f"ALTER TABLE {connection.ops.quote_name(name)} SET SCHEMA {quoted_schema}")
+
+
+def drop_partition(cursor, name):
+    cursor.execute(f"DROP TABLE {connection.ops.quote_name(name)}")
@@ -0,0 +1,61 @@
+"""
+Accès à COPY FROM STDIN / COPY TO STDOUT pour psycopg2 et psycopg 3.
+
+Django expose le curseur du pilote via `connection.cursor().cursor` ; les
+deux pilotes ont une API COPY différente, on l'unifie ici.
+"""
+import io
+
+
+class _ChunkReader(io.RawIOBase):
+    """Fichier en lecture seule alimenté par un itérable de bytes (psycopg2)"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _driver_cursor(cursor):
+    # CursorWrapper de Django -> curseur du pilote
+    return getattr(cursor, 'cursor', cursor)
+
+
+def copy_from(cursor, sql, chunks):
+    """Exécute `COPY ... FROM STDIN` en envoyant chaque bloc de bytes de `chunks`"""
+    raw = _driver_cursor(cursor)
+    if hasattr(raw, 'copy'):  # psycopg 3
+        with raw.copy(sql) as copy:
+            for chunk in chunks:
+                copy.write(chunk)
+    else:  # psycopg2
+        raw.copy_expert(sql, io.BufferedReader(_ChunkReader(chunks), buffer_size=1 << 20))
+
+
+def copy_to_bytes(cursor, sql, params=None):
+    """Exécute `COPY (...) TO STDOUT` et retourne la sortie brute"""
+    raw = _driver_cursor(cursor)
+    if hasattr(raw, 'copy'):  # psycopg 3
+        out = bytearray()
+        with raw.copy(sql, params) as copy:
+            for block in copy:
+                out += block
+        return bytes(out)
+    if params:
+        sql = raw.mogrify(sql, params).decode()
+    buf = io.BytesIO()
+    raw.copy_expert(sql, buf)
+    return buf.getvalue()
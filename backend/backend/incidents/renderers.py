@@ -0,0 +1,30 @@
+try:
+    import msgpack
+except ImportError:  # msgpack est optionnel : JSON colonnaire seulement
+    msgpack = None
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """JSON compact (voir compact.py), demandé par Accept ou ?format=columnar"""
+    media_type = 'application/vnd.incidents.columnar+json'
+    format = 'columnar'
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # default=str : dates et décimaux éventuels des réponses non compactes
+        return msgpack.packb(data, use_bin_type=True, default=str)
+
+
+COMPACT_RENDERERS = [ColumnarJSONRenderer]
+if msgpack is not None:
+    COMPACT_RENDERERS.append(MessagePackRenderer)
@@ -0,0 +1,59 @@
+"""
+Recherche plein texte sur les incidents.
+
+`Incident.search_vector` est tenu à jour par un trigger PostgreSQL (migration
+0005) qui concatène les vecteurs 'french' et 'english' de la description :
+nos utilisateurs écrivent dans les deux langues. La requête est analysée
+dans les deux configurations et combinée par OU.
+
+La pagination est par curseur (rang, id) plutôt que par OFFSET : l'ordre
+reste stable quand de nouveaux incidents arrivent entre deux pages. Le rang
+(float4 pour ts_rank) est converti en float8 : le curseur garde sa valeur
+exacte (repr) et la comparaison d'égalité retrouve les rangs ex aequo.
+"""
+import base64
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+from .models import Incident
+
+SEARCH_CONFIGS = ('french', 'english')
+
+
+def build_query(text):
+    query = None
+    for config in SEARCH_CONFIGS:
+        part = SearchQuery(text, config=config, search_type='websearch')
+        query = part if query is None else query | part
+    return query
+
+
+def encode_cursor(rank, incident_id):
+    return base64.urlsafe_b64encode(f'{rank!r}:{incident_id}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        rank, incident_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        return float(rank), int(incident_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def search_incidents(text, queryset=None, after=None):
+    """
+    Incidents correspondant à `text`, triés par pertinence puis id
+    décroissants, à partir du curseur `after` = (rang, id).
+    """
+    query = build_query(text)
+    queryset = (queryset if queryset is not None else Incident.objects.all()).filter(
+        search_vector=query
+    ).annotate(
+        rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+    )
+    if after is not None:
+        rank, incident_id = after
+        queryset = queryset.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=incident_id))
+    return queryset.order_by('-rank', '-id')
@@ -0,0 +1,89 @@
+"""
+Génération de données synthétiques réalistes pour les benchmarks.
+
+Les incidents sont répartis autour de points chauds de Nouakchott (mélange
+de gaussiennes) avec un bruit de fond uniforme sur l'emprise de la ville, et
+étalés dans le temps avec un profil journalier (plus d'incidents en journée).
+"""
+import math
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from .geo import METRES_PER_DEGREE
+
+# Emprise approximative de Nouakchott (lng_min, lat_min, lng_max, lat_max)
+CITY_BBOX = (-16.05, 18.00, -15.88, 18.18)
+
+# (nom, lat, lng, écart-type en mètres, poids, répartition des types)
+HOTSPOTS = [
+    ('Capitale', 18.0860, -15.9785, 600, 0.25, {'theft': 0.5, 'accident': 0.3, 'fire': 0.05, 'other': 0.15}),
+    ('Marché Cinquième', 18.0595, -15.9610, 400, 0.20, {'theft': 0.6, 'fire': 0.15, 'accident': 0.1, 'other': 0.15}),
+    ('Ksar', 18.1010, -15.9540, 700, 0.15, {'accident': 0.4, 'theft': 0.3, 'fire': 0.1, 'other': 0.2}),
+    ('Arafat', 18.0450, -15.9430, 900, 0.15, {'fire': 0.3, 'theft': 0.3, 'accident': 0.2, 'other': 0.2}),
+    ('Port', 18.0330, -16.0290, 800, 0.05, {'accident': 0.5, 'fire': 0.2, 'theft': 0.1, 'other': 0.2}),
+]
+BACKGROUND_WEIGHT = 1.0 - sum(h[4] for h in HOTSPOTS)
+BACKGROUND_TYPES = {'accident': 0.3, 'theft': 0.3, 'fire': 0.1, 'other': 0.3}
+
+# Poids relatif de chaque heure de la journée (pic en fin d'après-midi)
+HOURLY_WEIGHTS = [
+    max(0.15, math.exp(-((hour - 17) ** 2) / 30.0)) for hour in range(24)
+]
+
+DESCRIPTIONS = {
+    'fire': ["Incendie dans un immeuble", "Feu de poubelles", "Fire reported near the market"],
+    'accident': ["Collision entre deux véhicules", "Piéton renversé", "Car crash at the roundabout"],
+    'theft': ["Vol de téléphone", "Cambriolage d'une boutique", "Bag snatching near the bus stop"],
+    'other': ["Coupure d'électricité", "Canalisation cassée", "Road blocked by debris"],
+}
+
+
+def _weighted_choice(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def sample_location(rng):
+    """Retourne (lat, lng, incident_type) selon la distribution des points chauds"""
+    r = rng.random()
+    for _, lat, lng, sigma_m, weight, types in HOTSPOTS:
+        if r < weight:
+            dlat = rng.gauss(0, sigma_m) / METRES_PER_DEGREE
+            dlng = rng.gauss(0, sigma_m) / (METRES_PER_DEGREE * math.cos(math.radians(lat)))
+            return lat + dlat, lng + dlng, _weighted_choice(rng, types)
+        r -= weight
+    lng_min, lat_min, lng_max, lat_max = CITY_BBOX
+    return (
+        rng.uniform(lat_min, lat_max),
+        rng.uniform(lng_min, lng_max),
+        _weighted_choice(rng, BACKGROUND_TYPES),
+    )
+
+
+def sample_timestamp(rng, now, days):
+    """Date aléatoire dans les `days` derniers jours, pondérée par heure"""
+    day = rng.randrange(days)
+    hour = rng.choices(range(24), weights=HOURLY_WEIGHTS)[0]
+    start = (now - timedelta(days=day)).replace(hour=hour, minute=0, second=0, microsecond=0)
+    stamp = start + timedelta(seconds=rng.randrange(3600))
+    return min(stamp, now)
+
+
+def sample_description(rng, incident_type):
+    return rng.choice(DESCRIPTIONS[incident_type])
+
+
+@contextmanager
+def manual_timestamps(model, field_name='created_at'):
+    """Désactive temporairement auto_now_add pour insérer des dates historiques"""
+    field = model._meta.get_field(field_name)
+    previous = field.auto_now_add
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = previous
+
+
+def make_rng(seed=None):
+    return random.Random(seed)
@@ -1,14 +1,32 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Incident, OfflineIncident
-from django.contrib.gis.geos import Point
+import json
+
+from backend.renditions import media_url, rendition_url
+
+from .models import AreaNotification, AreaSubscription, Incident, OfflineIncident
+from django.contrib.gis.geos import GEOSException, GEOSGeometry, MultiPolygon, Point
 
 class IncidentSerializer(serializers.ModelSerializer):
     location = serializers.SerializerMethodField()
-    
+    photo_thumbnail = serializers.SerializerMethodField()
+
     class Meta:
         model = Incident
-        fields = ['id', 'user', 'incident_type', 'description', 'photo', 'audio', 'location', 'created_at']
-        read_only_fields = ['user']
+        fields = [
+            'id', 'user', 'incident_type', 'description', 'photo', 'audio', 'location', 'created_at',
+            'canonical', 'district', 'street', 'photo_thumbnail',
+        ]
+        read_only_fields = ['user', 'canonical', 'district', 'street']
+
+    def to_representation(self, obj):
+        data = super().to_representation(obj)
+        # Médias servis par IncidentMediaView (contrôle d'accès), pas par MEDIA_URL
+        request = self.context.get('request')
+        for field in ('photo', 'audio'):
+            if getattr(obj, field):
+                data[field] = media_url(request, 'incident-media', {'pk': obj.pk, 'field': field})
+        return data
 
     def get_location(self, obj):
         # Convertit le Point GIS en string "lat,lng"
@@ -16,6 +34,13 @@ class IncidentSerializer(serializers.ModelSerializer):
             return f"{obj.location.y},{obj.location.x}"
         return None
 
+    def get_photo_thumbnail(self, obj):
+        # Vignette de liste servie par IncidentMediaView
+        if not obj.photo:
+            return None
+        return rendition_url(self.context.get('request'), 'incident-media',
+                             {'pk': obj.pk, 'field': 'photo'}, settings.RENDITION_THUMBNAIL_SIZE)
+
     def create(self, validated_data):
         # Convertit les coordonnées en Point si nécessaire
         if isinstance(validated_data.get('location'), str):
@@ -29,4 +54,58 @@ class IncidentSerializer(serializers.ModelSerializer):
 class OfflineIncidentSerializer(serializers.ModelSerializer):
     class Meta:
         model = OfflineIncident
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class OfflineManifestItemSerializer(serializers.Serializer):
+    client_uuid = serializers.UUIDField()
+    incident_type = serializers.ChoiceField(choices=Incident.INCIDENT_TYPES)
+    description = serializers.CharField(allow_blank=True)
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    photo_sha256 = serializers.RegexField(r'^[0-9a-f]{64}$', required=False, default='', allow_blank=True)
+    audio_sha256 = serializers.RegexField(r'^[0-9a-f]{64}$', required=False, default='', allow_blank=True)
+
+
+class OfflineManifestSerializer(serializers.Serializer):
+    items = serializers.ListField(
+        child=OfflineManifestItemSerializer(),
+        allow_empty=False,
+        max_length=settings.OFFLINE_MANIFEST_MAX_ITEMS,
+    )
+
+
+class GeoJSONAreaField(serializers.Field):
+    """Polygone ou multipolygone GeoJSON (WGS 84), stocké en MultiPolygon"""
+
+    def to_representation(self, value):
+        return json.loads(value.geojson)
+
+    def to_internal_value(self, data):
+        try:
+            geometry = GEOSGeometry(json.dumps(data) if isinstance(data, dict) else data, srid=4326)
+        except (GEOSException, ValueError, TypeError):
+            raise serializers.ValidationError('GeoJSON invalide')
+        if geometry.geom_type == 'Polygon':
+            geometry = MultiPolygon(geometry, srid=4326)
+        if geometry.geom_type != 'MultiPolygon':
+            raise serializers.ValidationError('Polygon ou MultiPolygon attendu')
+        if not geometry.valid:
+            raise serializers.ValidationError(geometry.valid_reason)
+        return geometry
+
+
+class AreaSubscriptionSerializer(serializers.ModelSerializer):
+    area = GeoJSONAreaField()
+
+    class Meta:
+        model = AreaSubscription
+        fields = ['id', 'owner', 'name', 'area', 'incident_types', 'is_active', 'created_at', 'updated_at']
+        read_only_fields = ['owner', 'created_at', 'updated_at']
+
+
+class AreaNotificationSerializer(serializers.ModelSerializer):
+    subscription_name = serializers.CharField(source='subscription.name', read_only=True)
+
+    class Meta:
+        model = AreaNotification
+        fields = ['id', 'subscription', 'subscription_name', 'incident', 'created_at', 'read_at']
@@ -0,0 +1,43 @@
+from django.conf import settings
+
+from jobs.queue import enqueue, task
+
+from .counters import repair_counts
+from .dedup import remember
+from .gazetteer import backfill
+from .models import AreaNotification
+from .offline_sync import convert_batch
+
+
+@task('incidents.sync_offline')
+def sync_offline(user_id):
+    """
+    Convertit un lot d'incidents hors ligne prêts de l'utilisateur, puis se
+    reprogramme s'il en reste : un gros arriéré n'occupe jamais un worker
+    ni une transaction longtemps.
+    """
+    created, more = convert_batch(user_id, settings.OFFLINE_SYNC_BATCH_SIZE)
+    for incident in created:
+        remember(incident)
+    if more:
+        enqueue('incidents.sync_offline', {'user_id': user_id}, key=f'sync-offline:{user_id}')
+
+
+@task('incidents.repair_counts')
+def repair_incident_counts():
+    repair_counts()
+
+
+@task('incidents.geocode_backfill')
+def geocode_backfill(batch_size=5000, only_missing=True):
+    backfill(batch_size, only_missing)
+
+
+@task('incidents.notify_area_subscribers')
+def notify_area_subscribers(pairs):
+    """`pairs` : [[incident_id, subscription_id], ...]"""
+    AreaNotification.objects.bulk_create(
+        [AreaNotification(incident_id=incident_id, subscription_id=subscription_id)
+         for incident_id, subscription_id in pairs],
+        ignore_conflicts=True,
+    )
@@ -1,3 +1,257 @@
-from django.test import TestCase
+import gzip
+import itertools
+import json
+import os
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.gis.geos import Point
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from backend.media import parse_range, serve_path
+from backend.middleware import CompressionMiddleware
+from users.models import CustomUser
+from .dedup import RecentIncidentIndex
+from .filters import IncidentFilter
+from .management.commands.startup_benchmark import import_chain, import_times
+from .models import Incident
+from .offline_sync import fingerprint
+from .search import decode_cursor, encode_cursor, search_incidents
+
+
+def walk_plan(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from walk_plan(child)
+
+
+class IncidentFilterIndexTests(TestCase):
+    """
+    Chaque combinaison de filtres de liste doit pouvoir être servie par un
+    index. Avec enable_seqscan désactivé, le planificateur ne garde un
+    parcours séquentiel que si aucun index n'est utilisable.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='reporter', email='reporter@example.com', password='x' * 12
+        )
+        for i, incident_type in enumerate(['fire', 'accident', 'theft', 'other']):
+            Incident.objects.create(
+                user=cls.user,
+                incident_type=incident_type,
+                description=f'Incident {i}',
+                location=Point(-15.97 + i * 0.01, 18.08, srid=4326),
+                photo='incident_photos/test.jpg' if i % 2 else '',
+            )
+
+    def setUp(self):
+        today = timezone.now().date()
+        self.filters = {
+            'type': {'type': 'fire'},
+            'dates': {'created_after': today.isoformat(), 'created_before': today.isoformat()},
+            'user': {'user': str(self.user.id)},
+            'bbox': {'bbox': '-16.0,18.0,-15.9,18.1'},
+            'has_photo': {'has_photo': 'true'},
+            'has_audio': {'has_audio': 'true'},
+            'no_photo': {'has_photo': 'false'},
+            'no_audio': {'has_audio': 'false'},
+        }
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("""
+                SELECT c.relname FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE i.indpred IS NOT NULL
+            """)
+            self.partial_indexes = {row[0] for row in cursor.fetchall()}
+
+    def assert_indexed(self, queryset):
+        plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+        for node in walk_plan(plan):
+            self.assertNotEqual(node['Node Type'], 'Seq Scan', node.get('Relation Name'))
+            if node['Node Type'] in ('Index Scan', 'Index Only Scan', 'Bitmap Index Scan'):
+                # Un parcours d'index complet sans condition ne filtre rien,
+                # sauf sur un index partiel dont le prédicat est le filtre
+                self.assertTrue(
+                    'Index Cond' in node or node['Index Name'] in self.partial_indexes,
+                    node['Index Name'],
+                )
+
+    def test_every_filter_combination_uses_an_index(self):
+        names = list(self.filters)
+        for size in range(1, len(names) + 1):
+            for combination in itertools.combinations(names, size):
+                params = {}
+                for name in combination:
+                    params.update(self.filters[name])
+                if len(params) < sum(len(self.filters[name]) for name in combination):
+                    # has_photo=true et has_photo=false ensemble : sans objet
+                    continue
+                with self.subTest(filters=combination):
+                    queryset = IncidentFilter(params).apply(Incident.objects.all())
+                    self.assert_indexed(queryset)
+
+    def test_citizen_list_filters_use_an_index(self):
+        for name, params in self.filters.items():
+            if name == 'user':
+                continue
+            with self.subTest(filter=name):
+                queryset = Incident.objects.filter(user=self.user)
+                queryset = IncidentFilter(params, allow_user=False).apply(queryset)
+                self.assert_indexed(queryset)
+
+
+class OfflineFingerprintTests(SimpleTestCase):
+    def test_zero_coordinates(self):
+        item = {'incident_type': 'fire', 'description': '', 'latitude': 0.0, 'longitude': 0.0}
+        self.assertEqual(fingerprint(item), fingerprint({**item, 'photo_sha256': '', 'audio_sha256': None}))
+        self.assertNotEqual(fingerprint(item), fingerprint({**item, 'latitude': 0.5}))
+
+
+class SearchCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = CustomUser.objects.create_user(
+            username='searcher', email='searcher@example.com', password='x' * 12
+        )
+        # Descriptions identiques : même rang pour tous
+        for i in range(7):
+            Incident.objects.create(
+                user=user, incident_type='fire', description='Incendie près du marché',
+                location=Point(-15.97, 18.08, srid=4326),
+            )
+        Incident.objects.create(
+            user=user, incident_type='fire', description='Incendie, incendie près du marché central',
+            location=Point(-15.97, 18.08, srid=4326),
+        )
+
+    def test_pagination_over_tied_ranks(self):
+        seen, after = [], None
+        for _ in range(10):
+            page = list(search_incidents('incendie marché', after=after)[:3])
+            seen.extend(incident.id for incident in page)
+            if len(page) < 3:
+                break
+            after = decode_cursor(encode_cursor(page[-1].rank, page[-1].id))
+        expected = list(search_incidents('incendie marché').values_list('id', flat=True))
+        self.assertEqual(len(expected), 8)
+        self.assertEqual(seen, expected)
+
+
+class RecentIncidentIndexTests(SimpleTestCase):
+    def test_forget_removes_incident_and_its_duplicates(self):
+        index = RecentIncidentIndex(100, timedelta(minutes=30))
+        now = timezone.now()
+        index.add(1, None, 'fire', 18.08, -15.97, now)
+        index.add(2, 1, 'fire', 18.0801, -15.9701, now)
+        index.add(3, None, 'fire', 18.20, -15.80, now)
+        self.assertEqual(index.match('fire', 18.0802, -15.9702, now), 1)
+
+        index.forget(1)
+        self.assertIsNone(index.match('fire', 18.0802, -15.9702, now))
+        self.assertEqual(index.match('fire', 18.2001, -15.8001, now), 3)
+
+
+class StartupBenchmarkTests(SimpleTestCase):
+    IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       900 |       1200 |       numpy
+import time:       100 |       1300 |     django.contrib.gis.shortcuts
+import time:        50 |         50 |     django.contrib.gis.geometry
+import time:       200 |       1600 |   django.contrib.gis.geos
+import time:       300 |       1900 | incidents.models
+import time:        10 |         10 | users.revocation
+"""
+
+    def test_import_chain_follows_less_indented_parents(self):
+        rows = import_times(self.IMPORTTIME)
+        self.assertEqual(rows[0], ('numpy', 900, 1200, 3))
+        self.assertEqual(import_chain(rows, 'numpy'),
+                         ['django.contrib.gis.shortcuts', 'django.contrib.gis.geos', 'incidents.models'])
+        self.assertEqual(import_chain(rows, 'users.revocation'), [])
+        self.assertIsNone(import_chain(rows, 'PIL'))
+
+
+@override_settings(MEDIA_SENDFILE='')
+class MediaRangeTests(SimpleTestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.jpg')
+        with os.fdopen(handle, 'wb') as file:
+            file.write(b'0123456789')
+        self.addCleanup(os.remove, self.path)
+
+    def get(self, **headers):
+        response = serve_path(RequestFactory().get('/', **headers), self.path, 'incident_photos/x.jpg')
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=2-4', 10), (2, 4))
+        self.assertEqual(parse_range('bytes=4-100', 10), (4, 9))
+        self.assertEqual(parse_range('bytes=-3', 10), (7, 9))
+        self.assertEqual(parse_range('bytes=-30', 10), (0, 9))
+        # Plusieurs plages, autre unité ou syntaxe invalide : fichier entier
+        self.assertIsNone(parse_range('bytes=0-1,4-5', 10))
+        self.assertIsNone(parse_range('items=0-1', 10))
+        self.assertIsNone(parse_range('bytes=a-b', 10))
+        for header, size in (('bytes=10-', 10), ('bytes=5-2', 10), ('bytes=-0', 10), ('bytes=-3', 0)):
+            with self.assertRaises(ValueError):
+                parse_range(header, size)
+
+    def test_partial_content(self):
+        response, body = self.get(HTTP_RANGE='bytes=2-4')
+        self.assertEqual((response.status_code, body), (206, b'234'))
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+        self.assertEqual(response['Content-Length'], '3')
+
+    def test_unsatisfiable_range(self):
+        response, _body = self.get(HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_if_range(self):
+        etag = self.get()[0]['ETag']
+        response, body = self.get(HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE=etag)
+        self.assertEqual((response.status_code, body), (206, b'01'))
+        # Fichier modifié depuis : la plage est ignorée
+        response, body = self.get(HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"stale"')
+        self.assertEqual((response.status_code, body), (200, b'0123456789'))
+        self.assertFalse(response.has_header('Content-Range'))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTests(SimpleTestCase):
+    BODY = json.dumps([{'incident_type': 'fire', 'description': 'x' * 20}] * 50).encode()
+
+    def respond(self, path='/api/incidents/', **headers):
+        def view(request):
+            response = HttpResponse(self.BODY, content_type='application/json')
+            response['ETag'] = '"v1"'
+            return response
+        return CompressionMiddleware(view)(RequestFactory().get(path, **headers))
+
+    def test_gzip_weakens_etag_and_varies(self):
+        response = self.respond(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], 'W/"v1"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), self.BODY)
+        # Nom de fichier de longueur aléatoire dans l'en-tête (BREACH)
+        self.assertTrue(response.content[3] & gzip.FNAME)
+
+    def test_identity_keeps_strong_etag(self):
+        response = self.respond(HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['ETag'], '"v1"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_token_responses_are_not_compressed(self):
+        response = self.respond('/api/users/token/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, self.BODY)
@@ -1,11 +1,21 @@
-from django.urls import path
-from .views import IncidentListCreateView, IncidentDetailView, SyncOfflineIncidentsView, IncidentListView, IncidentStatsView
+from django.urls import path, re_path
+from .views import AreaNotificationListView, AreaSubscriptionDetailView, AreaSubscriptionListCreateView, MediaBlobUploadView, OfflineManifestView, IncidentListCreateView, IncidentDetailView, IncidentMediaView, SyncOfflineIncidentsView, IncidentListView, IncidentStatsView, IncidentNearbyView, IncidentHotspotsView, IncidentHeatmapView, IncidentSearchView
 
 urlpatterns = [
     path('', IncidentListCreateView.as_view(), name='incident-list-create'),
     path('all/', IncidentListView.as_view(), name='incident-list-admin'),
     path('<int:pk>/', IncidentDetailView.as_view(), name='incident-detail'),
+    re_path(r'^(?P<pk>\d+)/(?P<field>photo|audio)/$', IncidentMediaView.as_view(), name='incident-media'),
     path('sync/', SyncOfflineIncidentsView.as_view(), name='sync-offline-incidents'),
+    path('sync/manifest/', OfflineManifestView.as_view(), name='sync-offline-manifest'),
+    re_path(r'^sync/blobs/(?P<sha256>[0-9a-f]{64})/$', MediaBlobUploadView.as_view(), name='sync-offline-blob'),
     path('stats/', IncidentStatsView.as_view(), name='incident-stats'),  
+    path('nearby/', IncidentNearbyView.as_view(), name='incident-nearby'),
+    path('hotspots/', IncidentHotspotsView.as_view(), name='incident-hotspots'),
+    path('heatmap.png', IncidentHeatmapView.as_view(), name='incident-heatmap'),
+    path('search/', IncidentSearchView.as_view(), name='incident-search'),
+    path('subscriptions/', AreaSubscriptionListCreateView.as_view(), name='area-subscription-list'),
+    path('subscriptions/<int:pk>/', AreaSubscriptionDetailView.as_view(), name='area-subscription-detail'),
+    path('subscriptions/notifications/', AreaNotificationListView.as_view(), name='area-notification-list'),
 
 ]
\ No newline at end of file
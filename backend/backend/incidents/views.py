@@ -1,15 +1,42 @@
+import io
+
 from rest_framework import generics, status
 from rest_framework.views import APIView
+from django.db import transaction
 from django.db.models import Count
+from django.db.models.functions import TruncDate
 from django.contrib.auth import get_user_model
-from datetime import datetime, timedelta
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import quote_etag
+from django.utils import timezone
+from datetime import timedelta
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from .models import Incident, OfflineIncident
-from .serializers import IncidentSerializer, OfflineIncidentSerializer
-from django.contrib.gis.geos import Point
+from .models import AreaNotification, AreaSubscription, Incident, OfflineIncident, ArchivedIncident
+from backend.media import serve_file
+from backend.renditions import serve_image
+from backend.throttling import IngestThrottle
+from jobs.queue import enqueue
+from .archive import load_archived_incident
+from .compact import CompactListMixin
+from .counters import incident_added, incident_removed
+from .dedup import find_canonical, forget, remember
+from .filters import IncidentFilter, parse_bbox, parse_moment
+from .hotspots import WINDOWS as HOTSPOT_WINDOWS, get_hotspots
+from .gazetteer import lookup_point
+from .geofence import notify_subscribers
+from .search import decode_cursor, encode_cursor, search_incidents
+from .offline_sync import BlobError, apply_manifest, retry_missing_media, store_blob, sync_status
+from .serializers import (
+    AreaNotificationSerializer, AreaSubscriptionSerializer, IncidentSerializer,
+    OfflineIncidentSerializer, OfflineManifestSerializer,
+)
+from django.contrib.gis.measure import D
+from django.contrib.gis.db.models.functions import Distance
+from .geo import MERCATOR_MAX_LAT, parse_lat_lng, metres_to_degrees
 User = get_user_model()
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 
 
 
@@ -36,17 +63,18 @@ class IncidentStatsView(APIView):
             .order_by('-count')
         
         # Incidents par utilisateur (top 5)
-        top_users = User.objects.filter(incidents__isnull=False) \
-            .annotate(incident_count=Count('incidents')) \
+        # Compteur dénormalisé (incidents.counters) : parcours d'index
+        top_users = User.objects.filter(incident_count__gt=0) \
             .order_by('-incident_count')[:5]
         
         # Incidents par période (7 derniers jours)
-        date_threshold = datetime.now() - timedelta(days=7)
+        # Borne explicite sur created_at : seules les partitions récentes sont lues
+        date_threshold = timezone.now() - timedelta(days=7)
         incidents_last_7_days = Incident.objects.filter(
             created_at__gte=date_threshold
-        ).extra({
-            'date': "date(created_at)"
-        }).values('date').annotate(
+        ).annotate(
+            date=TruncDate('created_at')
+        ).values('date').annotate(
             count=Count('id')
         ).order_by('date')
         
@@ -78,31 +106,185 @@ class IncidentStatsView(APIView):
 
 
 
-class IncidentListCreateView(generics.ListCreateAPIView):
+class IncidentListCreateView(CompactListMixin, generics.ListCreateAPIView):
     serializer_class = IncidentSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [IngestThrottle]
 
     def get_queryset(self):
         # Ne retourne que les incidents de l'utilisateur connecté
-        return Incident.objects.filter(user=self.request.user)
+        queryset = Incident.objects.filter(user=self.request.user)
+        return IncidentFilter(self.request.query_params, allow_user=False).apply(queryset)
 
     def perform_create(self, serializer):
-        # Convertit les coordonnées en Point si nécessaire
-        location = serializer.validated_data.get('location')
-        if isinstance(location, str):
-            try:
-                lat, lon = map(float, location.split(','))
-                serializer.validated_data['location'] = Point(lon, lat)
-            except (ValueError, AttributeError):
-                pass
-        serializer.save(user=self.request.user)
+        # `location` est en lecture seule dans le serializer : on lit la
+        # chaîne "lat,lng" envoyée par le client et on la convertit en Point
+        location = parse_lat_lng(self.request.data.get('location'))
+        if location is None:
+            raise ValidationError({'location': 'Format attendu : "lat,lng" (lat entre -90 et 90, lng entre -180 et 180)'})
+        canonical_id = find_canonical(serializer.validated_data['incident_type'], location)
+        district, street = lookup_point(location)
+        with transaction.atomic():
+            incident = serializer.save(
+                user=self.request.user,
+                location=location,
+                canonical_id=canonical_id,
+                district=district,
+                street=street,
+            )
+            incident_added(incident)
+            notify_subscribers([incident])
+        remember(incident)
 
-class IncidentListView(generics.ListAPIView):
+class IncidentListView(CompactListMixin, generics.ListAPIView):
     serializer_class = IncidentSerializer
     permission_classes = [IsAdminUser]
 
     def get_queryset(self):
-        return Incident.objects.all().order_by('-created_at')
+        queryset = IncidentFilter(self.request.query_params).apply(Incident.objects.all())
+        return queryset.order_by('-created_at')
+
+class IncidentSearchView(APIView):
+    """
+    Recherche plein texte : ?q= (obligatoire), &limit=, &cursor=, plus les
+    filtres de incidents.filters (type, dates, bbox, user, has_photo...)
+    """
+    permission_classes = [IsAdminUser]
+    default_limit = 20
+    max_limit = 100
+
+    def get(self, request):
+        params = request.query_params
+        text = params.get('q', '').strip()
+        if not text:
+            raise ValidationError({'q': 'Texte de recherche requis'})
+        try:
+            limit = min(int(params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            raise ValidationError({'limit': 'Entier attendu'})
+
+        after = None
+        if params.get('cursor'):
+            after = decode_cursor(params['cursor'])
+            if after is None:
+                raise ValidationError({'cursor': 'Curseur invalide'})
+
+        queryset = IncidentFilter(params).apply(Incident.objects.all())
+
+        page = list(search_incidents(text, queryset, after)[:limit + 1])
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor(page[-1].rank, page[-1].id)
+
+        results = IncidentSerializer(page, many=True, context={'request': request}).data
+        for item, incident in zip(results, page):
+            item['rank'] = incident.rank
+        return Response({'results': results, 'next_cursor': next_cursor})
+
+
+class IncidentHotspotsView(APIView):
+    """Points chauds émergents : ?window=24h|7d|30d&type=&min_incidents="""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        window = request.query_params.get('window', '24h')
+        if window not in HOTSPOT_WINDOWS:
+            raise ValidationError({'window': f"Valeurs possibles : {', '.join(HOTSPOT_WINDOWS)}"})
+        incident_type = request.query_params.get('type') or None
+        if incident_type and incident_type not in dict(Incident.INCIDENT_TYPES):
+            raise ValidationError({'type': "Type d'incident inconnu"})
+        try:
+            min_incidents = int(request.query_params.get('min_incidents', 3))
+        except ValueError:
+            raise ValidationError({'min_incidents': 'Entier attendu'})
+
+        return Response({
+            'window': window,
+            'type': incident_type,
+            'hotspots': get_hotspots(window, incident_type, min_incidents),
+        })
+
+
+class IncidentHeatmapView(APIView):
+    """Carte de chaleur PNG : ?bbox=&w=&h=&type=&from=&to= (voir incidents.heatmap)"""
+    permission_classes = [IsAdminUser]
+
+    def perform_content_negotiation(self, request, force=False):
+        # Réponse PNG construite à la main ; les erreurs restent en JSON
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        # Pillow n'est chargé qu'au premier appel (NumPy l'est déjà par GeoDjango)
+        from .heatmap import Heatmap
+
+        params = request.query_params
+        if params.get('bbox'):
+            # Au-delà de ±85,05°, la projection Web Mercator diverge
+            bbox = parse_bbox('bbox', params['bbox'], max_lat=MERCATOR_MAX_LAT).extent
+            if bbox[0] == bbox[2] or bbox[1] == bbox[3]:
+                raise ValidationError({'bbox': 'Emprise de surface nulle'})
+        else:
+            bbox = settings.INCIDENT_MAP_BBOX
+        errors = {}
+        size = {}
+        for name in ('w', 'h'):
+            try:
+                size[name] = int(params.get(name, 512))
+            except ValueError:
+                size[name] = 0
+            if not 1 <= size[name] <= settings.HEATMAP_MAX_DIM:
+                errors[name] = f"Entier entre 1 et {settings.HEATMAP_MAX_DIM} attendu"
+        incident_type = params.get('type') or None
+        if incident_type and incident_type not in dict(Incident.INCIDENT_TYPES):
+            errors['type'] = "Type d'incident inconnu"
+        if errors:
+            raise ValidationError(errors)
+        start = parse_moment('from', params['from']) if params.get('from') else None
+        end = parse_moment('to', params['to'], end_of_day=True) if params.get('to') else None
+
+        heatmap = Heatmap(bbox, size['w'], size['h'], incident_type, start, end)
+        etag = quote_etag(heatmap.key)
+        headers = {'ETag': etag, 'Cache-Control': f'private, max-age={settings.HEATMAP_CACHE_SECONDS}'}
+        if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            return HttpResponseNotModified(headers=headers)
+        return HttpResponse(heatmap.png(), content_type='image/png', headers=headers)
+
+
+class IncidentNearbyView(CompactListMixin, generics.ListAPIView):
+    """
+    Incidents autour d'un point : ?lat=&lng=&radius= (mètres). Comme les
+    listes, un citoyen ne voit que ses propres incidents ; un administrateur
+    les voit tous.
+    """
+    serializer_class = IncidentSerializer
+    permission_classes = [IsAuthenticated]
+    max_radius = 10000
+    max_results = 100
+
+    def get_queryset(self):
+        params = self.request.query_params
+        point = parse_lat_lng(f"{params.get('lat')},{params.get('lng')}")
+        if point is None:
+            raise ValidationError({'lat': 'lat entre -90 et 90 et lng entre -180 et 180 attendus'})
+        try:
+            radius = float(params.get('radius', 1000))
+        except ValueError:
+            radius = float('nan')
+        # nan échoue aussi à cette comparaison
+        if not 0 < radius <= self.max_radius:
+            raise ValidationError({'radius': f'Distance en mètres entre 0 (exclu) et {self.max_radius} attendue'})
+
+        queryset = Incident.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
+        # Pré-filtre indexé (GiST) en degrés, puis distance exacte en mètres
+        return queryset.filter(
+            location__dwithin=(point, metres_to_degrees(radius, point.y)),
+            location__distance_lte=(point, D(m=radius)),
+        ).annotate(
+            distance=Distance('location', point)
+        ).order_by('distance')[:self.max_results]
 
 class IncidentDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = IncidentSerializer
@@ -112,29 +294,121 @@ class IncidentDetailView(generics.RetrieveUpdateDestroyAPIView):
         # Ne retourne que les incidents de l'utilisateur connecté
         return Incident.objects.filter(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        incident_id = instance.id
+        with transaction.atomic():
+            instance.delete()
+            incident_removed(instance)
+        forget([incident_id])
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Incident déplacé en stockage froid : relu depuis l'archive
+            stub = ArchivedIncident.objects.filter(
+                pk=kwargs['pk'], user=request.user
+            ).first()
+            data = load_archived_incident(stub) if stub else None
+            if data is None:
+                raise
+            return Response(data)
+
+class IncidentMediaView(APIView):
+    """Photo (redimensionnable, ?w=&h=&fmt=) ou audio d'un incident, pour son auteur ou un administrateur"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, field):
+        incident = Incident.objects.filter(pk=pk).only('user_id', field).first()
+        if incident is None or (incident.user_id != request.user.pk and not request.user.is_admin()):
+            raise Http404
+        if field == 'photo':
+            return serve_image(request, incident.photo)
+        return serve_file(request, incident.audio)
+
 class SyncOfflineIncidentsView(generics.CreateAPIView):
     queryset = OfflineIncident.objects.all()
     serializer_class = OfflineIncidentSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [IngestThrottle]
+
+    def get(self, request, *args, **kwargs):
+        """État de la synchro : en attente, médias manquants, erreurs"""
+        return Response(sync_status(request.user))
 
     def create(self, request, *args, **kwargs):
-        offline_incidents = OfflineIncident.objects.filter(user=request.user, is_synced=False)
-        
-        created_count = 0
-        for incident in offline_incidents:
-            Incident.objects.create(
-                user=incident.user,
-                incident_type=incident.incident_type,
-                description=incident.description,
-                photo=incident.photo_path,
-                audio=incident.audio_path,
-                location=Point(incident.longitude, incident.latitude),
-            )
-            incident.is_synced = True
-            incident.save()
-            created_count += 1
-            
+        # Conversion faite par un worker, par lots (incidents.tasks.sync_offline)
+        pending = OfflineIncident.objects.filter(
+            user=request.user, is_synced=False, sync_error=''
+        ).count()
+        job = None
+        if pending:
+            job = enqueue('incidents.sync_offline', {'user_id': request.user.id},
+                          key=f'sync-offline:{request.user.id}')
         return Response({
-            "status": "success",
-            "synced_incidents": created_count
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+            "status": "accepted",
+            "pending_incidents": pending,
+            "job": job.id if job else None,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class OfflineManifestView(APIView):
+    """Manifeste des éléments hors ligne en attente (voir incidents.offline_sync)"""
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [IngestThrottle]
+
+    def post(self, request):
+        serializer = OfflineManifestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(apply_manifest(request.user, serializer.validated_data['items']))
+
+
+class MediaBlobUploadView(APIView):
+    """PUT du contenu brut d'un média ; l'URL porte son SHA-256"""
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [IngestThrottle]
+
+    def put(self, request, sha256):
+        try:
+            blob, created = store_blob(sha256, request.stream or io.BytesIO())
+        except BlobError as e:
+            raise ValidationError({'file': str(e)})
+        retry_missing_media(request.user, blob.sha256)
+        return Response(
+            {'sha256': blob.sha256, 'size': blob.size},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class AreaSubscriptionListCreateView(generics.ListCreateAPIView):
+    """Zones suivies par le service connecté (voir incidents.geofence)"""
+    serializer_class = AreaSubscriptionSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        return AreaSubscription.objects.filter(owner=self.request.user).order_by('name')
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+
+class AreaSubscriptionDetailView(generics.RetrieveUpdateDestroyAPIView):
+    serializer_class = AreaSubscriptionSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        return AreaSubscription.objects.filter(owner=self.request.user)
+
+
+class AreaNotificationListView(generics.ListAPIView):
+    """Incidents signalés dans les zones suivies ; ?unread=true pour les non lus"""
+    serializer_class = AreaNotificationSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        queryset = AreaNotification.objects.filter(
+            subscription__owner=self.request.user
+        ).select_related('subscription').order_by('-created_at')
+        if self.request.query_params.get('unread') == 'true':
+            queryset = queryset.filter(read_at__isnull=True)
+        return queryset
@@ -0,0 +1,20 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'duration_ms', 'created_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'idempotency_key')
+    readonly_fields = ('locked_by', 'locked_at', 'started_at', 'finished_at', 'duration_ms', 'last_error', 'created_at')
+    actions = ['retry']
+
+    @admin.action(description="Relancer les jobs sélectionnés")
+    def retry(self, request, queryset):
+        count = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.PENDING, attempts=0, run_at=timezone.now(), last_error='',
+        )
+        self.message_user(request, f"{count} job(s) relancé(s)")
@@ -0,0 +1,98 @@
+import os
+import signal
+import socket
+import time
+from datetime import timedelta
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+# Module importé par les processus fils avant django.setup() :
+# pas d'import de modèles au niveau module
+
+MAINTENANCE_INTERVAL = 60
+
+
+def _worker_main(worker_id, stop, batch_size, poll_interval):
+    import django
+    django.setup()
+    from jobs.worker import work
+
+    # Arrêt piloté par le superviseur via `stop`
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    work(worker_id, stop, batch_size, poll_interval)
+
+
+class Command(BaseCommand):
+    help = "Lance un pool de processus qui exécutent les jobs en attente (Ctrl+C pour arrêter)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--batch-size', type=int, default=1,
+                            help="Jobs réservés à la fois par un worker")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Attente en secondes quand la file est vide")
+        parser.add_argument('--stats', action='store_true',
+                            help="Affiche les métriques des jobs des dernières 24 h et quitte")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            return self._stats()
+
+        context = get_context('spawn')
+        stop = context.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+
+        def start(n):
+            process = context.Process(
+                target=_worker_main,
+                args=(f'{prefix}:{n}', stop, options['batch_size'], options['poll_interval']),
+                daemon=True,
+            )
+            process.start()
+            return process
+
+        workers = {n: start(n) for n in range(options['processes'])}
+        self.stdout.write(f"{len(workers)} workers démarrés")
+        next_maintenance = 0.0
+        try:
+            while not stop.is_set():
+                for n, process in list(workers.items()):
+                    if not process.is_alive():
+                        self.stderr.write(f"Worker {n} arrêté (code {process.exitcode}), redémarrage")
+                        workers[n] = start(n)
+                if time.monotonic() >= next_maintenance:
+                    self._maintenance()
+                    next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL
+                stop.wait(1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop.set()
+            for process in workers.values():
+                process.join(timeout=30)
+                if process.is_alive():
+                    process.terminate()
+        self.stdout.write("Workers arrêtés")
+
+    def _maintenance(self):
+        from jobs.worker import purge, requeue_stale
+
+        requeued, failed = requeue_stale()
+        purged = purge()
+        if requeued or failed or purged:
+            self.stdout.write(f"Maintenance : {requeued} relancé(s), {failed} abandonné(s), {purged} purgé(s)")
+
+    def _stats(self):
+        from jobs.worker import stats
+
+        rows = stats(since=timezone.now() - timedelta(hours=24))
+        self.stdout.write(f"{'job':<30}{'statut':<10}{'nombre':>8}{'moy. ms':>10}{'max ms':>10}{'tentatives':>12}")
+        for row in rows:
+            self.stdout.write(
+                f"{row['name']:<30}{row['status']:<10}{row['count']:>8}"
+                f"{row['avg_ms'] or 0:>10.1f}{row['max_ms'] or 0:>10.1f}{row['avg_attempts'] or 0:>12.2f}"
+            )
@@ -0,0 +1,63 @@
+"""
+File de travaux différés en base, sans broker externe.
+
+    from jobs.queue import enqueue, task
+
+    @task('users.delete_files')          # dans <app>/tasks.py
+    def delete_files(paths): ...
+
+    enqueue('users.delete_files', {'paths': [...]}, key=...)
+
+Le payload est passé en arguments nommés au handler ; il doit être
+sérialisable en JSON. Un handler peut être rejoué (nouvelle tentative après
+une erreur, worker arrêté en cours de route) : il doit être idempotent.
+"""
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Job
+
+_handlers = {}
+
+
+def task(name):
+    def register(func):
+        _handlers[name] = func
+        return func
+    return register
+
+
+def get_handler(name):
+    return _handlers[name]
+
+
+def enqueue(name, payload=None, key=None, run_at=None, max_attempts=5):
+    """
+    Ajoute un job, dans la transaction courante s'il y en a une. Avec `key`,
+    renvoie le job en attente de même clé s'il existe : un job déjà en cours
+    n'empêche pas d'en programmer un nouveau.
+    """
+    if name not in _handlers:
+        raise ValueError(f"Aucun handler pour le job {name!r}")
+    job = Job(
+        name=name,
+        payload=payload or {},
+        idempotency_key=key,
+        max_attempts=max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+    if key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+        return job
+    except IntegrityError:
+        existing = Job.objects.filter(idempotency_key=key, status=Job.PENDING).first()
+        if existing is not None:
+            return existing
+        # Le job en attente vient d'être pris par un worker : on réessaie une fois
+        job.pk = None
+        job.save()
+        return job
@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import enqueue, task
+from .worker import backoff, claim, requeue_stale, run
+
+calls = []
+
+
+@task('jobs.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task('jobs.tests.fail')
+def fail():
+    raise RuntimeError('échec')
+
+
+@override_settings(JOBS_BACKOFF_BASE_SECONDS=10, JOBS_BACKOFF_MAX_SECONDS=3600, JOBS_LOCK_TIMEOUT_SECONDS=600)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_claim_takes_due_jobs_once(self):
+        first = enqueue('jobs.tests.record', {'value': 1}, run_at=timezone.now() - timedelta(seconds=2))
+        second = enqueue('jobs.tests.record', {'value': 2}, run_at=timezone.now() - timedelta(seconds=1))
+        enqueue('jobs.tests.record', {'value': 3}, run_at=timezone.now() + timedelta(hours=1))
+
+        jobs = claim('w1')
+        self.assertEqual([job.pk for job in jobs], [first.pk])
+        self.assertEqual([job.pk for job in claim('w2', limit=5)], [second.pk])
+        self.assertEqual(claim('w3', limit=5), [])
+
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.locked_by, first.attempts), (Job.RUNNING, 'w1', 1))
+        self.assertTrue(run(jobs[0], 'w1'))
+        first.refresh_from_db()
+        self.assertEqual(first.status, Job.DONE)
+        self.assertEqual(calls, [1])
+
+    def test_failure_is_retried_with_backoff_then_abandoned(self):
+        job = enqueue('jobs.tests.fail', max_attempts=2)
+        before = timezone.now()
+        self.assertFalse(run(claim('w1')[0], 'w1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=5))
+        self.assertIn('RuntimeError', job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertFalse(run(claim('w1')[0], 'w1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_backoff_bounds(self):
+        self.assertTrue(timedelta(seconds=5) <= backoff(1) <= timedelta(seconds=10))
+        self.assertTrue(timedelta(seconds=40) <= backoff(4) <= timedelta(seconds=80))
+        self.assertLessEqual(backoff(30), timedelta(seconds=3600))
+
+    def test_pending_jobs_with_the_same_key_are_merged(self):
+        first = enqueue('jobs.tests.record', {'value': 1}, key='k')
+        self.assertEqual(enqueue('jobs.tests.record', {'value': 2}, key='k').pk, first.pk)
+        claim('w1')
+        # Le job en cours n'empêche pas d'en programmer un nouveau
+        self.assertNotEqual(enqueue('jobs.tests.record', {'value': 3}, key='k').pk, first.pk)
+
+    def test_requeue_stale_keeps_one_pending_job_per_key(self):
+        old = timezone.now() - timedelta(hours=1)
+        for _ in range(2):
+            Job.objects.create(name='jobs.tests.record', payload={'value': 1}, idempotency_key='k',
+                               status=Job.RUNNING, locked_by='dead', locked_at=old, attempts=1)
+        alive = Job.objects.create(name='jobs.tests.record', payload={'value': 2}, status=Job.RUNNING,
+                                   locked_by='alive', locked_at=timezone.now(), attempts=1)
+
+        self.assertEqual(requeue_stale(), (1, 1))
+        self.assertEqual(Job.objects.filter(idempotency_key='k', status=Job.PENDING).count(), 1)
+        self.assertEqual(Job.objects.filter(idempotency_key='k', status=Job.FAILED).count(), 1)
+        alive.refresh_from_db()
+        self.assertEqual(alive.status, Job.RUNNING)
+
+    def test_requeue_stale_abandons_exhausted_jobs(self):
+        job = Job.objects.create(name='jobs.tests.record', payload={'value': 1}, status=Job.RUNNING,
+                                 locked_by='dead', locked_at=timezone.now() - timedelta(hours=1),
+                                 attempts=5, max_attempts=5)
+        self.assertEqual(requeue_stale(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
@@ -0,0 +1,165 @@
+"""
+Exécution des jobs : réservation par SELECT ... FOR UPDATE SKIP LOCKED, de
+sorte que plusieurs workers se partagent la file sans se bloquer ni prendre
+deux fois le même job.
+"""
+import logging
+import random
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Avg, Count, Exists, F, Max, OuterRef, Q
+from django.utils import timezone
+
+from .models import Job
+from .queue import get_handler
+
+logger = logging.getLogger(__name__)
+
+
+def backoff(attempts):
+    """Délai exponentiel avec gigue avant la tentative suivante"""
+    delay = min(
+        settings.JOBS_BACKOFF_MAX_SECONDS,
+        settings.JOBS_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1),
+    )
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def claim(worker_id, limit=1):
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.PENDING, run_at__lte=now)
+            .order_by('run_at')[:limit]
+        )
+        if jobs:
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=Job.RUNNING, locked_by=worker_id, locked_at=now,
+                started_at=now, attempts=F('attempts') + 1,
+            )
+    for job in jobs:
+        job.status, job.locked_by, job.attempts = Job.RUNNING, worker_id, job.attempts + 1
+    return jobs
+
+
+class Heartbeat:
+    """
+    Renouvelle locked_at toutes les JOBS_HEARTBEAT_SECONDS pendant
+    l'exécution, depuis un thread (et donc une connexion) à part : un job
+    plus long que JOBS_LOCK_TIMEOUT_SECONDS n'est pas pris pour abandonné
+    par requeue_stale.
+    """
+
+    def __init__(self, job, worker_id):
+        self.job, self.worker_id = job, worker_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=f'heartbeat-{job.pk}', daemon=True)
+
+    def _beat(self):
+        try:
+            while not self._stop.wait(settings.JOBS_HEARTBEAT_SECONDS):
+                try:
+                    Job.objects.filter(pk=self.job.pk, locked_by=self.worker_id, status=Job.RUNNING).update(
+                        locked_at=timezone.now(),
+                    )
+                except DatabaseError:
+                    logger.exception("Job %s #%s : verrou non renouvelé", self.job.name, self.job.pk)
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run(job, worker_id):
+    start = time.perf_counter()
+    try:
+        with Heartbeat(job, worker_id):
+            get_handler(job.name)(**job.payload)
+    except Exception:
+        duration_ms = (time.perf_counter() - start) * 1000
+        logger.exception("Job %s #%s en échec (tentative %s/%s)",
+                         job.name, job.pk, job.attempts, job.max_attempts)
+        fields = {'duration_ms': duration_ms, 'last_error': traceback.format_exc()[-4000:],
+                  'locked_by': '', 'locked_at': None}
+        mine = Job.objects.filter(pk=job.pk, locked_by=worker_id)
+        if job.attempts < job.max_attempts:
+            try:
+                with transaction.atomic():
+                    mine.update(status=Job.PENDING, run_at=timezone.now() + backoff(job.attempts), **fields)
+                return False
+            except IntegrityError:
+                # Un job de même clé est déjà en attente : il fera le travail
+                pass
+        mine.update(status=Job.FAILED, finished_at=timezone.now(), **fields)
+        return False
+    Job.objects.filter(pk=job.pk, locked_by=worker_id).update(
+        status=Job.DONE, finished_at=timezone.now(), last_error='',
+        duration_ms=(time.perf_counter() - start) * 1000,
+    )
+    return True
+
+
+def work(worker_id, stop, batch_size=1, poll_interval=1.0):
+    """Boucle d'un worker jusqu'à ce que l'événement `stop` soit levé"""
+    while not stop.is_set():
+        close_old_connections()
+        jobs = claim(worker_id, batch_size)
+        for job in jobs:
+            run(job, worker_id)
+        if not jobs:
+            stop.wait(poll_interval)
+
+
+def requeue_stale():
+    """Remet en file les jobs d'un worker mort (verrou plus vieux que le délai)"""
+    limit = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT_SECONDS)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=limit)
+    # Épuisés, ou doublés par un job de même clé déjà en attente
+    superseded = Exists(Job.objects.filter(
+        status=Job.PENDING, idempotency_key=OuterRef('idempotency_key'),
+    ))
+    abandon = {'status': Job.FAILED, 'finished_at': timezone.now(), 'locked_by': '', 'last_error': 'Verrou expiré'}
+    failed = stale.filter(Q(attempts__gte=F('max_attempts')) | Q(superseded)).update(**abandon)
+    requeued = 0
+    # Un par un : deux jobs abandonnés de même clé ne peuvent pas revenir
+    # tous deux en attente (jobs_job_pending_key_uniq) ; le second échoue
+    for pk in stale.order_by('locked_at').values_list('pk', flat=True):
+        job = stale.filter(pk=pk)
+        try:
+            with transaction.atomic():
+                requeued += job.update(status=Job.PENDING, run_at=timezone.now(), locked_by='', locked_at=None)
+        except IntegrityError:
+            failed += job.update(**abandon)
+    return requeued, failed
+
+
+def purge():
+    """Supprime les jobs terminés depuis plus de JOBS_KEEP_DAYS jours"""
+    limit = timezone.now() - timedelta(days=settings.JOBS_KEEP_DAYS)
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=limit).delete()
+    return deleted
+
+
+def stats(since=None):
+    """Nombre de jobs, durée moyenne et maximale par nom et statut"""
+    queryset = Job.objects.all()
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    return list(
+        queryset.values('name', 'status')
+        .annotate(count=Count('id'), avg_ms=Avg('duration_ms'), max_ms=Max('duration_ms'),
+                  avg_attempts=Avg('attempts'))
+        .order_by('name', 'status')
+    )
@@ -1,3 +1,47 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+from django.db import transaction
 
-# Register your models here.
\ No newline at end of file
+from backend.pagination import EstimatedCountPaginator
+from jobs.queue import enqueue
+
+from .models import CustomUser
+from .revocation import revoke_users_tokens
+
+
+@admin.register(CustomUser)
+class CustomUserAdmin(UserAdmin):
+    list_display = ('username', 'email', 'role', 'is_active', 'incident_count', 'last_incident_at', 'date_joined')
+    list_filter = ('role', 'is_active', 'is_staff')
+    # Requis par l'autocomplétion des autres admins (incidents, abonnements)
+    search_fields = ('username', 'email', 'phone_number')
+    readonly_fields = ('incident_count', 'last_incident_at', 'last_login', 'date_joined')
+    fieldsets = UserAdmin.fieldsets + (
+        ('Application', {'fields': ('role', 'phone_number', 'profile_picture',
+                                    'incident_count', 'last_incident_at')}),
+    )
+    ordering = ('-date_joined',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['activate', 'deactivate']
+
+    @admin.action(description="Activer les comptes sélectionnés", permissions=['change'])
+    def activate(self, request, queryset):
+        count = queryset.filter(is_active=False).update(is_active=True)
+        self.message_user(request, f"{count} compte(s) activé(s)")
+
+    @admin.action(description="Désactiver les comptes sélectionnés", permissions=['change'])
+    def deactivate(self, request, queryset):
+        # Les administrateurs restent actifs (CustomUser.save)
+        with transaction.atomic():
+            user_ids = list(
+                queryset.filter(is_active=True).exclude(role='admin')
+                .select_for_update().values_list('pk', flat=True)
+            )
+            CustomUser.objects.filter(pk__in=user_ids).update(is_active=False)
+            # Comme users.views : jetons JWT révoqués tout de suite, sessions
+            # fermées en arrière-plan (un seul parcours des sessions)
+            revoke_users_tokens(user_ids)
+        if user_ids:
+            enqueue('users.invalidate_sessions', {'user_ids': user_ids})
+        self.message_user(request, f"{len(user_ids)} compte(s) désactivé(s)")
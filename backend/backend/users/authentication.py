@@ -0,0 +1,24 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication as BaseJWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from backend import db_router
+
+from .revocation import is_revoked
+
+
+class JWTAuthentication(BaseJWTAuthentication):
+    """
+    Authentification JWT qui refuse les jetons révoqués (users.revocation,
+    sans requête) et signale l'utilisateur au routeur de bases avant de le
+    charger : juste après une écriture (inscription comprise), sa lecture
+    doit se faire sur la primaire.
+    """
+
+    def get_user(self, validated_token):
+        if is_revoked(validated_token):
+            raise InvalidToken({'detail': 'Jeton révoqué', 'code': 'token_revoked'})
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None:
+            db_router.set_current_user(user_id)
+        return super().get_user(validated_token)
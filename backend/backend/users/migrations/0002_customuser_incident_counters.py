@@ -0,0 +1,48 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        # Le calcul initial compte aussi les incidents archivés
+        ('incidents', '0003_archivedincident'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='incident_count',
+            field=models.PositiveIntegerField(db_default=0, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='last_incident_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE users_customuser u
+                SET incident_count = c.n, last_incident_at = c.latest
+                FROM (
+                    SELECT user_id, count(*) AS n, max(created_at) AS latest
+                    FROM (
+                        SELECT user_id, created_at FROM incidents_incident
+                        UNION ALL
+                        SELECT user_id, created_at FROM incidents_archivedincident
+                    ) s
+                    GROUP BY user_id
+                ) c
+                WHERE c.user_id = u.id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['-incident_count'], name='users_user_incident_cnt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['role', '-incident_count'], name='users_user_role_inc_cnt_idx'),
+        ),
+    ]
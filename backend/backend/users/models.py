@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.contrib.auth.hashers import make_password
+
+from jobs.queue import enqueue
 import os
 
 def user_profile_picture_path(instance, filename):
@@ -37,6 +39,12 @@ class CustomUser(AbstractUser):
         null=True, 
         blank=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='citizen')
+    # Tenus à jour par incidents.counters (création, suppression, synchro)
+    incident_count = models.PositiveIntegerField(default=0, db_default=0, editable=False)
+    last_incident_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    COUNTER_FIELDS = ('incident_count', 'last_incident_at')
+
     def set_biometric_token(self, raw_token):
         """Hash et stocke le token biométrique"""
         if raw_token:
@@ -54,27 +62,39 @@ class CustomUser(AbstractUser):
 
     def save(self, *args, **kwargs):
         """Gestion des anciennes images et sauvegarde optimisée"""
+        old_picture = None
         if self.pk:
-            try:
-                old = CustomUser.objects.get(pk=self.pk)
-                if (old.profile_picture and 
-                    old.profile_picture != self.profile_picture):
-                    old.profile_picture.delete(save=False)
-            except CustomUser.DoesNotExist:
-                pass
+            old_picture = CustomUser.objects.filter(pk=self.pk).values_list(
+                'profile_picture', flat=True
+            ).first()
+            if old_picture == (self.profile_picture.name or None):
+                old_picture = None
 
         if self.role == 'admin':
             self.is_staff = True
             self.is_active = True
-            
-                 
+
+        # Les compteurs sont incrémentés en SQL : une instance chargée plus tôt
+        # ne doit pas les écraser avec une valeur périmée
+        if (not self._state.adding and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+
         super().save(*args, **kwargs)
+        if old_picture:
+            # Suppression du fichier par un worker (users.tasks), une fois l'enregistrement fait
+            enqueue('users.delete_files', {'paths': [old_picture]})
 
     def delete(self, *args, **kwargs):
         """Nettoyage des fichiers à la suppression"""
-        if self.profile_picture:
-            self.profile_picture.delete(save=False)
-        super().delete(*args, **kwargs)
+        picture = self.profile_picture.name
+        result = super().delete(*args, **kwargs)
+        if picture:
+            enqueue('users.delete_files', {'paths': [picture]})
+        return result
 
 
     
@@ -112,4 +132,23 @@ class CustomUser(AbstractUser):
         indexes = [
             models.Index(fields=['username']),
             models.Index(fields=['email']),
-        ]
\ No newline at end of file
+            # Classements « top N déclarants »
+            models.Index(fields=['-incident_count'], name='users_user_incident_cnt_idx'),
+            models.Index(fields=['role', '-incident_count'], name='users_user_role_inc_cnt_idx'),
+        ]
+
+class TokenWatermark(models.Model):
+    """Les jetons JWT de l'utilisateur émis avant `valid_after` sont refusés"""
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True,
+                                related_name='token_watermark')
+    valid_after = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+
+class RevokedToken(models.Model):
+    """Jeton révoqué individuellement (déconnexion), par son identifiant `jti`"""
+    jti = models.CharField(max_length=255, primary_key=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='revoked_tokens')
+    # Au-delà, le jeton est expiré de toute façon : la ligne peut être purgée
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
@@ -0,0 +1,190 @@
+"""
+Révocation des jetons JWT sans requête supplémentaire par requête HTTP.
+
+Deux mécanismes, stockés en base et recopiés en mémoire dans chaque processus :
+- un « filigrane » par utilisateur (TokenWatermark) : tout jeton émis avant
+  est refusé (désactivation du compte, changement de mot de passe) ;
+- des jetons révoqués un par un (RevokedToken, déconnexion), tenus dans un
+  filtre de Bloom. Un jeton absent du filtre n'est sûrement pas révoqué ; en
+  cas de présence, la base confirme (faux positifs rares, mis en cache).
+
+La copie en mémoire est rechargée de façon incrémentale toutes les
+REVOCATION_REFRESH_SECONDS, et reconstruite entièrement toutes les
+REVOCATION_REBUILD_SECONDS pour oublier les jetons expirés. Une révocation
+faite dans le processus est visible immédiatement ; dans les autres, après
+au plus REVOCATION_REFRESH_SECONDS.
+
+Les filigranes sont comparés au champ `iat`, à la microseconde pour les
+jetons émis par users.tokens.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import RevokedToken, TokenWatermark
+
+# Les lignes validées en retard (horodatées au début de leur transaction)
+# sont relues sur cette marge
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(capacity, 1000)
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.watermarks = {}
+        self.bloom = BloomFilter(0)
+        # Résultats confirmés en base pour les jetons présents dans le filtre
+        self.confirmed = {}
+        # time.monotonic() part d'une origine quelconque (démarrage de la
+        # machine) : -inf force le premier chargement
+        self.refreshed_at = float('-inf')
+        self.rebuilt_at = float('-inf')
+        self.since = None
+
+    def _max_lifetime(self):
+        return max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+
+    def refresh_if_due(self):
+        now = time.monotonic()
+        if now - self.refreshed_at < settings.REVOCATION_REFRESH_SECONDS:
+            return
+        with self._lock:
+            if now - self.refreshed_at < settings.REVOCATION_REFRESH_SECONDS:
+                return
+            if self.since is None or now - self.rebuilt_at >= settings.REVOCATION_REBUILD_SECONDS:
+                self._rebuild()
+                self.rebuilt_at = now
+            else:
+                self._load_since(self.since - REFRESH_OVERLAP)
+            self.refreshed_at = now
+
+    def _rebuild(self):
+        started = timezone.now()
+        oldest = started - self._max_lifetime()
+        RevokedToken.objects.filter(expires_at__lt=started).delete()
+        jtis = list(RevokedToken.objects.filter(expires_at__gte=started).values_list('jti', flat=True))
+        bloom = BloomFilter(len(jtis) * 2)
+        for jti in jtis:
+            bloom.add(jti)
+        self.bloom = bloom
+        self.confirmed = {}
+        self.watermarks = {
+            user_id: valid_after.timestamp()
+            for user_id, valid_after in TokenWatermark.objects.filter(
+                valid_after__gte=oldest
+            ).values_list('user_id', 'valid_after')
+        }
+        self.since = started
+
+    def _load_since(self, since):
+        started = timezone.now()
+        for jti in RevokedToken.objects.filter(revoked_at__gte=since).values_list('jti', flat=True):
+            self._add_jti(jti)
+        for user_id, valid_after in TokenWatermark.objects.filter(
+            updated_at__gte=since
+        ).values_list('user_id', 'valid_after'):
+            self.watermarks[user_id] = valid_after.timestamp()
+        self.since = started
+
+    def _add_jti(self, jti):
+        if self.bloom.count >= self.bloom.capacity:
+            # Filtre saturé : reconstruction au prochain rafraîchissement
+            self.rebuilt_at = float('-inf')
+        self.bloom.add(jti)
+        self.confirmed[jti] = True
+
+    def is_revoked(self, user_id, jti, issued_at):
+        self.refresh_if_due()
+        valid_after = self.watermarks.get(user_id)
+        if valid_after is not None and issued_at is not None and issued_at < valid_after:
+            return True
+        if jti is None or jti not in self.bloom:
+            return False
+        revoked = self.confirmed.get(jti)
+        if revoked is None:
+            revoked = RevokedToken.objects.filter(jti=jti).exists()
+            self.confirmed[jti] = revoked
+        return revoked
+
+    def set_watermark(self, user_id, valid_after):
+        self.watermarks[user_id] = valid_after.timestamp()
+
+    def add_revoked(self, jti):
+        with self._lock:
+            self._add_jti(jti)
+
+
+_cache = RevocationCache()
+
+
+def _claims(token):
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        pass
+    return user_id, token.get(api_settings.JTI_CLAIM), token.get('iat')
+
+
+def is_revoked(token):
+    """`token` : jeton simplejwt validé (signature et expiration)"""
+    return _cache.is_revoked(*_claims(token))
+
+
+def revoke_user_tokens(user_id):
+    """Invalide tous les jetons déjà émis pour l'utilisateur"""
+    revoke_users_tokens([user_id])
+
+
+def revoke_users_tokens(user_ids):
+    """Comme revoke_user_tokens, en une seule requête pour plusieurs utilisateurs"""
+    # À la microseconde, comme l'iat des jetons (users.tokens) : un jeton
+    # émis juste après, même dans la seconde courante, reste valide
+    valid_after = timezone.now()
+    TokenWatermark.objects.bulk_create(
+        [TokenWatermark(user_id=user_id, valid_after=valid_after) for user_id in user_ids],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['valid_after', 'updated_at'],
+    )
+    for user_id in user_ids:
+        _cache.set_watermark(user_id, valid_after)
+
+
+def revoke_token(token):
+    """Invalide un seul jeton (accès ou rafraîchissement)"""
+    user_id, jti, _ = _claims(token)
+    if jti is None:
+        return
+    expires_at = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+    RevokedToken.objects.get_or_create(jti=jti, defaults={'user_id': user_id, 'expires_at': expires_at})
+    _cache.add_revoked(jti)
@@ -1,7 +1,13 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
 from django.core.validators import FileExtensionValidator, validate_email
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from backend.renditions import media_url, rendition_url
 from .models import CustomUser
+from .revocation import is_revoked
+from .tokens import RefreshToken
 
 class UserRegisterSerializer(serializers.ModelSerializer):
     """Serializer pour l'inscription"""
@@ -82,6 +88,7 @@ class UserRegisterSerializer(serializers.ModelSerializer):
 class UserSerializer(serializers.ModelSerializer):
     """Serializer principal pour les utilisateurs"""
     profile_picture = serializers.SerializerMethodField()
+    profile_picture_thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = CustomUser
@@ -91,6 +98,7 @@ class UserSerializer(serializers.ModelSerializer):
             'email',
             'phone_number',
             'profile_picture',
+            'profile_picture_thumbnail',
             'date_joined',
             'last_login',
             'biometric_token',
@@ -103,11 +111,17 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
     def get_profile_picture(self, obj):
-        if obj.profile_picture:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.profile_picture.url)
-        return None
+        # Servie par users.views.profile_picture (contrôle d'accès)
+        if not obj.profile_picture:
+            return None
+        return media_url(self.context.get('request'), 'user-profile-picture', {'pk': obj.pk})
+
+    def get_profile_picture_thumbnail(self, obj):
+        # Avatar réduit servi par users.views.profile_picture
+        if not obj.profile_picture:
+            return None
+        return rendition_url(self.context.get('request'), 'user-profile-picture',
+                             {'pk': obj.pk}, settings.RENDITION_AVATAR_SIZE)
 
 class BiometricAuthSerializer(serializers.Serializer):
     """Serializer pour l'authentification biométrique"""
@@ -137,4 +151,22 @@ class AdminRegisterSerializer(UserRegisterSerializer):
         user.is_staff = True
         user.is_active = True
         user.save()
-        return user
\ No newline at end of file
+        return user
+
+class PreciseTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Jetons à `iat` précis (voir users.tokens)"""
+    token_class = RefreshToken
+
+
+class RevocationAwareTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuse de rafraîchir un jeton révoqué (voir users.revocation)"""
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        try:
+            refresh = RefreshToken(attrs['refresh'])
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        if is_revoked(refresh):
+            raise InvalidToken('Jeton révoqué')
+        return super().validate(attrs)
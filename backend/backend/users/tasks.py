@@ -0,0 +1,26 @@
+from django.contrib.sessions.models import Session
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from jobs.queue import task
+
+
+@task('users.delete_files')
+def delete_files(paths):
+    for path in paths:
+        # Storage.delete ne lève pas d'erreur si le fichier n'existe plus
+        default_storage.delete(path)
+
+
+@task('users.invalidate_sessions')
+def invalidate_sessions(user_id=None, user_ids=()):
+    """Ferme les sessions Django (admin) des utilisateurs, en un seul parcours"""
+    targets = {str(pk) for pk in user_ids}
+    if user_id is not None:
+        targets.add(str(user_id))
+    keys = [
+        session.session_key
+        for session in Session.objects.filter(expire_date__gt=timezone.now()).iterator()
+        if session.get_decoded().get('_auth_user_id') in targets
+    ]
+    Session.objects.filter(session_key__in=keys).delete()
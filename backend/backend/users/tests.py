@@ -1,3 +1,77 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from backend.throttling import AuthThrottle, LocalBucketStore
+from .models import CustomUser
+from .revocation import RevocationCache, is_revoked, revoke_user_tokens
+from .tokens import RefreshToken
+
+
+class RevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='citizen', email='citizen@example.com', password='x' * 12
+        )
+
+    def test_cold_start_on_recently_booted_host(self):
+        # time.monotonic() compte depuis le démarrage de la machine
+        revoke_user_tokens(self.user.pk)
+        cache = RevocationCache()
+        with mock.patch('users.revocation.time.monotonic', return_value=30.0):
+            self.assertFalse(cache.is_revoked(self.user.pk, 'unknown-jti', None))
+        self.assertIsNotNone(cache.since)
+        self.assertIn(self.user.pk, cache.watermarks)
+
+    def test_login_right_after_logout_all_is_accepted(self):
+        before = RefreshToken.for_user(self.user)
+        revoke_user_tokens(self.user.pk)
+        after = RefreshToken.for_user(self.user)
+        self.assertTrue(is_revoked(before.access_token))
+        self.assertFalse(is_revoked(after.access_token))
+        self.assertFalse(is_revoked(after))
+
+
+class LoginView(APIView):
+    authentication_classes = []
+    permission_classes = []
+    throttle_classes = [AuthThrottle]
+
+    def post(self, request):
+        return Response({})
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_bucket_refills_at_the_configured_rate(self):
+        store = LocalBucketStore()
+        with mock.patch('backend.throttling.time.monotonic', return_value=100.0) as clock:
+            self.assertEqual(store.take('k', 2, 1.0, 1), (True, 0.0))
+            self.assertEqual(store.take('k', 2, 1.0, 1), (True, 0.0))
+            self.assertEqual(store.take('k', 2, 1.0, 1), (False, 1.0))
+            clock.return_value = 100.5
+            self.assertEqual(store.take('k', 2, 1.0, 1), (False, 0.5))
+            clock.return_value = 101.0
+            self.assertEqual(store.take('k', 2, 1.0, 1), (True, 0.0))
+            # Le remplissage s'arrête à la capacité
+            clock.return_value = 1000.0
+            self.assertEqual(store.take('k', 2, 1.0, 3), (False, 1.0))
+
+    @override_settings(RATE_LIMITS={'auth': {'capacity': 1, 'per_minute': 1}})
+    def test_refusal_carries_retry_after_and_follows_the_account(self):
+        factory = APIRequestFactory()
+
+        def login(address):
+            request = factory.post('/api/users/token/', {'username': 'Bucket-Test'},
+                                   format='json', REMOTE_ADDR=address)
+            return LoginView.as_view()(request)
+
+        self.assertEqual(login('203.0.113.7').status_code, 200)
+        refused = login('203.0.113.7')
+        self.assertEqual(refused.status_code, 429)
+        self.assertEqual(refused['Retry-After'], '60')
+        # Changer d'adresse ne redonne pas d'essais sur le même compte
+        self.assertEqual(login('203.0.113.8').status_code, 429)
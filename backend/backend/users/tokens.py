@@ -0,0 +1,25 @@
+"""
+Jetons JWT dont le champ `iat` est à la microseconde (RFC 7519 : une
+NumericDate peut être décimale). simplejwt l'arrondit à la seconde : un
+filigrane de révocation (users.revocation) ne pourrait alors pas séparer
+les jetons émis juste avant lui de ceux émis juste après, dans la même
+seconde (« déconnecter partout » suivi d'une reconnexion immédiate).
+
+Tous les jetons de l'application sont créés par ces classes.
+"""
+from rest_framework_simplejwt import tokens
+
+
+class PreciseIssuedAtMixin:
+    def set_iat(self, claim='iat', at_time=None):
+        if at_time is None:
+            at_time = self.current_time
+        self.payload[claim] = at_time.timestamp()
+
+
+class AccessToken(PreciseIssuedAtMixin, tokens.AccessToken):
+    pass
+
+
+class RefreshToken(PreciseIssuedAtMixin, tokens.RefreshToken):
+    access_token_class = AccessToken
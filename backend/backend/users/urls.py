@@ -3,14 +3,18 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
+from backend.throttling import AuthThrottle
+from .serializers import PreciseTokenObtainPairSerializer, RevocationAwareTokenRefreshSerializer
 from .views import (
     UserRegisterView,
     UserListCreateView,
     UserDetailView,
     current_user,
+    profile_picture,
     biometric_login,
     register_biometric,
     login_view,
+    logout_view,
     UserStatsView,
     toggle_user_status,
     AdminRegisterView
@@ -18,14 +22,19 @@ from .views import (
 
 urlpatterns = [
     # Authentification JWT
-    path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/', TokenObtainPairView.as_view(serializer_class=PreciseTokenObtainPairSerializer,
+                                              throttle_classes=[AuthThrottle]),
+         name='token_obtain_pair'),
+    path('token/refresh/', TokenRefreshView.as_view(serializer_class=RevocationAwareTokenRefreshSerializer),
+         name='token_refresh'),
+    path('logout/', logout_view, name='logout'),
     
     # Gestion utilisateurs
     path('register/', UserRegisterView.as_view(), name='user-register'),
     path('', UserListCreateView.as_view(), name='user-list'),
     path('me/', current_user, name='current-user'),
     path('<int:pk>/', UserDetailView.as_view(), name='user-detail'),
+    path('<int:pk>/picture/', profile_picture, name='user-profile-picture'),
     
     # Biométrie
     path('biometric-login/', biometric_login, name='biometric-login'),
@@ -1,8 +1,9 @@
 from rest_framework import generics, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import get_user_model, authenticate
 from .models import CustomUser
 from .serializers import (
@@ -13,10 +14,16 @@ from .serializers import (
 )
 from .permissions import IsAdminUser, IsCitizenUser
 from rest_framework.views import APIView
-from django.db.models import Count
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from rest_framework.pagination import PageNumberPagination
 
+from backend import db_router
+from backend.renditions import serve_image
+from backend.throttling import AuthThrottle, RegisterThrottle
+from jobs.queue import enqueue
+from .revocation import revoke_token, revoke_user_tokens
+from .tokens import RefreshToken
+
 
 User = get_user_model()
 
@@ -31,9 +38,8 @@ class UserStatsView(APIView):
         total_users = User.objects.filter(role='citizen').count()
         
         # Utilisateurs les plus actifs (avec nombre d'incidents)
-        active_users = User.objects.filter(role='citizen').annotate(
-            incident_count=Count('incidents')
-        ).order_by('-incident_count')[:5]
+        # Compteur dénormalisé, index (role, -incident_count)
+        active_users = User.objects.filter(role='citizen').order_by('-incident_count')[:5]
         
         # Formatage des données
         active_users_data = [
@@ -69,9 +75,12 @@ def toggle_user_status(request, user_id):
         user.is_active = is_active
         user.save()
         
-        # Invalider les tokens si désactivation
+        # Jetons JWT déjà émis révoqués tout de suite (users.revocation) ;
+        # sessions Django fermées en arrière-plan
         if not is_active:
-            user.auth_token_set.all().delete()
+            revoke_user_tokens(user.id)
+            enqueue('users.invalidate_sessions', {'user_id': user.id},
+                    key=f'invalidate-sessions:{user.id}')
         
         return Response({
             'status': 'success',
@@ -89,6 +98,7 @@ class UserRegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserRegisterSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [RegisterThrottle]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -109,6 +119,8 @@ class UserRegisterView(generics.CreateAPIView):
         try:
             # Création de l'utilisateur
             user = serializer.save()
+            # Ses premières lectures doivent trouver son compte : primaire
+            db_router.pin_user(user.id)
             
             # Génération des tokens
             refresh = RefreshToken.for_user(user)
@@ -201,6 +213,7 @@ class AdminRegisterView(generics.CreateAPIView):
         
         try:
             user = serializer.save()
+            db_router.pin_user(user.id)
             refresh = RefreshToken.for_user(user)
 
             user.is_active = True
@@ -228,6 +241,16 @@ class AdminRegisterView(generics.CreateAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def profile_picture(request, pk):
+    """Photo de profil, visible comme le détail utilisateur (tout utilisateur connecté)"""
+    user = User.objects.filter(pk=pk).only('profile_picture').first()
+    if user is None:
+        raise Http404
+    return serve_image(request, user.profile_picture)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def current_user(request):
@@ -238,6 +261,7 @@ def current_user(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AuthThrottle])
 def login_view(request):
     """Vue de connexion améliorée avec gestion d'erreur complète"""
     username = request.data.get('username')
@@ -271,8 +295,35 @@ def login_view(request):
         'refresh': str(refresh),
         'user': user_data
     })
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout_view(request):
+    """
+    Révoque le jeton d'accès utilisé et, s'il est fourni, le jeton de
+    rafraîchissement ; avec "all": true, tous les jetons de l'utilisateur
+    """
+    refresh = None
+    if request.data.get('refresh'):
+        try:
+            refresh = RefreshToken(request.data['refresh'])
+        except TokenError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if str(refresh.get(api_settings.USER_ID_CLAIM)) != str(request.user.pk):
+            return Response({'error': "Ce jeton n'appartient pas à l'utilisateur"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    if request.data.get('all'):
+        revoke_user_tokens(request.user.pk)
+    else:
+        revoke_token(request.auth)
+        if refresh is not None:
+            revoke_token(refresh)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AuthThrottle])
 def biometric_login(request):
     """Authentification biométrique"""
     serializer = BiometricAuthSerializer(data=request.data)